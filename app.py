@@ -4,12 +4,18 @@ Secure deployment for Streamlit Cloud
 """
 
 import streamlit as st
+import itertools
+import logging
 import os
+import time
 from dotenv import load_dotenv
 
 # Load local .env file (for local development)
 load_dotenv()
 
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+logger = logging.getLogger("neurolitrag.startup")
+
 # ============================================
 # PAGE CONFIG
 # ============================================
@@ -70,15 +76,68 @@ def check_api_key():
         st.stop()
 
 
+# Example questions; also kept warm in the background
+EXAMPLES = [
+    "What is the role of the hippocampus in memory?",
+    "How does dopamine affect reward processing?",
+    "What role do microglia play in Alzheimer's disease?",
+    "What are the mechanisms of synaptic plasticity?",
+]
+
+
 @st.cache_resource
-def load_rag():
-    """Initialize and cache RAG system."""
+def app_start_time():
+    """Time of the first script run in this process (cold start reference)."""
+    return time.perf_counter()
+
+
+def build_rag(loader):
+    """Runs on the loader thread: heavy imports, clients, then the index."""
     from src.pipeline import NeuroLitRAG
-    rag = NeuroLitRAG()
-    rag.load_demo_data()
+    loader.mark("imports")
+    # Coalesce query embeddings across concurrent sessions
+    rag = NeuroLitRAG(embed_coalesce_window_ms=5.0, query_log_path="./data/query_log.json")
+    loader.mark("pipeline")
+    loader.info["load"] = rag.load_demo_data()
+    loader.mark("index")
+    # Precompute the examples and the most asked questions
+    rag.start_warmup(pinned=EXAMPLES)
+    
+    mode = "warm start" if loader.info["load"].get("warm_start") else "ingested"
+    logger.info("index ready (%s): %s", mode, loader.timings)
     return rag
 
 
+@st.cache_resource
+def load_rag():
+    """Start building the RAG system in the background, once per process."""
+    from src.startup import BackgroundLoader
+    return BackgroundLoader(build_rag, started=app_start_time())
+
+
+def wait_for_rag(loader):
+    with st.spinner("🔄 Loading NeuroLitRAG..."):
+        try:
+            return loader.wait()
+        except Exception as e:
+            # Drop the failed loader so the next run starts a fresh one
+            load_rag.clear()
+            st.error(f"Failed to load NeuroLitRAG: {e}. Rerun to retry.")
+            st.stop()
+
+
+def show_load_status(status, loader):
+    if not loader.ready:
+        status.caption("🔄 Index loading in the background...")
+    elif loader.error is None:
+        mode = "warm start" if loader.info["load"].get("warm_start") else "fresh ingest"
+        status.caption(f"✅ Index ready in {loader.timings['ready']:.1f}s ({mode}); "
+                       f"interactive in {loader.timings.get('interactive', 0):.1f}s")
+    else:
+        load_rag.clear()
+        status.error(f"Index failed to load: {loader.error}. Rerun to retry.")
+
+
 def main():
     # Header
     st.markdown('<p class="main-header">🧠 NeuroLitRAG</p>', unsafe_allow_html=True)
@@ -89,6 +148,9 @@ def main():
     # Check API key FIRST (this now loads secrets properly)
     check_api_key()
     
+    # Start loading the index; the page renders while it builds
+    loader = load_rag()
+    
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Settings")
@@ -116,24 +178,16 @@ def main():
         st.divider()
         
         st.markdown("**Built for Cohere** 🚀")
-    
-    # Load RAG
-    with st.spinner("🔄 Loading NeuroLitRAG..."):
-        rag = load_rag()
+        
+        load_status = st.empty()
+        show_load_status(load_status, loader)
     
     # Main interface
     st.subheader("🔍 Ask a Neuroscience Question")
     
     # Example questions
-    examples = [
-        "What is the role of the hippocampus in memory?",
-        "How does dopamine affect reward processing?",
-        "What role do microglia play in Alzheimer's disease?",
-        "What are the mechanisms of synaptic plasticity?",
-    ]
-    
     cols = st.columns(2)
-    for i, ex in enumerate(examples):
+    for i, ex in enumerate(EXAMPLES):
         with cols[i % 2]:
             if st.button(ex, key=f"ex_{i}", use_container_width=True):
                 st.session_state.query = ex
@@ -147,30 +201,61 @@ def main():
     
     # Search button
     if st.button("🔍 Search", type="primary", use_container_width=True) and query:
+        rag = wait_for_rag(loader)
+        events = rag.query_stream(query, use_reranking=use_reranking)
+        
+        # Spinner covers retrieval + rerank, until the first token arrives
         with st.spinner("🔄 Searching and generating answer..."):
-            result = rag.query(query, use_reranking=use_reranking)
+            first_event = next(events)
         
-        # Display answer
+        # Display answer, token by token
         st.subheader("📝 Answer")
-        st.markdown(result["answer"])
+        answer_box = st.empty()
+        answer_text = ""
+        result = None
         
-        # Display citations
-        st.subheader(f"📚 Sources ({result['sources_used']} cited)")
+        for event in itertools.chain([first_event], events):
+            if event["type"] == "text":
+                answer_text += event["text"]
+                answer_box.markdown(answer_text + "▌")
+            elif event["type"] == "end":
+                result = event["result"]
         
-        for c in result["citations"]:
-            with st.container():
-                st.markdown(f"**[{c['number']}]** {c['authors']} ({c['year']})")
-                st.markdown(f"*{c['title']}*")
-                st.caption(c['journal'])
-                st.divider()
-        
-        # Rerank scores
-        if result.get("rerank_scores"):
-            st.subheader("🎯 Relevance Scores")
-            cols = st.columns(len(result["rerank_scores"]))
-            for i, score in enumerate(result["rerank_scores"]):
-                with cols[i]:
-                    st.metric(f"Source {i+1}", f"{score:.1%}")
+        if "error" in result:
+            answer_box.error(result["error"])
+        else:
+            answer_box.markdown(result["answer"])
+            show_sources(result)
+    
+    # The page is usable from here on, even if the index is still loading;
+    # the sidebar says so until a later run finds it ready
+    if "interactive" not in loader.timings:
+        loader.mark("interactive")
+        logger.info("time to interactive: %.2fs", loader.timings["interactive"])
+
+
+def show_sources(result):
+    """Citations and rerank scores below the answer."""
+    
+    # Display citations
+    st.subheader(f"📚 Sources ({result['sources_used']} cited)")
+    
+    for c in result["citations"]:
+        with st.container():
+            st.markdown(f"**[{c['number']}]** {c['authors']} ({c['year']})")
+            st.markdown(f"*{c['title']}*")
+            st.caption(c['journal'])
+            st.divider()
+    
+    # Rerank scores
+    if result.get("rerank_scores"):
+        st.subheader("🎯 Relevance Scores")
+        cols = st.columns(len(result["rerank_scores"]))
+        for i, score in enumerate(result["rerank_scores"]):
+            with cols[i]:
+                st.metric(f"Source {i+1}", f"{score:.1%}")
+    elif result.get("rerank_cascade") == "skipped":
+        st.caption("🎯 Rerank skipped: vector and keyword ranking agreed decisively")
 
 
 if __name__ == "__main__":
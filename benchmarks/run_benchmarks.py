@@ -0,0 +1,647 @@
+"""
+Offline NeuroLitRAG benchmarks against a simulated Cohere backend.
+    
+    python -m benchmarks.run_benchmarks --output bench_results.json
+    python benchmarks/run_benchmarks.py --output bench_results.json
+    python -m benchmarks.run_benchmarks --scenarios query concurrency --ingest-sizes 10000
+
+No API key or network access is needed: every Cohere call goes to
+`src.fake_cohere.FakeCohereClient`, whose latency and error rates are
+configurable. Results are written as JSON so runs can be compared.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+import numpy as np
+
+# Run as a script (not with -m), the repo root is not on the path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.cascade import RerankCascade  # noqa: E402
+from src.data_ingestion import Chunk, PaperMeta  # noqa: E402
+from src.embeddings import CohereEmbedder  # noqa: E402
+from src.fake_cohere import DEFAULT_PROFILES, FakeAsyncCohereClient, FakeCohereClient, LatencyProfile  # noqa: E402
+from src.paper_store import PaperTable  # noqa: E402
+from src.pipeline import NeuroLitRAG  # noqa: E402
+from src.reranker import CohereReranker  # noqa: E402
+from src.tracing import MetricsRegistry  # noqa: E402
+from src.vector_store import VectorStore  # noqa: E402
+
+
+TOPICS = [
+    "hippocampus", "prefrontal", "dopamine", "striatum", "microglia", "synaptic",
+    "plasticity", "oscillations", "theta", "gamma", "amygdala", "cerebellum",
+    "neurogenesis", "astrocytes", "myelin", "serotonin", "cortex", "thalamus",
+    "interneurons", "glutamate", "gaba", "memory", "attention", "reward"
+]
+WORDS = [
+    "activity", "neurons", "circuits", "signaling", "receptor", "expression",
+    "learning", "behavior", "disease", "imaging", "recordings", "mice", "human",
+    "network", "dynamics", "inhibition", "excitation", "development", "aging",
+    "inflammation", "consolidation", "encoding", "retrieval", "decision", "motor"
+]
+JOURNALS = ["Neuron", "Nature Neuroscience", "Cell", "Journal of Neuroscience", "eLife"]
+QUESTIONS = [
+    "What is the role of the {0} in {1}?",
+    "How does {0} affect {1} in {2}?",
+    "Which mechanisms link {0} and {1}?",
+    "What happens to {0} {1} during {2}?"
+]
+
+
+def synthetic_chunks(n: int, seed: int = 0, words_per_chunk: int = 120,
+                     chunks_per_paper: int = 1) -> Iterator[Chunk]:
+    """Deterministic fake abstracts (and body sections) with a topical vocabulary."""
+    rng = random.Random(seed)
+    paper = None
+    for i in range(n):
+        topics = rng.sample(TOPICS, 3)
+        body = " ".join(
+            rng.choice(topics) if rng.random() < 0.3 else rng.choice(WORDS)
+            for _ in range(words_per_chunk)
+        )
+        position = i % chunks_per_paper
+        if position == 0:
+            pmid = f"bench_{i // chunks_per_paper:08d}"
+            paper = PaperMeta(
+                pmid=pmid,
+                title=f"{topics[0].title()} {topics[1]} and {topics[2]} {rng.choice(WORDS)}",
+                authors=[f"Author{rng.randrange(1000)} A", f"Author{rng.randrange(1000)} B"],
+                year=str(rng.randrange(1990, 2025)),
+                journal=rng.choice(JOURNALS)
+            )
+        yield Chunk(
+            chunk_id=f"{paper.pmid}_{position}",
+            paper_id=paper.pmid,
+            text=f"Title: {paper.title}\n\n{'Body' if position else 'Abstract'}: {body}.",
+            paper=paper,
+            section="Body" if position else None,
+            chunk_index=position if position else None
+        )
+
+
+@dataclass
+class _LegacyChunk:
+    """Chunk layout before the paper table: per-instance __dict__, full metadata copy."""
+    chunk_id: str
+    paper_id: str
+    text: str
+    metadata: Dict
+
+
+def traced_bytes(build: Callable[[], Any]) -> int:
+    """Bytes still allocated by `build()` while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def synthetic_questions(n: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(QUESTIONS).format(*rng.sample(TOPICS, 2), rng.choice(WORDS))
+        for _ in range(n)
+    ]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds."""
+    if not values:
+        return {"n": 0}
+    ordered = np.sort(np.asarray(values, dtype=np.float64))
+    return {
+        "n": len(values),
+        "mean_ms": round(float(ordered.mean()), 3),
+        "p50_ms": round(float(np.percentile(ordered, 50)), 3),
+        "p90_ms": round(float(np.percentile(ordered, 90)), 3),
+        "p95_ms": round(float(np.percentile(ordered, 95)), 3),
+        "p99_ms": round(float(np.percentile(ordered, 99)), 3),
+        "max_ms": round(float(ordered[-1]), 3)
+    }
+
+
+class Bench:
+    """Shared configuration and helpers for all scenarios."""
+    
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.workdir = Path(args.workdir or tempfile.mkdtemp(prefix="neurolitrag_bench_"))
+        self.profiles = dict(DEFAULT_PROFILES)
+        for endpoint in ("embed", "rerank", "chat"):
+            base = self.profiles[endpoint]
+            self.profiles[endpoint] = LatencyProfile(
+                median_ms=getattr(args, f"{endpoint}_ms", None) or base.median_ms,
+                sigma=args.sigma,
+                per_item_ms=base.per_item_ms,
+                error_rate=args.error_rate,
+                error_statuses=base.error_statuses
+            )
+    
+    def client(self, time_scale: float = None) -> FakeCohereClient:
+        return FakeCohereClient(
+            dim=self.args.dim,
+            profiles=self.profiles,
+            time_scale=self.args.time_scale if time_scale is None else time_scale,
+            seed=self.args.seed
+        )
+    
+    def rag(self, name: str, client: FakeCohereClient) -> NeuroLitRAG:
+        directory = self.workdir / name
+        shutil.rmtree(directory, ignore_errors=True)
+        rag = NeuroLitRAG(
+            embedding_cache_dir=None,
+            answer_cache_threshold=None,
+            tracing=True,
+            vector_backend=self.args.backend,
+            vector_store_options={"persist_directory": str(directory)},
+            cohere_client=client,
+            cohere_async_client=FakeAsyncCohereClient(client)
+        )
+        rag.embedder.max_concurrency = self.args.embed_concurrency
+        rag.tracer.registry = MetricsRegistry()
+        return rag
+    
+    def ingest(self, rag: NeuroLitRAG, n: int) -> float:
+        """Ingest n synthetic chunks in batches; returns wall seconds."""
+        started = time.perf_counter()
+        batch: List[Chunk] = []
+        for chunk in synthetic_chunks(n, seed=self.args.seed):
+            # Batches end on paper boundaries (ingest removes a paper's missing chunks)
+            if len(batch) >= self.args.batch_size and chunk.paper_id != batch[-1].paper_id:
+                rag.ingest(batch)
+                batch = []
+            batch.append(chunk)
+        if batch:
+            rag.ingest(batch)
+        return time.perf_counter() - started
+    
+    # -- Scenarios --
+    
+    def scenario_ingestion(self) -> Dict[str, Any]:
+        results = {}
+        for n in self.args.ingest_sizes:
+            client = self.client()
+            rag = self.rag(f"ingest_{n}", client)
+            wall = self.ingest(rag, n)
+            results[str(n)] = {
+                "chunks": n,
+                "wall_seconds": round(wall, 3),
+                "chunks_per_second": round(n / wall, 1),
+                "api_calls": dict(client.calls),
+                "api_errors": dict(client.errors),
+                "stages": rag.tracer.registry.to_dict()["stages"]
+            }
+            print(f"  ingestion {n:>9,} chunks: {n / wall:,.0f} chunks/s")
+            shutil.rmtree(self.workdir / f"ingest_{n}", ignore_errors=True)
+        return results
+    
+    def query_rag(self) -> NeuroLitRAG:
+        """A corpus for the query scenarios, ingested without simulated latency."""
+        if not hasattr(self, "_query_rag"):
+            rag = self.rag("query_corpus", self.client(time_scale=0.0))
+            self.ingest(rag, self.args.query_corpus)
+            rag.embedder.client = rag.reranker.client = rag.generator.client = self.client()
+            rag.tracer.registry = MetricsRegistry()
+            self._query_rag = rag
+        return self._query_rag
+    
+    def scenario_query(self) -> Dict[str, Any]:
+        rag = self.query_rag()
+        totals, stages, errors = [], {}, 0
+        
+        for question in synthetic_questions(self.args.queries, seed=self.args.seed + 1):
+            started = time.perf_counter()
+            try:
+                result = rag.query(question, include_trace=True)
+            except Exception:
+                errors += 1
+                continue
+            totals.append((time.perf_counter() - started) * 1000)
+            for span in result["trace"]["spans"]:
+                stages.setdefault(span["name"], []).append(span["duration_ms"])
+        
+        summary = summarize(totals)
+        print(f"  single query: p50 {summary.get('p50_ms')} ms, p99 {summary.get('p99_ms')} ms")
+        return {
+            "corpus": self.args.query_corpus,
+            "total": summary,
+            "stages": {name: summarize(values) for name, values in stages.items()},
+            "error_rate": round(errors / max(1, self.args.queries), 4)
+        }
+    
+    def scenario_concurrency(self) -> Dict[str, Any]:
+        rag = self.query_rag()
+        questions = synthetic_questions(self.args.queries, seed=self.args.seed + 2)
+        results = {}
+        
+        for sessions in self.args.concurrency:
+            latencies, errors = [], 0
+            
+            def session(question: str):
+                started = time.perf_counter()
+                try:
+                    rag.query(question)
+                    return (time.perf_counter() - started) * 1000, False
+                except Exception:
+                    return (time.perf_counter() - started) * 1000, True
+            
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                for latency, failed in pool.map(session, questions):
+                    latencies.append(latency)
+                    errors += failed
+            wall = time.perf_counter() - started
+            
+            results[str(sessions)] = {
+                "sessions": sessions,
+                "queries": len(questions),
+                "queries_per_second": round(len(questions) / wall, 2),
+                "latency": summarize(latencies),
+                "error_rate": round(errors / len(questions), 4)
+            }
+            print(f"  {sessions:>3} sessions: {len(questions) / wall:.2f} queries/s")
+        return results
+    
+    def scenario_vector_store(self) -> Dict[str, Any]:
+        """Raw VectorStore query latency as the corpus grows (no API calls)."""
+        rng = np.random.default_rng(self.args.seed)
+        queries = rng.standard_normal((self.args.queries, self.args.dim), dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        
+        results = {}
+        directory = self.workdir / "vector_store"
+        shutil.rmtree(directory, ignore_errors=True)
+        store = VectorStore(backend=self.args.backend, persist_directory=str(directory))
+        size = 0
+        
+        for target in sorted(self.args.store_sizes):
+            started = time.perf_counter()
+            while size < target:
+                n = min(self.args.batch_size, target - size)
+                vectors = rng.standard_normal((n, self.args.dim), dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                store.add(
+                    ids=[f"v{size + i}" for i in range(n)],
+                    embeddings=vectors.tolist(),
+                    texts=[""] * n,
+                    metadatas=[{"pmid": f"v{size + i}", "year": "2020"} for i in range(n)]
+                )
+                size += n
+            add_seconds = time.perf_counter() - started
+            
+            latencies = []
+            for q in queries:
+                t0 = time.perf_counter()
+                store.query(q.tolist(), top_k=self.args.top_k)
+                latencies.append((time.perf_counter() - t0) * 1000)
+            
+            results[str(target)] = {
+                "vectors": target,
+                "add_seconds": round(add_seconds, 3),
+                "query": summarize(latencies)
+            }
+            print(f"  vector store {target:>9,}: p50 {results[str(target)]['query']['p50_ms']} ms")
+        
+        shutil.rmtree(directory, ignore_errors=True)
+        return results
+    
+    def scenario_memory(self) -> Dict[str, Any]:
+        """
+        Chunk + metadata memory per million chunks, and stored metadata
+        bytes per chunk, with full per-chunk metadata vs the paper table.
+        Chunk texts are shared by both layouts and not counted.
+        """
+        n = self.args.memory_chunks
+        chunks = list(synthetic_chunks(n, seed=self.args.seed,
+                                       chunks_per_paper=self.args.chunks_per_paper))
+        # Paper fields as a parser hands them over (fresh strings per paper)
+        papers = {c.paper_id: json.loads(json.dumps(c.paper.to_dict())) for c in chunks}
+        hashes = [c.content_hash for c in chunks]
+        
+        def before():
+            objects, records = [], []
+            for c, h in zip(chunks, hashes):
+                meta = {**papers[c.paper_id]}
+                if c.section is not None:
+                    meta.update(section=c.section, chunk_index=c.chunk_index)
+                objects.append(_LegacyChunk(c.chunk_id, c.paper_id, c.text, meta))
+                records.append({**meta, "content_hash": h})
+            return objects, VectorStore._clean_metadatas(records)
+        
+        def after():
+            table = PaperTable()
+            metas = {pmid: PaperMeta.from_dict(p) for pmid, p in papers.items()}
+            table.put(metas.values())
+            objects = [
+                Chunk(c.chunk_id, c.paper_id, c.text, metas[c.paper_id], c.section, c.chunk_index)
+                for c in chunks
+            ]
+            records = [{**c.record_metadata(), "content_hash": h} for c, h in zip(objects, hashes)]
+            return table, objects, VectorStore._clean_metadatas(records)
+        
+        results = {}
+        for name, build in (("before", before), ("after", after)):
+            stored = build()[-1]
+            storage = sum(len(json.dumps(m)) for m in stored)
+            if name == "after":
+                storage += sum(len(json.dumps(p)) for p in papers.values())
+            results[name] = {
+                "mb_per_million_chunks": round(traced_bytes(build) / n * 1e6 / 2**20, 1),
+                "stored_metadata_bytes_per_chunk": round(storage / n, 1)
+            }
+        results["chunks"] = n
+        results["chunks_per_paper"] = self.args.chunks_per_paper
+        results["memory_reduction"] = round(
+            1 - results["after"]["mb_per_million_chunks"] / results["before"]["mb_per_million_chunks"], 3
+        )
+        print(f"  memory per 1M chunks: {results['before']['mb_per_million_chunks']:,.0f} MB -> "
+              f"{results['after']['mb_per_million_chunks']:,.0f} MB")
+        return results
+    
+    def scenario_cascade(self) -> Dict[str, Any]:
+        """
+        Cascade reranking vs. reranking all retrieved candidates: how often
+        the Cohere call is skipped or shrunk, and how much the final top-n
+        changes (overlap, same top-1, identical order).
+        
+        Both sides use the fake reranker, whose scores are lexical, so the
+        agreement here says nothing about agreement with Cohere Rerank.
+        """
+        rag = self.query_rag()
+        client = self.client(time_scale=0.0)
+        clients = {"client": client, "async_client": FakeAsyncCohereClient(client)}
+        embedder = CohereEmbedder(**clients)
+        reranker = CohereReranker(**clients)
+        cascade = RerankCascade(**self.args.cascade_options)
+        top_n = rag.top_n_rerank
+        
+        overlaps, top1, identical = [], 0, 0
+        questions = synthetic_questions(self.args.queries, seed=self.args.seed + 3)
+        for question in questions:
+            retrieved = rag.vector_store.query(embedder.embed_query(question), top_k=rag.top_k_retrieve)
+            full = [retrieved[r.index]["id"]
+                    for r in reranker.rerank_with_metadata(question, retrieved, top_n=top_n)]
+            
+            plan = cascade.plan(question, retrieved, top_n)
+            if plan.skip:
+                chosen = [d["id"] for d in plan.candidates[:top_n]]
+            else:
+                chosen = [plan.candidates[r.index]["id"]
+                          for r in reranker.rerank_with_metadata(question, plan.candidates, top_n=top_n)]
+            
+            overlaps.append(len(set(full) & set(chosen)) / max(1, len(full)))
+            top1 += bool(full) and bool(chosen) and full[0] == chosen[0]
+            identical += full == chosen
+        
+        n = max(1, len(questions))
+        mean_overlap = float(np.mean(overlaps)) if overlaps else 1.0
+        results = {
+            **cascade.stats(),
+            "top_n": top_n,
+            "mean_overlap_at_n": round(mean_overlap, 4),
+            "min_overlap_at_n": round(min(overlaps), 4) if overlaps else 1.0,
+            "top1_agreement": round(top1 / n, 4),
+            "identical_order": round(identical / n, 4),
+            "reranker": "fake",
+            "tolerance": self.args.cascade_tolerance,
+            "within_tolerance_vs_fake_reranker": mean_overlap >= self.args.cascade_tolerance
+        }
+        print(f"  cascade: skipped {results['skip_rate']:.1%}, shrunk {results['shrink_rate']:.1%}, "
+              f"overlap@{top_n} {mean_overlap:.3f}, top-1 {results['top1_agreement']:.1%}")
+        return results
+    
+    def scenario_sharding(self) -> Dict[str, Any]:
+        """
+        Single numpy index vs. hash-sharded numpy shards (thread and process
+        fan-out): build time, query latency and whether results are equal.
+        """
+        rng = np.random.default_rng(self.args.seed)
+        n, dim = self.args.shard_corpus, self.args.dim
+        queries = rng.standard_normal((self.args.queries, dim), dtype=np.float32).tolist()
+        
+        configs = {
+            "single": {"backend": "numpy"},
+            "threads": {"backend": "sharded", "num_shards": self.args.shards},
+            "processes": {"backend": "sharded", "num_shards": self.args.shards, "executor": "process"}
+        }
+        results, baseline = {}, None
+        for name, options in configs.items():
+            directory = self.workdir / f"sharding_{name}"
+            shutil.rmtree(directory, ignore_errors=True)
+            store = VectorStore(persist_directory=str(directory), **options)
+            
+            vectors_rng = np.random.default_rng(self.args.seed + 1)
+            started = time.perf_counter()
+            for start in range(0, n, self.args.batch_size):
+                size = min(self.args.batch_size, n - start)
+                vectors = vectors_rng.standard_normal((size, dim), dtype=np.float32)
+                store.add(
+                    ids=[f"v{start + i}" for i in range(size)],
+                    embeddings=vectors.tolist(),
+                    texts=[""] * size,
+                    metadatas=[{"pmid": f"v{start + i}"} for i in range(size)]
+                )
+            add_seconds = time.perf_counter() - started
+            
+            # Warm-up opens shards in the worker processes
+            store.query(queries[0], top_k=self.args.top_k)
+            latencies, hits = [], []
+            for q in queries:
+                t0 = time.perf_counter()
+                hits.append([h["id"] for h in store.query(q, top_k=self.args.top_k)])
+                latencies.append((time.perf_counter() - t0) * 1000)
+            
+            baseline = baseline or hits
+            results[name] = {
+                "add_seconds": round(add_seconds, 3),
+                "query": summarize(latencies),
+                "equal_to_single": hits == baseline
+            }
+            print(f"  {name:>9}: add {add_seconds:.2f}s, p50 {results[name]['query']['p50_ms']} ms, "
+                  f"equal {results[name]['equal_to_single']}")
+            store.close()
+            shutil.rmtree(directory, ignore_errors=True)
+        
+        results["vectors"] = n
+        results["shards"] = self.args.shards
+        return results
+    
+    def scenario_snapshot(self) -> Dict[str, Any]:
+        """
+        Export an ingested index to a snapshot file and provision fresh
+        nodes from it: file size, export/restore time, API calls made by
+        the new node and agreement of its search results with the source.
+        """
+        n = self.args.snapshot_chunks
+        source = self.rag("snapshot_source", self.client(time_scale=0))
+        self.ingest(source, n)
+        questions = synthetic_questions(50, seed=self.args.seed + 1)
+        vectors = source.embedder.embed_queries(questions)
+        expected = [[h["id"] for h in hits]
+                    for hits in source.vector_store.query_many(vectors, top_k=self.args.top_k)]
+        
+        results: Dict[str, Any] = {"chunks": n}
+        for dtype in ("float32", "float16"):
+            path = self.workdir / f"snapshot.{dtype}"
+            exported = source.export_snapshot(str(path), dtype=dtype)
+            
+            client = self.client(time_scale=0)
+            node = self.rag(f"snapshot_node_{dtype}", client)
+            restored = node.restore_snapshot(str(path))
+            hits = node.vector_store.query_many(vectors, top_k=self.args.top_k)
+            overlap = float(np.mean([
+                len(set(e) & {h["id"] for h in got}) / max(len(e), 1)
+                for e, got in zip(expected, hits)
+            ]))
+            
+            results[dtype] = {
+                "bytes": exported["bytes"],
+                "bytes_per_chunk": round(exported["bytes"] / max(n, 1), 1),
+                "export_seconds": exported["seconds"],
+                "restore_seconds": restored["seconds"],
+                "restore_minutes_per_million": round(restored["seconds"] / max(n, 1) * 1e6 / 60, 2),
+                "api_calls": dict(client.calls),
+                f"overlap@{self.args.top_k}": round(overlap, 4)
+            }
+            print(f"  {dtype}: {exported['bytes'] / 1e6:.1f} MB, export {exported['seconds']:.1f}s, "
+                  f"restore {restored['seconds']:.1f}s "
+                  f"({results[dtype]['restore_minutes_per_million']} min/M), "
+                  f"overlap {overlap:.3f}, calls {client.calls}")
+            path.unlink(missing_ok=True)
+        return results
+    
+    def scenario_projection(self) -> Dict[str, Any]:
+        """
+        Candidate embedding projections (PCA / truncation) of an ingested
+        corpus: recall@k against full-width search, vector bytes and
+        query latency per dimension.
+        """
+        rag = self.rag("projection_source", self.client(time_scale=0))
+        self.ingest(rag, self.args.projection_corpus)
+        report = rag.evaluate_projections(
+            questions=synthetic_questions(self.args.queries, seed=self.args.seed + 1),
+            dims=self.args.projection_dims,
+            top_k=self.args.top_k,
+            workdir=str(self.workdir / "projection")
+        )
+        
+        recall = f"recall@{self.args.top_k}"
+        for name, row in report.items():
+            if isinstance(row, dict):
+                print(f"  {name:>12}: {recall} {row[recall]:.3f}, "
+                      f"{row['vector_bytes'] / 1e6:.1f} MB ({row['size_ratio']:.0%}), "
+                      f"p50 {row['p50_ms']} ms, p95 {row['p95_ms']} ms")
+        print(f"  recommended: {report['recommended']}")
+        return report
+
+
+SCENARIOS = {
+    "ingestion": Bench.scenario_ingestion,
+    "query": Bench.scenario_query,
+    "concurrency": Bench.scenario_concurrency,
+    "vector_store": Bench.scenario_vector_store,
+    "memory": Bench.scenario_memory,
+    "cascade": Bench.scenario_cascade,
+    "sharding": Bench.scenario_sharding,
+    "snapshot": Bench.scenario_snapshot,
+    "projection": Bench.scenario_projection
+}
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline NeuroLitRAG benchmarks")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--workdir", default=None, help="Scratch directory for indexes")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--ingest-sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--store-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--query-corpus", type=int, default=10_000)
+    parser.add_argument("--memory-chunks", type=int, default=200_000)
+    parser.add_argument("--chunks-per-paper", type=int, default=8)
+    parser.add_argument("--shard-corpus", type=int, default=200_000)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--snapshot-chunks", type=int, default=100_000)
+    parser.add_argument("--projection-corpus", type=int, default=50_000)
+    parser.add_argument("--projection-dims", type=int, nargs="+", default=[256, 384, 512])
+    parser.add_argument("--cascade-options", type=json.loads, default={},
+                        help='RerankCascade options as JSON, e.g. \'{"skip_margin": 0.4}\'')
+    parser.add_argument("--cascade-tolerance", type=float, default=0.9,
+                        help="Minimum mean top-n overlap with full (fake) reranking")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--embed-concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=1024)
+    # Simulated API behaviour
+    parser.add_argument("--embed-ms", type=float, default=None)
+    parser.add_argument("--rerank-ms", type=float, default=None)
+    parser.add_argument("--chat-ms", type=float, default=None)
+    parser.add_argument("--sigma", type=float, default=0.35, help="Lognormal latency spread")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiply simulated latencies (0 = no sleeping)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    bench = Bench(args)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": vars(args),
+        "profiles": {name: asdict(p) for name, p in bench.profiles.items()},
+        "results": {},
+        "scenario_seconds": {}
+    }
+    
+    try:
+        for name in args.scenarios:
+            print(f"[{name}]")
+            started = time.perf_counter()
+            report["results"][name] = SCENARIOS[name](bench)
+            report["scenario_seconds"][name] = round(time.perf_counter() - started, 3)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(bench.workdir, ignore_errors=True)
+    
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
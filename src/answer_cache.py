@@ -0,0 +1,129 @@
+"""Semantic Answer Cache Module"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class CachedAnswer:
+    """A cached query result and the evidence it was generated from."""
+    embedding: np.ndarray
+    chunk_ids: FrozenSet[str]
+    use_reranking: bool
+    result: Dict[str, Any]
+    created: float
+
+
+class SemanticAnswerCache:
+    """
+    Caches full answers keyed on query-embedding similarity.
+    
+    A lookup hits when a cached query is at least `threshold` cosine-similar
+    to the new one AND the new query retrieved the same candidate chunks, so
+    paraphrases reuse an answer only when the evidence is identical.
+    Entries expire after `ttl_seconds`; the least recently used entry is
+    evicted beyond `max_entries`.
+    """
+    
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600.0,
+                 max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        
+        # Stacked embeddings for vectorised lookup; rebuilt lazily
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def lookup(self, embedding: List[float], chunk_ids: Iterable[str],
+               use_reranking: bool) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a similar query with the same evidence."""
+        query = self._normalize(embedding)
+        evidence = frozenset(chunk_ids)
+        
+        with self._lock:
+            self._expire()
+            
+            if self._entries:
+                matrix = self._get_matrix()
+                similarities = matrix @ query
+                
+                for pos in np.argsort(-similarities):
+                    if similarities[pos] < self.threshold:
+                        break
+                    entry_id = self._matrix_ids[pos]
+                    entry = self._entries[entry_id]
+                    if entry.use_reranking == use_reranking and entry.chunk_ids == evidence:
+                        self._entries.move_to_end(entry_id)
+                        self.hits += 1
+                        return entry.result
+            
+            self.misses += 1
+            return None
+    
+    def put(self, embedding: List[float], chunk_ids: Iterable[str],
+            use_reranking: bool, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[self._next_id] = CachedAnswer(
+                embedding=self._normalize(embedding),
+                chunk_ids=frozenset(chunk_ids),
+                use_reranking=use_reranking,
+                result=result,
+                created=time.monotonic()
+            )
+            self._next_id += 1
+            
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+    
+    def invalidate(self, chunk_ids: Iterable[str]) -> int:
+        """Drop every entry whose evidence includes one of `chunk_ids`."""
+        changed = set(chunk_ids)
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e.chunk_ids & changed]
+            for k in stale:
+                del self._entries[k]
+            if stale:
+                self._matrix = None
+            return len(stale)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+    
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        stale = [k for k, e in self._entries.items() if e.created < cutoff]
+        for k in stale:
+            del self._entries[k]
+        if stale:
+            self._matrix = None
+    
+    def _get_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[k].embedding for k in self._matrix_ids])
+        return self._matrix
+    
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
@@ -0,0 +1,401 @@
+"""Streaming Bulk Ingestion for PubMed Baseline XML and JSONL"""
+
+import gzip
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .data_ingestion import Chunk, ChunkDeduplicator, Paper
+
+
+def _open(path: str):
+    return gzip.open(path, "rb") if str(path).endswith(".gz") else open(path, "rb")
+
+
+def _text(elem: Optional[ET.Element]) -> str:
+    return "".join(elem.itertext()).strip() if elem is not None else ""
+
+
+def _parse_article(article: ET.Element) -> Optional[Paper]:
+    """Extract a Paper from one <PubmedArticle>; None if it has no abstract."""
+    citation = article.find("MedlineCitation")
+    if citation is None:
+        return None
+    info = citation.find("Article")
+    if info is None:
+        return None
+    
+    sections = []
+    for part in info.findall("Abstract/AbstractText"):
+        text = _text(part)
+        label = part.get("Label")
+        if text:
+            sections.append(f"{label}: {text}" if label else text)
+    if not sections:
+        return None
+    
+    authors = []
+    for author in info.findall("AuthorList/Author"):
+        last = author.findtext("LastName")
+        if last:
+            initials = author.findtext("Initials") or ""
+            authors.append(f"{last} {initials}".strip())
+        elif author.findtext("CollectiveName"):
+            authors.append(author.findtext("CollectiveName"))
+    
+    pub_date = info.find("Journal/JournalIssue/PubDate")
+    year = ""
+    if pub_date is not None:
+        year = pub_date.findtext("Year") or (pub_date.findtext("MedlineDate") or "")[:4]
+    
+    doi = None
+    for elem in article.findall("PubmedData/ArticleIdList/ArticleId"):
+        if elem.get("IdType") == "doi":
+            doi = elem.text
+    if doi is None:
+        for elem in info.findall("ELocationID"):
+            if elem.get("EIdType") == "doi":
+                doi = elem.text
+    
+    return Paper(
+        pmid=citation.findtext("PMID", "").strip(),
+        title=_text(info.find("ArticleTitle")),
+        abstract="\n".join(sections),
+        authors=authors,
+        year=year,
+        journal=info.findtext("Journal/Title", "").strip(),
+        doi=doi
+    )
+
+
+def iter_pubmed_xml(path: str) -> Iterator[Paper]:
+    """
+    Stream papers from a PubMed baseline/update file (.xml or .xml.gz).
+    
+    Uses iterparse and clears every finished article, so memory stays
+    flat regardless of file size.
+    """
+    with _open(path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        
+        for event, elem in context:
+            if event == "end" and elem.tag == "PubmedArticle":
+                paper = _parse_article(elem)
+                if paper is not None:
+                    yield paper
+                root.clear()
+
+
+def iter_jsonl(path: str) -> Iterator[Paper]:
+    """Stream papers from JSON lines with Paper's field names."""
+    fields = set(Paper.__dataclass_fields__)
+    
+    with _open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield Paper(**{k: v for k, v in record.items() if k in fields})
+
+
+def iter_papers(path: str) -> Iterator[Paper]:
+    """Pick the reader by file extension."""
+    name = str(path).lower()
+    if name.endswith((".jsonl", ".jsonl.gz", ".ndjson")):
+        return iter_jsonl(path)
+    return iter_pubmed_xml(path)
+
+
+@dataclass
+class _FileDone:
+    index: int
+    path: str
+    papers: int
+    seconds: float
+    error: Optional[str] = None
+
+
+def _parse_file(index: int, path: str, out: "queue.Queue", batch_size: int):
+    """Process-pool worker: parse one file and stream paper batches into `out`."""
+    batch: List[Paper] = []
+    papers = 0
+    seconds = 0.0
+    t0 = time.perf_counter()
+    try:
+        for paper in iter_papers(path):
+            batch.append(paper)
+            papers += 1
+            if len(batch) >= batch_size:
+                # Time blocked on a full queue is not parse time
+                seconds += time.perf_counter() - t0
+                out.put(batch)
+                batch = []
+                t0 = time.perf_counter()
+        seconds += time.perf_counter() - t0
+        if batch:
+            out.put(batch)
+        out.put(_FileDone(index, path, papers, seconds))
+    except Exception as e:
+        seconds += time.perf_counter() - t0
+        out.put(_FileDone(index, path, papers, seconds, error=f"{type(e).__name__}: {e}"))
+
+
+@dataclass
+class StageStats:
+    """Items and busy time for one pipeline stage."""
+    items: int = 0
+    busy_seconds: float = 0.0
+    
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else 0.0
+        }
+
+
+@dataclass
+class _Run:
+    stats: Dict[str, StageStats] = field(default_factory=lambda: {
+        s: StageStats() for s in ("parse", "chunk", "plan", "embed", "store")
+    })
+    counts: Dict[str, int] = field(default_factory=lambda: {
+        "papers": 0, "chunks": 0, "added": 0, "updated": 0, "skipped": 0, "removed": 0
+    })
+    errors: List[str] = field(default_factory=list)
+    dedup: Optional[ChunkDeduplicator] = None
+    failed: threading.Event = field(default_factory=threading.Event)
+
+
+class BulkIngestor:
+    """
+    Pipelined, memory-bounded ingestion:
+        
+        parse (process pool) -> chunk -> plan + embed -> store
+    
+    Stages are connected by bounded queues holding fixed-size batches, so
+    peak memory depends on `batch_size * queue_size`, not on corpus size.
+    Unchanged chunks are skipped via `NeuroLitRAG.plan_ingest`, and
+    stored chunks a re-ingested paper no longer produces are deleted;
+    batches therefore end on paper boundaries (a batch may exceed
+    `batch_size` by the rest of its last paper).
+    
+    A failing stage, or a parse worker that dies, sets `failed`: the run
+    then stops making Embed calls and drains. "parse" busy time is summed
+    over the parse workers.
+    
+    Chunk dedup state is capped at `dedup_max_bytes` (oldest chunks are
+    forgotten), so it does not grow with the corpus either.
+    
+    On a new index with a projection configured, the projection is first
+    fitted on `projection_sample` chunks drawn uniformly from all files
+    (one extra, serial parse pass; only the sample is embedded).
+    """
+    
+    def __init__(self, rag, batch_size: int = 512, parse_workers: Optional[int] = None,
+                 queue_size: int = 4, projection_sample: int = 20000,
+                 dedup_max_bytes: int = ChunkDeduplicator.DEFAULT_MAX_BYTES):
+        self.rag = rag
+        self.batch_size = batch_size
+        self.parse_workers = parse_workers or max(1, (multiprocessing.cpu_count() or 2) - 1)
+        self.queue_size = queue_size
+        self.projection_sample = projection_sample
+        self.dedup_max_bytes = dedup_max_bytes
+    
+    def ingest_files(self, paths: Iterable[str]) -> Dict[str, Any]:
+        """Ingest PubMed XML / JSONL files; returns counts and per-stage throughput."""
+        paths = [str(p) for p in paths]
+        started = time.perf_counter()
+        projection = None
+        if self.rag.projection_pending:
+            papers = (paper for path in paths for paper in iter_papers(path))
+            projection = self.rag.fit_projection(self.rag.chunker.chunk_papers(papers),
+                                                 sample_size=self.projection_sample)
+        run = _Run(dedup=self.rag.chunker.new_deduplicator(self.dedup_max_bytes))
+        
+        embed_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        store_q: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        
+        workers = [
+            threading.Thread(target=self._embed_stage, args=(run, embed_q, store_q), daemon=True),
+            threading.Thread(target=self._store_stage, args=(run, store_q), daemon=True)
+        ]
+        for w in workers:
+            w.start()
+        
+        with multiprocessing.Manager() as manager:
+            papers_q = manager.Queue(maxsize=self.queue_size)
+            with ProcessPoolExecutor(max_workers=min(self.parse_workers, max(1, len(paths)))) as pool:
+                futures = {
+                    i: pool.submit(_parse_file, i, path, papers_q, self.batch_size)
+                    for i, path in enumerate(paths)
+                }
+                self._chunk_stage(run, paths, futures, papers_q, embed_q)
+        
+        self._put(run, embed_q, None)
+        for w in workers:
+            w.join()
+        
+        wall = time.perf_counter() - started
+        return {
+            **run.counts,
+            "files": len(paths),
+            "errors": run.errors,
+            "wall_seconds": round(wall, 3),
+            "chunks_per_second": round(run.counts["chunks"] / wall, 1) if wall else 0.0,
+            "projection": projection,
+            "stages": {name: s.to_dict() for name, s in run.stats.items()}
+        }
+    
+    def _chunk_stage(self, run: _Run, paths: List[str], futures: Dict[int, Future],
+                     papers_q, embed_q: "queue.Queue"):
+        """Collect parsed batches, chunk them and emit fixed-size chunk batches."""
+        buffer: List[Chunk] = []
+        # Files whose end marker has not arrived yet
+        remaining = dict(futures)
+        
+        while remaining:
+            try:
+                item = papers_q.get(timeout=0.5)
+            except queue.Empty:
+                # A worker that died (crash, OOM kill) never sends its marker
+                for index, future in list(remaining.items()):
+                    if future.done() and future.exception() is not None:
+                        del remaining[index]
+                        run.errors.append(f"{paths[index]}: parse worker died: {future.exception()!r}")
+                        run.failed.set()
+                continue
+            
+            if isinstance(item, _FileDone):
+                remaining.pop(item.index, None)
+                run.stats["parse"].busy_seconds += item.seconds
+                if item.error:
+                    run.errors.append(f"{item.path}: {item.error}")
+                continue
+            
+            if run.failed.is_set():
+                # Keep draining so parse workers never block on a full queue
+                continue
+            
+            run.stats["parse"].items += len(item)
+            run.counts["papers"] += len(item)
+            
+            for paper in item:
+                t0 = time.perf_counter()
+                buffer.extend(self.rag.chunker.iter_chunks(paper, run.dedup))
+                run.stats["chunk"].busy_seconds += time.perf_counter() - t0
+                
+                # Never split a paper: plan_ingest needs all of its chunks
+                if len(buffer) >= self.batch_size:
+                    run.stats["chunk"].items += len(buffer)
+                    self._put(run, embed_q, buffer)
+                    buffer = []
+        
+        if buffer and not run.failed.is_set():
+            run.stats["chunk"].items += len(buffer)
+            self._put(run, embed_q, buffer)
+    
+    def _embed_stage(self, run: _Run, embed_q: "queue.Queue", store_q: "queue.Queue"):
+        try:
+            while True:
+                batch = embed_q.get()
+                if batch is None:
+                    break
+                if run.failed.is_set():
+                    # No more paid Embed calls once a stage has failed
+                    continue
+                
+                t0 = time.perf_counter()
+                pending, stale, counts = self.rag.plan_ingest(batch)
+                run.stats["plan"].busy_seconds += time.perf_counter() - t0
+                run.stats["plan"].items += len(batch)
+                for key, value in counts.items():
+                    run.counts[key] += value
+                run.counts["chunks"] += len(batch)
+                
+                if not pending and not stale:
+                    continue
+                
+                embeddings: List[List[float]] = []
+                if pending:
+                    t0 = time.perf_counter()
+                    embeddings = self.rag.embedder.embed_documents(
+                        [c.text for c in pending], show_progress=False
+                    )
+                    run.stats["embed"].busy_seconds += time.perf_counter() - t0
+                    run.stats["embed"].items += len(pending)
+                
+                self._put(run, store_q, (pending, embeddings, stale))
+        except Exception as e:
+            run.errors.append(f"embed: {type(e).__name__}: {e}")
+            run.failed.set()
+            while embed_q.get() is not None:
+                pass
+        finally:
+            self._put(run, store_q, None, force=True)
+    
+    def _store_stage(self, run: _Run, store_q: "queue.Queue"):
+        try:
+            while True:
+                item = store_q.get()
+                if item is None:
+                    break
+                
+                chunks, embeddings, stale = item
+                t0 = time.perf_counter()
+                if chunks:
+                    self.rag.store_chunks(chunks, embeddings)
+                if stale:
+                    self.rag.remove_chunks(stale)
+                run.stats["store"].busy_seconds += time.perf_counter() - t0
+                run.stats["store"].items += len(chunks)
+        except Exception as e:
+            run.errors.append(f"store: {type(e).__name__}: {e}")
+            run.failed.set()
+            # Keep draining so the embed stage never blocks on a full queue
+            while store_q.get() is not None:
+                pass
+    
+    @staticmethod
+    def _put(run: _Run, q: "queue.Queue", item, force: bool = False):
+        """Blocking put that gives up once a downstream stage has failed."""
+        while True:
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if run.failed.is_set() and not force:
+                    return
+
+
+def main():
+    import argparse
+    from .pipeline import NeuroLitRAG
+    
+    parser = argparse.ArgumentParser(description="Bulk-ingest PubMed XML / JSONL files")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--embed-concurrency", type=int, default=4)
+    parser.add_argument("--dedup-max-mb", type=int,
+                        default=ChunkDeduplicator.DEFAULT_MAX_BYTES >> 20)
+    args = parser.parse_args()
+    
+    rag = NeuroLitRAG()
+    rag.embedder.max_concurrency = args.embed_concurrency
+    ingestor = BulkIngestor(rag, batch_size=args.batch_size,
+                            parse_workers=args.parse_workers, queue_size=args.queue_size,
+                            dedup_max_bytes=args.dedup_max_mb << 20)
+    print(json.dumps(ingestor.ingest_files(args.paths), indent=2))
+
+
+if __name__ == "__main__":
+    main()
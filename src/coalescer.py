@@ -0,0 +1,145 @@
+"""Micro-Batching Coalescer for Concurrent Query Embeddings"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+
+class EmbedCoalescer:
+    """
+    Merges concurrent single-text embed requests into batched calls.
+    
+    The first request opens a window of `window_ms`; everything submitted
+    before it closes (or until `max_batch` distinct texts are waiting) goes
+    out as one `embed_batch(texts)` call. Identical texts share one slot.
+    `embed` waits at most the window plus `timeout` and then raises
+    TimeoutError, so `embed_batch` should finish within `timeout`,
+    retries included. Batches are sent from a small
+    pool, so a slow call does not hold up the next window.
+    
+    If the flusher thread fails, the requests it held fail with its error
+    and a new flusher takes over (`submit` also restarts a dead one).
+    """
+    
+    DEFAULT_TIMEOUT = 60.0
+    
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]],
+                 window_ms: float = 5.0, max_batch: int = 96, max_inflight: int = 8,
+                 timeout: Optional[float] = None):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        
+        self.embed_batch = embed_batch
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout or self.DEFAULT_TIMEOUT
+        
+        self._pending: Dict[str, Future] = {}
+        self._window_start = 0.0
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="embed-coalescer")
+        
+        self.calls = 0
+        self.deduplicated = 0
+        self.requests = 0
+        self.texts_sent = 0
+        self.restarts = 0
+        
+        self._flusher: Optional[threading.Thread] = None
+        self._start_flusher()
+    
+    @property
+    def max_wait(self) -> float:
+        """Longest a caller waits for one embedding, in seconds."""
+        return self.window + self.timeout
+    
+    def embed(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        """Wait at most `timeout` (default `max_wait`) for the embedding of `text`."""
+        return self.submit(text).result(min(timeout, self.max_wait) if timeout is not None else self.max_wait)
+    
+    def submit(self, text: str) -> Future:
+        """Queue `text`; the future resolves to its embedding."""
+        with self._cond:
+            if not self._flusher.is_alive():
+                self._start_flusher()
+            self.calls += 1
+            future = self._pending.get(text)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            
+            future = Future()
+            if not self._pending:
+                self._window_start = time.monotonic()
+            self._pending[text] = future
+            self._cond.notify()
+            return future
+    
+    def stats(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "calls": self.calls,
+                "deduplicated": self.deduplicated,
+                "api_requests": self.requests,
+                "texts_sent": self.texts_sent,
+                "mean_batch": round(self.texts_sent / self.requests, 2) if self.requests else 0.0,
+                "calls_per_request": round(self.calls / self.requests, 2) if self.requests else 0.0,
+                "restarts": self.restarts
+            }
+    
+    def _start_flusher(self):
+        self._flusher = threading.Thread(target=self._run, name="embed-coalescer", daemon=True)
+        self._flusher.start()
+    
+    def _run(self):
+        try:
+            self._flush_forever()
+        except Exception as e:
+            # Nothing would ever resolve these: fail them, then start over
+            with self._cond:
+                pending, self._pending = self._pending, {}
+                self.restarts += 1
+                self._start_flusher()
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+    
+    def _flush_forever(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                
+                deadline = self._window_start + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                
+                texts = list(self._pending)[:self.max_batch]
+                batch = {t: self._pending.pop(t) for t in texts}
+                if self._pending:
+                    # Overflow starts the next window right away
+                    self._window_start = time.monotonic() - self.window
+                self.requests += 1
+                self.texts_sent += len(batch)
+            
+            try:
+                self._pool.submit(self._send, batch)
+            except Exception as e:
+                for future in batch.values():
+                    future.set_exception(e)
+                raise
+    
+    def _send(self, batch: Dict[str, Future]):
+        try:
+            vectors = self.embed_batch(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        
+        for future, vector in zip(batch.values(), vectors):
+            future.set_result(vector)
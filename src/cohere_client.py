@@ -0,0 +1,200 @@
+"""Shared, Pooled Cohere Clients"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class ConnectionStats:
+    """
+    Counts HTTP requests against new TCP connections and TLS handshakes,
+    using httpcore's `trace` request extension.
+    
+    Under steady load `reuse_ratio` should approach 1.0: nearly every
+    request rides an already-open keep-alive connection.
+    """
+    
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.failed_connections = 0
+        self._lock = threading.Lock()
+    
+    def record(self, event: str):
+        with self._lock:
+            if event == "connection.connect_tcp.complete":
+                self.connections += 1
+            elif event == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+            elif event == "connection.connect_tcp.failed":
+                self.failed_connections += 1
+    
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "failed_connections": self.failed_connections,
+                "reused_requests": reused,
+                "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0
+            }
+
+
+class LazyClient:
+    """
+    Stand-in that builds the real client on first attribute access, so a
+    client that is never used (e.g. the async one of a sync-only caller)
+    costs no import, API key or connection pool.
+    """
+    
+    def __init__(self, build: Callable[[], Any]):
+        self._build = build
+        self._client = None
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, name: str):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._build()
+        return getattr(self._client, name)
+
+
+def lazy_async_client(api_key: Optional[str]) -> LazyClient:
+    """A `cohere.AsyncClient` for `api_key`, created on first use."""
+    def build():
+        if not api_key:
+            raise ValueError("COHERE_API_KEY not found (pass async_client for async calls)")
+        import cohere
+        return cohere.AsyncClient(api_key)
+    return LazyClient(build)
+
+
+class CohereClientFactory:
+    """
+    Builds one `cohere.Client` and one `cohere.AsyncClient` on tuned httpx
+    connection pools, for embed, rerank and chat to share.
+    
+    - `max_connections` / `max_keepalive_connections` size the pool;
+      `keepalive_expiry` is how long idle connections stay open
+    - `timeouts` are per-endpoint timeouts in seconds ("embed", "rerank",
+      "chat"); components apply them per call via `request_options`
+    - Clients are created lazily under a lock and are safe to share across
+      threads; the async client must be used from one event loop at a time
+      (httpx's async pool is bound to the loop that first uses it)
+    """
+    
+    DEFAULT_TIMEOUTS = {"embed": 30.0, "rerank": 30.0, "chat": 120.0}
+    
+    _shared: Dict[str, "CohereClientFactory"] = {}
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, api_key: Optional[str] = None, max_connections: int = 32,
+                 max_keepalive_connections: int = 16, keepalive_expiry: float = 60.0,
+                 connect_timeout: float = 10.0, timeouts: Optional[Dict[str, float]] = None,
+                 http2: bool = False, base_url: Optional[str] = None):
+        self.api_key = api_key or os.getenv("COHERE_API_KEY")
+        if not self.api_key:
+            raise ValueError("COHERE_API_KEY not found")
+        
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.http2 = http2
+        # e.g. a regional endpoint or a proxy
+        self.base_url = base_url
+        
+        self.stats = ConnectionStats()
+        self._client = None
+        self._async_client = None
+        self._http = None
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls, api_key: Optional[str] = None, **options) -> "CohereClientFactory":
+        """Process-wide factory per API key (options apply on first call only)."""
+        key = api_key or os.getenv("COHERE_API_KEY") or ""
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(api_key=key or None, **options)
+            return cls._shared[key]
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import cohere
+                    self._http = self._httpx_client()
+                    self._client = cohere.Client(self.api_key, base_url=self.base_url,
+                                                 httpx_client=self._http)
+        return self._client
+    
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    import cohere
+                    self._async_client = cohere.AsyncClient(
+                        self.api_key, base_url=self.base_url,
+                        httpx_client=self._httpx_client(asynchronous=True)
+                    )
+        return self._async_client
+    
+    def connection_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats.to_dict(),
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections
+        }
+    
+    def close(self):
+        """Close the pooled connections (clients are rebuilt on next use)."""
+        with self._lock:
+            if self._http is not None:
+                self._http.close()
+            self._client = self._http = None
+            # The async pool is closed by its event loop; just drop it
+            self._async_client = None
+    
+    def _httpx_client(self, asynchronous: bool = False):
+        import httpx
+        
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+        timeout = httpx.Timeout(max(self.timeouts.values()), connect=self.connect_timeout)
+        stats = self.stats
+        
+        if asynchronous:
+            async def trace(event: str, info: Dict[str, Any]):
+                stats.record(event)
+            
+            async def on_request(request):
+                stats.count_request()
+                request.extensions["trace"] = trace
+            
+            return httpx.AsyncClient(limits=limits, timeout=timeout, http2=self.http2,
+                                     event_hooks={"request": [on_request]})
+        
+        def trace(event: str, info: Dict[str, Any]):
+            stats.record(event)
+        
+        def on_request(request):
+            stats.count_request()
+            request.extensions["trace"] = trace
+        
+        return httpx.Client(limits=limits, timeout=timeout, http2=self.http2,
+                            event_hooks={"request": [on_request]})
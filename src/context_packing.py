@@ -0,0 +1,110 @@
+"""Token-Budgeted Context Packing"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .data_ingestion import count_tokens
+
+
+@dataclass
+class PackedContext:
+    """Documents that fit the prompt budget, plus token accounting."""
+    docs: List[Dict[str, Any]]
+    tokens: int
+    tokens_saved: int
+
+
+class ContextPacker:
+    """
+    Fits reranked documents into an input-token budget.
+    
+    - Chunks from the same pmid are merged into one document, so they
+      share one citation number
+    - Documents scoring below `min_relative_score` x the best score are
+      dropped (scores come from rerank, or vector search without it)
+    - Documents are added best-first; the first one that does not fit is
+      trimmed to the remaining budget (if at least `min_doc_tokens` remain)
+      and the rest are dropped
+    """
+    
+    # Per-document overhead of the "[n] Author (year) - Journal\nTitle: ..." header
+    HEADER_TOKENS = 20
+    TRIM_MARKER = " [...]"
+    
+    def __init__(self, max_tokens: Optional[int] = 4000, min_relative_score: float = 0.0,
+                 min_doc_tokens: int = 40):
+        self.max_tokens = max_tokens
+        self.min_relative_score = min_relative_score
+        self.min_doc_tokens = min_doc_tokens
+    
+    def pack(self, docs: List[Dict[str, Any]]) -> PackedContext:
+        merged = self._merge_by_paper(docs)
+        original = sum(self._doc_tokens(d) for d in merged)
+        
+        scores = [d["score"] for d in merged if d.get("score") is not None]
+        if scores and self.min_relative_score > 0:
+            cutoff = max(scores) * self.min_relative_score
+            merged = [d for d in merged if d.get("score") is None or d["score"] >= cutoff]
+        
+        packed, used = [], 0
+        for doc in merged:
+            size = self._doc_tokens(doc)
+            if self.max_tokens is None or used + size <= self.max_tokens:
+                packed.append(doc)
+                used += size
+                continue
+            
+            remaining = self.max_tokens - used - self.HEADER_TOKENS
+            if remaining >= self.min_doc_tokens:
+                doc = {**doc, "text": self._trim(doc["text"], remaining)}
+                packed.append(doc)
+                used += self._doc_tokens(doc)
+            break
+        
+        return PackedContext(docs=packed, tokens=used, tokens_saved=original - used)
+    
+    @staticmethod
+    def _merge_by_paper(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Group chunks by pmid, keeping first-appearance (best-first) order."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for i, doc in enumerate(docs):
+            meta = doc.get("metadata") or {}
+            key = meta.get("pmid") or f"doc_{i}"
+            
+            if key not in merged:
+                merged[key] = {**doc, "metadata": meta}
+                continue
+            
+            group = merged[key]
+            text = doc.get("text", "")
+            # Later chunks repeat the paper title; keep it once
+            title_prefix = f"Title: {meta.get('title', '')}\n\n"
+            if text.startswith(title_prefix):
+                text = text[len(title_prefix):]
+            group["text"] = f"{group.get('text', '')}\n...\n{text}"
+            
+            if doc.get("score") is not None:
+                group["score"] = max(group.get("score") or doc["score"], doc["score"])
+        
+        return list(merged.values())
+    
+    def _doc_tokens(self, doc: Dict[str, Any]) -> int:
+        return count_tokens(doc.get("text", "")) + self.HEADER_TOKENS
+    
+    @classmethod
+    def _trim(cls, text: str, max_tokens: int) -> str:
+        """Cut text to at most `max_tokens` (marker included), preferring a sentence boundary."""
+        max_tokens -= count_tokens(cls.TRIM_MARKER)
+        words, kept, tokens = text.split(" "), [], 0
+        for word in words:
+            size = count_tokens(word)
+            if tokens + size > max_tokens:
+                break
+            kept.append(word)
+            tokens += size
+        
+        trimmed = " ".join(kept)
+        sentence_end = trimmed.rfind(". ")
+        if sentence_end > len(trimmed) // 2:
+            trimmed = trimmed[:sentence_end + 1]
+        return trimmed + cls.TRIM_MARKER
@@ -1,10 +1,27 @@
 """Data Ingestion Module with Demo Papers"""
 
+import hashlib
+import json
+import re
+import sys
+import zlib
+from collections import OrderedDict, deque
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 
+import numpy as np
 
-@dataclass
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[])")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (words + punctuation), no tokenizer needed."""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+@dataclass(slots=True)
 class Paper:
     """A scientific paper."""
     pmid: str
@@ -14,39 +31,347 @@ class Paper:
     year: str
     journal: str
     doi: Optional[str] = None
+    # Full-text body as (heading, text) pairs, when available
+    sections: Optional[List[Tuple[str, str]]] = None
     
     def to_dict(self) -> Dict:
         return asdict(self)
 
 
-@dataclass
+class PaperMeta:
+    """
+    Paper-level metadata shared by all chunks of a paper.
+    
+    Journal, author and year strings are interned, so a corpus holds one
+    copy of each distinct value instead of one per paper.
+    """
+    
+    __slots__ = ("pmid", "title", "authors", "year", "journal", "doi")
+    
+    def __init__(self, pmid: str, title: str, authors: Iterable[str] = (),
+                 year: str = "", journal: str = "", doi: Optional[str] = None):
+        self.pmid = pmid
+        self.title = title
+        self.authors = tuple(sys.intern(str(a)) for a in authors)
+        self.year = sys.intern(str(year or ""))
+        self.journal = sys.intern(journal or "")
+        self.doi = doi
+    
+    @classmethod
+    def from_paper(cls, paper: Paper) -> "PaperMeta":
+        return cls(paper.pmid, paper.title, paper.authors, paper.year, paper.journal, paper.doi)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PaperMeta":
+        return cls(data["pmid"], data.get("title", ""), data.get("authors") or (),
+                   data.get("year", ""), data.get("journal", ""), data.get("doi"))
+    
+    def to_dict(self) -> Dict:
+        return {
+            "pmid": self.pmid,
+            "title": self.title,
+            "authors": list(self.authors),
+            "year": self.year,
+            "journal": self.journal,
+            "doi": self.doi
+        }
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PaperMeta) and all(
+            getattr(self, f) == getattr(other, f) for f in self.__slots__
+        )
+    
+    def __reduce__(self):
+        # Rebuild through __init__ so strings are re-interned after pickling
+        return (PaperMeta, tuple(getattr(self, f) for f in self.__slots__))
+
+
+@dataclass(slots=True, init=False)
 class Chunk:
-    """A chunk of text from a paper."""
+    """
+    A chunk of text from a paper.
+    
+    Paper fields live on the shared `paper` (one PaperMeta per paper, not
+    copied per chunk); the chunk itself only adds its position.
+    
+    A flat `metadata` dict (the pre-PaperMeta constructor argument, also
+    accepted positionally) is still supported: paper fields, section and
+    chunk_index are taken from it and any other keys are kept in `extra`.
+    """
     chunk_id: str
     paper_id: str
     text: str
-    metadata: Dict
+    paper: Optional[PaperMeta]
+    section: Optional[str]
+    chunk_index: Optional[int]
+    extra: Optional[Dict]
+    
+    def __init__(self, chunk_id: str, paper_id: str, text: str,
+                 paper: Optional[PaperMeta] = None, section: Optional[str] = None,
+                 chunk_index: Optional[int] = None, extra: Optional[Dict] = None,
+                 metadata: Optional[Dict] = None):
+        if isinstance(paper, dict):
+            paper, metadata = None, paper
+        if metadata is not None:
+            meta = dict(metadata)
+            if paper is None and any(f in meta for f in PaperMeta.__slots__[1:]):
+                paper = PaperMeta.from_dict({**meta, "pmid": meta.get("pmid") or paper_id})
+            section = meta.pop("section", section)
+            chunk_index = meta.pop("chunk_index", chunk_index)
+            rest = {k: v for k, v in meta.items() if k not in PaperMeta.__slots__}
+            extra = {**rest, **(extra or {})} or None
+        
+        self.chunk_id = chunk_id
+        self.paper_id = paper_id
+        self.text = text
+        self.paper = paper
+        self.section = section
+        self.chunk_index = chunk_index
+        self.extra = extra
+    
+    @property
+    def metadata(self) -> Dict:
+        """Full display metadata (paper fields + position), built on demand."""
+        meta = self.paper.to_dict() if self.paper is not None else {"pmid": self.paper_id}
+        if self.section is not None:
+            meta["section"] = self.section
+            meta["chunk_index"] = self.chunk_index
+        if self.extra:
+            meta.update(self.extra)
+        return meta
+    
+    def record_metadata(self) -> Dict:
+        """Per-chunk fields to store with the vector; the rest is in the paper table."""
+        meta = {"pmid": self.paper_id}
+        if self.paper is not None and self.paper.year:
+            meta["year"] = self.paper.year
+        if self.section is not None:
+            meta["section"] = self.section
+            meta["chunk_index"] = self.chunk_index
+        if self.extra:
+            meta.update(self.extra)
+        return meta
+    
+    @property
+    def content_hash(self) -> str:
+        """Hash of text + metadata, used to detect changed chunks on re-ingest."""
+        payload = json.dumps({"text": self.text, "metadata": self.metadata},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChunkDeduplicator:
+    """
+    Drops exact and near-duplicate chunk bodies (boilerplate, repeated
+    figure captions) before they reach the embedder.
+    
+    Exact duplicates are caught by a hash of the normalized text; near
+    duplicates by MinHash over word 5-gram shingles with LSH banding
+    (each band bucket keeps its latest signature). Memory is bounded: at
+    most `max_entries` chunks are remembered (default: as many as fit in
+    `max_bytes`, at ~`ENTRY_BYTES` each), the oldest are forgotten first.
+    """
+    
+    NUM_PERM = 64
+    BANDS = 16
+    PRIME = (1 << 31) - 1
+    # Approximate memory per remembered chunk (signature, band keys, exact hash)
+    ENTRY_BYTES = 2048
+    DEFAULT_MAX_BYTES = 128 << 20
+    
+    def __init__(self, near_dup_threshold: Optional[float] = 0.9,
+                 max_entries: Optional[int] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.near_dup_threshold = near_dup_threshold
+        self.max_entries = max_entries or max(1, max_bytes // self.ENTRY_BYTES)
+        
+        self._exact: "OrderedDict[bytes, None]" = OrderedDict()
+        # Band hash -> latest signature (uint32) with that band; signatures
+        # in insertion order for eviction
+        self._buckets: Dict[int, np.ndarray] = {}
+        self._signatures: deque = deque()
+        
+        rng = np.random.default_rng(0)
+        self._a = rng.integers(1, self.PRIME, self.NUM_PERM, dtype=np.uint64)
+        self._b = rng.integers(0, self.PRIME, self.NUM_PERM, dtype=np.uint64)
+        
+        self.dropped = 0
+    
+    def __len__(self) -> int:
+        """Chunks currently remembered."""
+        return len(self._exact)
+    
+    def is_duplicate(self, text: str) -> bool:
+        """Check `text` and remember it if it is new."""
+        words = re.sub(r"\s+", " ", text.lower()).strip().split(" ")
+        
+        digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).digest()
+        if digest in self._exact:
+            self.dropped += 1
+            return True
+        self._exact[digest] = None
+        if len(self._exact) > self.max_entries:
+            self._exact.popitem(last=False)
+        
+        if self.near_dup_threshold is None or len(words) < 5:
+            return False
+        
+        signature = self._minhash(words)
+        keys = self._band_keys(signature)
+        for key in keys:
+            other = self._buckets.get(key)
+            if other is not None and np.mean(signature == other) >= self.near_dup_threshold:
+                self.dropped += 1
+                return True
+        
+        for key in keys:
+            self._buckets[key] = signature
+        self._signatures.append(signature)
+        if len(self._signatures) > self.max_entries:
+            old = self._signatures.popleft()
+            for key in self._band_keys(old):
+                if self._buckets.get(key) is old:
+                    del self._buckets[key]
+        return False
+    
+    def _band_keys(self, signature: np.ndarray) -> List[int]:
+        # One int per band; a hash collision only costs an extra comparison
+        rows = self.NUM_PERM // self.BANDS
+        return [hash((band, signature[band * rows:(band + 1) * rows].tobytes()))
+                for band in range(self.BANDS)]
+    
+    def _minhash(self, words: List[str]) -> np.ndarray:
+        shingles = {" ".join(words[i:i + 5]) for i in range(len(words) - 4)}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & 0x7FFFFFFF for s in shingles),
+            dtype=np.uint64, count=len(shingles)
+        )
+        permuted = (hashes[:, None] * self._a + self._b) % self.PRIME
+        # Values are below PRIME < 2**31
+        return permuted.min(axis=0).astype(np.uint32)
 
 
 class TextChunker:
-    """Chunks papers into smaller pieces."""
+    """
+    Chunks papers into token-budgeted, overlapping windows.
+    
+    - Windows respect section and sentence boundaries; a sentence longer
+      than the budget is split on word boundaries
+    - Papers whose title + abstract fit the budget keep the original single
+      chunk ("Title: ...\n\nAbstract: ...", id "{pmid}_0")
+    - Chunk ids are "{pmid}_{n}", numbered before deduplication, so they
+      are stable across runs for unchanged input
+    """
+    
+    def __init__(self, max_tokens: int = 300, overlap_tokens: int = 40,
+                 dedup: bool = True, near_dup_threshold: Optional[float] = 0.9):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.dedup = dedup
+        self.near_dup_threshold = near_dup_threshold
+    
+    def new_deduplicator(self, max_bytes: int = ChunkDeduplicator.DEFAULT_MAX_BYTES
+                         ) -> Optional[ChunkDeduplicator]:
+        if not self.dedup:
+            return None
+        return ChunkDeduplicator(self.near_dup_threshold, max_bytes=max_bytes)
     
     def chunk_paper(self, paper: Paper) -> List[Chunk]:
+        return list(self.iter_chunks(paper, self.new_deduplicator()))
+    
+    def chunk_papers(self, papers: Iterable[Paper]) -> Iterator[Chunk]:
+        """Lazily chunk a stream of papers, deduplicating across all of them."""
+        dedup = self.new_deduplicator()
+        for paper in papers:
+            yield from self.iter_chunks(paper, dedup)
+    
+    def iter_chunks(self, paper: Paper,
+                    dedup: Optional[ChunkDeduplicator] = None) -> Iterator[Chunk]:
+        meta = PaperMeta.from_paper(paper)
+        
         text = f"Title: {paper.title}\n\nAbstract: {paper.abstract}"
+        if not paper.sections and count_tokens(text) <= self.max_tokens:
+            if dedup is None or not dedup.is_duplicate(f"{paper.title}\n{paper.abstract}"):
+                yield Chunk(
+                    chunk_id=f"{paper.pmid}_0",
+                    paper_id=paper.pmid,
+                    text=text,
+                    paper=meta
+                )
+            return
+        
+        sections = [("Abstract", paper.abstract)] + [tuple(s) for s in paper.sections or []]
+        index = 0
+        
+        for heading, body in sections:
+            header = f"Title: {paper.title}\n\n{heading}: "
+            budget = max(self.max_tokens - count_tokens(header), self.overlap_tokens + 1)
+            
+            for window in self._windows(body, budget):
+                chunk_id = f"{paper.pmid}_{index}"
+                index += 1
+                if dedup is not None and dedup.is_duplicate(window):
+                    continue
+                
+                yield Chunk(
+                    chunk_id=chunk_id,
+                    paper_id=paper.pmid,
+                    text=header + window,
+                    paper=meta,
+                    section=heading,
+                    chunk_index=index - 1
+                )
+    
+    def _windows(self, text: str, budget: int) -> Iterator[str]:
+        """Pack sentences into windows of <= budget tokens with overlap."""
+        sentences = []
+        for paragraph in re.split(r"\n\s*\n", text):
+            for sentence in SENTENCE_BOUNDARY.split(paragraph.strip()):
+                if sentence:
+                    sentences.extend(self._split_long(sentence, budget))
+        
+        window: List[Tuple[str, int]] = []
+        tokens = 0
+        
+        for sentence in sentences:
+            size = count_tokens(sentence)
+            if window and tokens + size > budget:
+                yield " ".join(s for s, _ in window)
+                
+                # Carry trailing sentences up to the overlap budget
+                carried, carried_tokens = [], 0
+                for s, n in reversed(window):
+                    if carried_tokens + n > self.overlap_tokens or carried_tokens + n + size > budget:
+                        break
+                    carried.insert(0, (s, n))
+                    carried_tokens += n
+                window, tokens = carried, carried_tokens
+            
+            window.append((sentence, size))
+            tokens += size
+        
+        if window:
+            yield " ".join(s for s, _ in window)
+    
+    @staticmethod
+    def _split_long(sentence: str, budget: int) -> List[str]:
+        if count_tokens(sentence) <= budget:
+            return [sentence]
         
-        return [Chunk(
-            chunk_id=f"{paper.pmid}_0",
-            paper_id=paper.pmid,
-            text=text,
-            metadata={
-                "pmid": paper.pmid,
-                "title": paper.title,
-                "authors": paper.authors,
-                "year": paper.year,
-                "journal": paper.journal,
-                "doi": paper.doi
-            }
-        )]
+        pieces, current, current_tokens = [], [], 0
+        for word in sentence.split():
+            size = count_tokens(word)
+            if current and current_tokens + size > budget:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += size
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
 
 
 # Demo neuroscience papers
@@ -0,0 +1,176 @@
+"""Deadline Budgets and Hedged Requests"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """A stage could not finish within its share of the query budget."""
+    
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    A per-query latency budget split across stages.
+    
+    `shares` are fractions of the total budget; a stage may also use time
+    left over by earlier stages, but never time reserved for later ones.
+    """
+    
+    DEFAULT_SHARES = {"embed": 0.10, "retrieve": 0.10, "rerank": 0.20, "generate": 0.60}
+    ORDER = ("embed", "retrieve", "rerank", "generate")
+    
+    def __init__(self, total_ms: float, shares: Optional[Dict[str, float]] = None):
+        self.total = total_ms / 1000.0
+        self.shares = {**self.DEFAULT_SHARES, **(shares or {})}
+        self.started = time.monotonic()
+    
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+    
+    def remaining(self) -> float:
+        return max(0.0, self.total - self.elapsed())
+    
+    def for_stage(self, stage: str) -> float:
+        """Seconds `stage` may take, after reserving the later stages' shares."""
+        later = self.ORDER[self.ORDER.index(stage) + 1:] if stage in self.ORDER else ()
+        reserved = sum(self.shares[s] for s in later) * self.total
+        return max(0.0, self.remaining() - reserved)
+
+
+class LatencyTracker:
+    """Recent per-stage latencies (seconds), for percentile-based hedging."""
+    
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+    
+    def percentile(self, stage: str, q: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class Hedger:
+    """
+    Runs idempotent calls with a hedge: if the first attempt has not
+    answered after the stage's `hedge_percentile` latency, a second one is
+    started and whichever finishes first wins.
+    
+    Attempts run on one pool of `max_workers` threads shared by all
+    queries. A losing or timed-out attempt that has started cannot be
+    cancelled (HTTP calls cannot be); it holds its worker until its
+    request returns or hits its own timeout, so callers should pass the
+    stage budget as the request timeout. Attempts still queued when a call
+    returns are cancelled, and no hedge is sent while the pool is full.
+    Size the pool to about twice the number of concurrent deadline queries.
+    """
+    
+    DEFAULT_DELAYS = {"embed": 0.15, "rerank": 0.4}
+    
+    def __init__(self, hedge_percentile: float = 0.95, min_samples: int = 20,
+                 default_delays: Optional[Dict[str, float]] = None, max_workers: int = 32):
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.default_delays = {**self.DEFAULT_DELAYS, **(default_delays or {})}
+        self.tracker = LatencyTracker()
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._inflight = 0
+        self._lock = threading.Lock()
+        
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+    
+    def hedge_delay(self, stage: str) -> float:
+        observed = self.tracker.percentile(stage, self.hedge_percentile, self.min_samples)
+        return observed if observed is not None else self.default_delays.get(stage, 0.5)
+    
+    def call(self, stage: str, fn: Callable[[], Any], timeout: float,
+             hedge_fn: Optional[Callable[[], Any]] = None, hedge: bool = True) -> Any:
+        """
+        Return the first successful result, or raise DeadlineExceeded.
+        
+        With `hedge=False` the call only gets a timeout (for calls that
+        are not idempotent or too expensive to duplicate, like chat).
+        """
+        started = time.monotonic()
+        
+        def attempt(f):
+            t0 = time.monotonic()
+            result = f()
+            self.tracker.record(stage, time.monotonic() - t0)
+            return result
+        
+        primary = self._submit(attempt, fn)
+        pending = {primary}
+        error: Optional[BaseException] = None
+        
+        delay = self.hedge_delay(stage) if hedge else float("inf")
+        hedged = not hedge
+        try:
+            while pending:
+                left = timeout - (time.monotonic() - started)
+                if left <= 0:
+                    break
+                
+                wait_for = min(left, delay - (time.monotonic() - started)) if not hedged else left
+                done, _ = wait(pending, timeout=max(0.0, wait_for), return_when=FIRST_COMPLETED)
+                pending -= done
+                
+                for future in done:
+                    if future.exception() is None:
+                        if future is not primary:
+                            self.hedge_wins += 1
+                        return future.result()
+                    error = error or future.exception()
+                
+                if not hedged and time.monotonic() - started >= delay:
+                    hedged = True
+                    if self._inflight >= self.max_workers:
+                        # A queued hedge would only delay other queries' calls
+                        self.hedges_skipped += 1
+                    else:
+                        self.hedges += 1
+                        pending.add(self._submit(attempt, hedge_fn or fn))
+        finally:
+            # Losers that have not started yet never need to run
+            for future in pending:
+                future.cancel()
+        
+        if error is not None and not pending:
+            raise error
+        raise DeadlineExceeded(stage)
+    
+    def _submit(self, attempt: Callable, fn: Callable[[], Any]) -> Future:
+        with self._lock:
+            self._inflight += 1
+        future = self._pool.submit(attempt, fn)
+        future.add_done_callback(self._release)
+        return future
+    
+    def _release(self, future: Future):
+        with self._lock:
+            self._inflight -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedges_skipped": self.hedges_skipped,
+            "delays": {s: round(self.hedge_delay(s), 4) for s in self.default_delays}
+        }
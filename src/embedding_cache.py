@@ -0,0 +1,166 @@
+"""Embedding Cache Module"""
+
+import hashlib
+import re
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for Cohere embeddings.
+    
+    Keys are (model, input_type, sha256(text)).
+    - Document embeddings go to one append-only float32 file per
+      (model, input_type), with an in-memory index of record offsets
+    - Query embeddings live in a bounded in-memory LRU tier, so
+      free-form user questions never grow the disk cache
+    """
+    
+    RECORD_HEADER = struct.Struct("<32sI")  # sha256 digest, dimension
+    QUERY_INPUT_TYPE = "search_query"
+    
+    def __init__(self, cache_dir: str = "./data/embedding_cache",
+                 query_cache_size: int = 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.query_cache_size = query_cache_size
+        
+        self._queries: "OrderedDict[Tuple[str, bytes], List[float]]" = OrderedDict()
+        self._indexes: Dict[Tuple[str, str], Dict[bytes, Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def text_key(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+    
+    def get_many(self, model: str, input_type: str,
+                 texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up embeddings; returns None for every miss."""
+        keys = [self.text_key(t) for t in texts]
+        
+        with self._lock:
+            if input_type == self.QUERY_INPUT_TYPE:
+                found = [self._get_query(model, k) for k in keys]
+            else:
+                found = self._read_records(model, input_type, keys)
+            
+            hits = sum(1 for e in found if e is not None)
+            self.hits += hits
+            self.misses += len(found) - hits
+        
+        return found
+    
+    def put_many(self, model: str, input_type: str, texts: List[str],
+                 embeddings: List[List[float]]):
+        """Store embeddings, skipping keys that are already cached."""
+        with self._lock:
+            if input_type == self.QUERY_INPUT_TYPE:
+                for text, embedding in zip(texts, embeddings):
+                    self._put_query(model, self.text_key(text), embedding)
+                return
+            
+            index = self._load_index(model, input_type)
+            path = self._path(model, input_type)
+            
+            with open(path, "ab") as f:
+                offset = f.tell()
+                for text, embedding in zip(texts, embeddings):
+                    key = self.text_key(text)
+                    if key in index:
+                        continue
+                    
+                    vector = array("f", embedding)
+                    f.write(self.RECORD_HEADER.pack(key, len(vector)))
+                    f.write(vector.tobytes())
+                    
+                    index[key] = (offset + self.RECORD_HEADER.size, len(vector))
+                    offset += self.RECORD_HEADER.size + len(vector) * vector.itemsize
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "documents": sum(len(ix) for ix in self._indexes.values()),
+                "queries": len(self._queries)
+            }
+    
+    def _get_query(self, model: str, key: bytes) -> Optional[List[float]]:
+        embedding = self._queries.get((model, key))
+        if embedding is not None:
+            self._queries.move_to_end((model, key))
+        return embedding
+    
+    def _put_query(self, model: str, key: bytes, embedding: List[float]):
+        self._queries[(model, key)] = list(embedding)
+        self._queries.move_to_end((model, key))
+        while len(self._queries) > self.query_cache_size:
+            self._queries.popitem(last=False)
+    
+    def _path(self, model: str, input_type: str) -> Path:
+        safe_model = re.sub(r"[^A-Za-z0-9._-]", "_", model)
+        return self.cache_dir / f"{safe_model}.{input_type}.f32"
+    
+    def _load_index(self, model: str, input_type: str) -> Dict[bytes, Tuple[int, int]]:
+        """Scan the record file once to build the offset index."""
+        if (model, input_type) in self._indexes:
+            return self._indexes[(model, input_type)]
+        
+        index = {}
+        path = self._path(model, input_type)
+        
+        if path.exists():
+            header_size = self.RECORD_HEADER.size
+            item_size = array("f").itemsize
+            file_size = path.stat().st_size
+            valid_end = 0
+            
+            with open(path, "rb") as f:
+                while True:
+                    header = f.read(header_size)
+                    if len(header) < header_size:
+                        break
+                    key, dim = self.RECORD_HEADER.unpack(header)
+                    offset = valid_end + header_size
+                    if offset + dim * item_size > file_size:
+                        break
+                    f.seek(dim * item_size, 1)
+                    index[key] = (offset, dim)
+                    valid_end = offset + dim * item_size
+            
+            # Drop a partially written trailing record (e.g. after a crash)
+            if valid_end < file_size:
+                with open(path, "r+b") as f:
+                    f.truncate(valid_end)
+        
+        self._indexes[(model, input_type)] = index
+        return index
+    
+    def _read_records(self, model: str, input_type: str,
+                      keys: List[bytes]) -> List[Optional[List[float]]]:
+        index = self._load_index(model, input_type)
+        found: List[Optional[List[float]]] = [None] * len(keys)
+        
+        if not any(k in index for k in keys):
+            return found
+        
+        with open(self._path(model, input_type), "rb") as f:
+            for i, key in enumerate(keys):
+                location = index.get(key)
+                if location is None:
+                    continue
+                offset, dim = location
+                f.seek(offset)
+                vector = array("f")
+                vector.frombytes(f.read(dim * vector.itemsize))
+                found[i] = vector.tolist()
+        
+        return found
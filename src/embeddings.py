@@ -1,50 +1,210 @@
 """Cohere Embeddings Module"""
 
+import asyncio
 import os
-import cohere
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Optional
-from tqdm import tqdm
+
+from .coalescer import EmbedCoalescer
+from .cohere_client import lazy_async_client
+from .embedding_cache import EmbeddingCache
+from .projection import Projection
+from .rate_limit import TokenBucket, acall_with_retry, call_with_retry
 
 
 class CohereEmbedder:
-    """Generates embeddings using Cohere Embed API."""
+    """
+    Generates embeddings using Cohere Embed API.
+    
+    With `max_concurrency > 1`, document batches are sent from a bounded
+    thread pool; `requests_per_second` caps the request rate across all
+    workers. Output order always matches input order.
+    
+    With `coalesce_window_ms`, concurrent `embed_query` / `aembed_query`
+    calls are merged into batched Embed calls (see `EmbedCoalescer`).
+    
+    When `projection` is set (to the index's), query embeddings come back
+    projected; document embeddings and the cache stay full-width.
+    """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "embed-english-v3.0"):
+    FULL_DIM = 1024
+    
+    def __init__(self, api_key: Optional[str] = None, model: str = "embed-english-v3.0",
+                 cache: Optional[EmbeddingCache] = None, max_concurrency: int = 1,
+                 requests_per_second: Optional[float] = None, max_retries: int = 5,
+                 client=None, async_client=None, timeout: Optional[float] = None,
+                 coalesce_window_ms: Optional[float] = None, coalesce_max_batch: int = 96):
         self.api_key = api_key or os.getenv("COHERE_API_KEY")
-        if not self.api_key:
+        if client is None and not self.api_key:
             raise ValueError("COHERE_API_KEY not found")
         
-        self.client = cohere.Client(self.api_key)
+        if client is None:
+            import cohere  # deferred: importing cohere is a large part of cold start
+            client = cohere.Client(self.api_key)
+        self.client = client
+        # Built on the first async call, so sync-only callers never need one
+        self.async_client = async_client or lazy_async_client(self.api_key)
         self.model = model
-        self.embedding_dim = 1024
+        self.projection: Optional[Projection] = None
+        self.cache = cache
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+        self.request_options = {"timeout_in_seconds": timeout} if timeout else None
+        
+        self.coalescer = None
+        if coalesce_window_ms is not None:
+            # A batch and its retries must finish within the coalescer's
+            # timeout, or its callers give up on it while it still retries
+            batch_timeout = timeout or EmbedCoalescer.DEFAULT_TIMEOUT
+            self.coalescer = EmbedCoalescer(
+                lambda texts: self._embed_batch(texts, "search_query", batch_timeout),
+                window_ms=coalesce_window_ms,
+                max_batch=coalesce_max_batch,
+                timeout=batch_timeout
+            )
+    
+    @property
+    def embedding_dim(self) -> int:
+        return self.projection.dim if self.projection is not None else self.FULL_DIM
     
     def embed_documents(self, texts: List[str], batch_size: int = 96, 
                         show_progress: bool = True) -> List[List[float]]:
-        """Embed documents for storage."""
-        all_embeddings = []
+        """Embed documents for storage. Only cache misses hit the API."""
+        return self._embed_cached(texts, "search_document", batch_size, show_progress)
+    
+    def embed_query(self, query: str, timeout: Optional[float] = None) -> List[float]:
+        """Embed a search query. `timeout` bounds the call, retries included."""
+        if self.coalescer is None:
+            return self._project(self._embed_cached([query], "search_query", 96, False, timeout))[0]
+        
+        cached = self._cached_query(query)
+        if cached is None:
+            cached = self._store_query(query, self.coalescer.embed(query, timeout))
+        return self._project([cached])[0]
+    
+    def embed_queries(self, queries: List[str], batch_size: int = 96,
+                      timeout: Optional[float] = None) -> List[List[float]]:
+        """Embed many search queries with one Embed call per batch."""
+        return self._project(
+            self._embed_cached(queries, "search_query", batch_size, False, timeout)
+        )
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """Embed a search query without blocking the event loop."""
+        cached = self._cached_query(query)
+        if cached is not None:
+            return self._project([cached])[0]
+        
+        if self.coalescer is not None:
+            embedding = await asyncio.wait_for(
+                asyncio.wrap_future(self.coalescer.submit(query)), self.coalescer.max_wait
+            )
+            return self._project([self._store_query(query, embedding)])[0]
+        
+        response = await acall_with_retry(
+            lambda: self.async_client.embed(
+                texts=[query],
+                model=self.model,
+                input_type="search_query",
+                truncate="END",
+                request_options=self.request_options
+            ),
+            max_retries=self.max_retries
+        )
+        return self._project([self._store_query(query, response.embeddings[0])])[0]
+    
+    def _project(self, embeddings: List[List[float]]) -> List[List[float]]:
+        if self.projection is None:
+            return embeddings
+        return self.projection.apply(embeddings).tolist()
+    
+    def _cached_query(self, query: str) -> Optional[List[float]]:
+        if self.cache is None:
+            return None
+        return self.cache.get_many(self.model, "search_query", [query])[0]
+    
+    def _store_query(self, query: str, embedding: List[float]) -> List[float]:
+        if self.cache is not None:
+            self.cache.put_many(self.model, "search_query", [query], [embedding])
+        return embedding
+    
+    def _embed_cached(self, texts: List[str], input_type: str, batch_size: int,
+                      show_progress: bool, timeout: Optional[float] = None) -> List[List[float]]:
+        """Serve embeddings from the cache and embed the (deduplicated) misses."""
+        if self.cache is None:
+            return self._embed_batches(texts, input_type, batch_size, show_progress, timeout)
+        
+        embeddings = self.cache.get_many(self.model, input_type, texts)
+        
+        missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+        if missing:
+            fresh = self._embed_batches(missing, input_type, batch_size, show_progress, timeout)
+            self.cache.put_many(self.model, input_type, missing, fresh)
+            
+            by_text = dict(zip(missing, fresh))
+            embeddings = [e if e is not None else by_text[t]
+                          for t, e in zip(texts, embeddings)]
         
-        batches = range(0, len(texts), batch_size)
+        return embeddings
+    
+    def _embed_batches(self, texts: List[str], input_type: str, batch_size: int,
+                       show_progress: bool, timeout: Optional[float] = None) -> List[List[float]]:
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results: List[Optional[List[List[float]]]] = [None] * len(batches)
+        
+        progress = None
         if show_progress:
-            batches = tqdm(batches, desc="Embedding")
+            from tqdm import tqdm
+            progress = tqdm(total=len(batches), desc="Embedding")
+        
+        if self.max_concurrency == 1 or len(batches) <= 1:
+            for i, batch in enumerate(batches):
+                results[i] = self._embed_batch(batch, input_type, timeout)
+                if progress:
+                    progress.update(1)
+        else:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(self._embed_batch, batch, input_type, timeout): i
+                    for i, batch in enumerate(batches)
+                }
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+                    if progress:
+                        progress.update(1)
+        
+        if progress:
+            progress.close()
         
-        for i in batches:
-            batch = texts[i:i + batch_size]
-            response = self.client.embed(
+        return [e for batch_embeddings in results for e in batch_embeddings]
+    
+    def _embed_batch(self, batch: List[str], input_type: str,
+                     timeout: Optional[float] = None) -> List[List[float]]:
+        """
+        One rate-limited Embed call, retried on 429/5xx. With `timeout`,
+        every attempt gets the time left and none starts after it runs out.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        def call():
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            request_options = self.request_options
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise TimeoutError("Embed call ran out of time")
+                request_options = {"timeout_in_seconds": left}
+            return self.client.embed(
                 texts=batch,
                 model=self.model,
-                input_type="search_document",
-                truncate="END"
+                input_type=input_type,
+                truncate="END",
+                request_options=request_options
             )
-            all_embeddings.extend(response.embeddings)
         
-        return all_embeddings
-    
-    def embed_query(self, query: str) -> List[float]:
-        """Embed a search query."""
-        response = self.client.embed(
-            texts=[query],
-            model=self.model,
-            input_type="search_query",
-            truncate="END"
-        )
-        return response.embeddings[0]
+        response = call_with_retry(call, max_retries=self.max_retries, deadline=deadline)
+        return response.embeddings
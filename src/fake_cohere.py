@@ -0,0 +1,193 @@
+"""Simulated Cohere Client for Offline Benchmarks"""
+
+import asyncio
+import hashlib
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class SimulatedApiError(Exception):
+    """Mimics cohere's ApiError closely enough for `rate_limit.is_retryable`."""
+    
+    def __init__(self, status_code: int, body: str = "simulated error"):
+        super().__init__(f"status_code: {status_code}, body: {body}")
+        self.status_code = status_code
+        self.headers: Dict[str, str] = {}
+        self.body = body
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Lognormal latency for one endpoint.
+    
+    A call takes `median_ms * lognormal(0, sigma) + per_item_ms * items`;
+    it fails with probability `error_rate` using one of `error_statuses`.
+    """
+    median_ms: float = 50.0
+    sigma: float = 0.3
+    per_item_ms: float = 0.0
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [429, 503])
+
+
+# Rough shape of the hosted API; override per benchmark run
+DEFAULT_PROFILES = {
+    "embed": LatencyProfile(median_ms=60.0, sigma=0.35, per_item_ms=0.5),
+    "rerank": LatencyProfile(median_ms=120.0, sigma=0.35, per_item_ms=1.0),
+    "chat": LatencyProfile(median_ms=1500.0, sigma=0.4)
+}
+
+
+@dataclass
+class _Response:
+    embeddings: Any = None
+    results: Any = None
+    text: str = ""
+
+
+@dataclass
+class _Document:
+    text: str
+
+
+@dataclass
+class _RerankResult:
+    index: int
+    relevance_score: float
+    document: _Document
+
+
+@dataclass
+class _StreamEvent:
+    text: str
+    event_type: str = "text-generation"
+
+
+class FakeCohereClient:
+    """
+    Drop-in replacement for `cohere.Client` (embed, rerank, chat, chat_stream).
+    
+    - Embeddings are hashed bag-of-words vectors, so texts sharing words
+      are similar and repeated calls return identical vectors
+    - Rerank scores are the cosine of query and document embeddings
+    - Chat answers cite the first sources in the prompt
+    
+    Latency and failures follow `profiles` (see `LatencyProfile`), drawn
+    from a seeded RNG; `time_scale=0` disables sleeping entirely.
+    """
+    
+    def __init__(self, dim: int = 1024, profiles: Optional[Dict[str, LatencyProfile]] = None,
+                 time_scale: float = 1.0, seed: int = 0):
+        self.dim = dim
+        self.profiles = {**DEFAULT_PROFILES, **(profiles or {})}
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {"embed": 0, "rerank": 0, "chat": 0}
+        self.errors = {"embed": 0, "rerank": 0, "chat": 0}
+    
+    # -- Cohere API surface --
+    
+    def embed(self, texts: List[str], model: str = "", input_type: str = "",
+              truncate: str = "END", **kwargs) -> _Response:
+        time.sleep(self._simulate("embed", len(texts)))
+        return _Response(embeddings=self._embed(texts).tolist())
+    
+    def rerank(self, query: str, documents: List[str], model: str = "",
+               top_n: Optional[int] = None, return_documents: bool = True,
+               **kwargs) -> _Response:
+        time.sleep(self._simulate("rerank", len(documents)))
+        return _Response(results=self._rerank(query, documents, top_n))
+    
+    def chat(self, message: str, model: str = "", **kwargs) -> _Response:
+        time.sleep(self._simulate("chat", 1))
+        return _Response(text=self._answer(message))
+    
+    def chat_stream(self, message: str, model: str = "", **kwargs) -> Iterator[_StreamEvent]:
+        delay = self._simulate("chat", 1)
+        words = self._answer(message).split(" ")
+        
+        # First token after ~1/3 of the call, then evenly spaced
+        time.sleep(delay / 3)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(delay * 2 / 3 / len(words))
+            yield _StreamEvent(text=word + (" " if i < len(words) - 1 else ""))
+    
+    # -- Simulation --
+    
+    def _simulate(self, endpoint: str, items: int) -> float:
+        """Draw this call's latency, or raise a simulated API error."""
+        profile = self.profiles[endpoint]
+        with self._lock:
+            self.calls[endpoint] += 1
+            failed = self._rng.random() < profile.error_rate
+            status = self._rng.choice(profile.error_statuses) if failed else None
+            jitter = self._rng.lognormvariate(0.0, profile.sigma)
+        
+        if failed:
+            with self._lock:
+                self.errors[endpoint] += 1
+            raise SimulatedApiError(status)
+        
+        return (profile.median_ms * jitter + profile.per_item_ms * items) / 1000.0 * self.time_scale
+    
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+    
+    def _rerank(self, query: str, documents: List[str],
+                top_n: Optional[int]) -> List[_RerankResult]:
+        vectors = self._embed([query] + list(documents))
+        scores = (vectors[1:] @ vectors[0] + 1.0) / 2.0
+        order = np.argsort(-scores, kind="stable")[:top_n or len(documents)]
+        return [
+            _RerankResult(index=int(i), relevance_score=float(scores[i]),
+                          document=_Document(documents[i]))
+            for i in order
+        ]
+    
+    @staticmethod
+    def _answer(prompt: str) -> str:
+        sources = sorted(set(int(n) for n in re.findall(r"^\[(\d+)\]", prompt, re.MULTILINE)))
+        cited = " ".join(f"[{n}]" for n in sources[:3]) or "(no sources)"
+        digest = hashlib.md5(prompt.encode("utf-8")).hexdigest()[:8]
+        return (f"Simulated answer {digest}. The provided studies report relevant "
+                f"findings {cited}, though further work is needed.")
+
+
+class FakeAsyncCohereClient:
+    """`cohere.AsyncClient` counterpart sharing a FakeCohereClient's simulation."""
+    
+    def __init__(self, sync_client: FakeCohereClient):
+        self.sync = sync_client
+    
+    async def embed(self, texts: List[str], **kwargs) -> _Response:
+        await asyncio.sleep(self.sync._simulate("embed", len(texts)))
+        return _Response(embeddings=self.sync._embed(texts).tolist())
+    
+    async def rerank(self, query: str, documents: List[str],
+                     top_n: Optional[int] = None, **kwargs) -> _Response:
+        await asyncio.sleep(self.sync._simulate("rerank", len(documents)))
+        return _Response(results=self.sync._rerank(query, documents, top_n))
+    
+    async def chat(self, message: str, **kwargs) -> _Response:
+        await asyncio.sleep(self.sync._simulate("chat", 1))
+        return _Response(text=self.sync._answer(message))
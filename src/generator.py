@@ -2,10 +2,15 @@
 
 import os
 import re
-import cohere
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
 
+from .cohere_client import lazy_async_client
+from .context_packing import ContextPacker
+
+
+CITATION_PATTERN = re.compile(r'\[(\d+)\]')
+
 
 @dataclass
 class Citation:
@@ -24,6 +29,46 @@ class GeneratedAnswer:
     answer: str
     citations: List[Citation]
     sources_used: int
+    context_tokens: int = 0
+    tokens_saved: int = 0
+
+
+class CitationTracker:
+    """
+    Resolves [n] citation markers in text that arrives in pieces.
+    
+    Text before `_resolved` has been fully scanned; a trailing marker
+    that is still open (e.g. "[1" at the end of a delta) is rescanned
+    once more text arrives.
+    """
+    
+    def __init__(self, citations: List[Citation]):
+        self.by_number = {c.number: c for c in citations}
+        self.text = ""
+        self.seen: List[int] = []
+        self._resolved = 0
+    
+    def feed(self, delta: str) -> List[Citation]:
+        """Append a text delta and return citations seen for the first time."""
+        self.text += delta
+        
+        new = []
+        for match in CITATION_PATTERN.finditer(self.text, self._resolved):
+            num = int(match.group(1))
+            if num in self.by_number and num not in self.seen:
+                self.seen.append(num)
+                new.append(self.by_number[num])
+            self._resolved = match.end()
+        
+        # Hold back an unfinished "[" or "[12" until the next delta
+        open_bracket = self.text.rfind("[", self._resolved)
+        tail = self.text[open_bracket + 1:]
+        if open_bracket != -1 and (tail == "" or tail.isdigit()):
+            self._resolved = open_bracket
+        else:
+            self._resolved = len(self.text)
+        
+        return new
 
 
 class AnswerGenerator:
@@ -39,19 +84,101 @@ Guidelines:
 - Be concise but thorough"""
     
     def __init__(self, api_key: Optional[str] = None, 
-                 model: str = "command-r-plus-08-2024"):  # Updated model name!
+                 model: str = "command-r-plus-08-2024",  # Updated model name!
+                 max_context_tokens: Optional[int] = 4000,
+                 min_relative_score: float = 0.0,
+                 client=None, async_client=None, timeout: Optional[float] = None):
         self.api_key = api_key or os.getenv("COHERE_API_KEY")
-        if not self.api_key:
+        if client is None and not self.api_key:
             raise ValueError("COHERE_API_KEY not found")
         
-        self.client = cohere.Client(self.api_key)
+        if client is None:
+            import cohere  # deferred: importing cohere is a large part of cold start
+            client = cohere.Client(self.api_key)
+        self.client = client
+        # Built on the first async call, so sync-only callers never need one
+        self.async_client = async_client or lazy_async_client(self.api_key)
         self.model = model
+        self.packer = ContextPacker(max_context_tokens, min_relative_score)
+        self.request_options = {"timeout_in_seconds": timeout} if timeout else None
     
     def generate(self, query: str, context_docs: List[Dict[str, Any]], 
-                 temperature: float = 0.3, max_tokens: int = 1024) -> GeneratedAnswer:
-        """Generate answer from retrieved documents."""
+                 temperature: float = 0.3, max_tokens: int = 1024,
+                 timeout: Optional[float] = None) -> GeneratedAnswer:
+        """Generate answer from retrieved documents. `timeout` overrides the default per-call timeout."""
+        
+        prompt, citations, packed = self._build_prompt(query, context_docs)
+        
+        response = self.client.chat(
+            message=prompt,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            preamble=self.SYSTEM_PROMPT,
+            request_options={"timeout_in_seconds": timeout} if timeout else self.request_options
+        )
+        
+        return self._to_answer(response.text, citations, packed)
+    
+    async def agenerate(self, query: str, context_docs: List[Dict[str, Any]], 
+                        temperature: float = 0.3, max_tokens: int = 1024) -> GeneratedAnswer:
+        """Async version of `generate`."""
+        
+        prompt, citations, packed = self._build_prompt(query, context_docs)
+        
+        response = await self.async_client.chat(
+            message=prompt,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            preamble=self.SYSTEM_PROMPT,
+            request_options=self.request_options
+        )
         
-        formatted_context, citations = self._format_context(context_docs)
+        return self._to_answer(response.text, citations, packed)
+    
+    def generate_stream(self, query: str, context_docs: List[Dict[str, Any]], 
+                        temperature: float = 0.3, 
+                        max_tokens: int = 1024) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the answer as it is generated.
+        
+        Yields {"type": "text", "text": delta} for each text delta,
+        {"type": "citation", "citation": Citation} the first time a valid
+        [n] marker appears, and finally {"type": "end", "answer": GeneratedAnswer}.
+        """
+        
+        prompt, citations, packed = self._build_prompt(query, context_docs)
+        tracker = CitationTracker(citations)
+        
+        stream = self.client.chat_stream(
+            message=prompt,
+            model=self.model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            preamble=self.SYSTEM_PROMPT,
+            request_options=self.request_options
+        )
+        
+        for event in stream:
+            if event.event_type != "text-generation" or not event.text:
+                continue
+            
+            yield {"type": "text", "text": event.text}
+            for citation in tracker.feed(event.text):
+                yield {"type": "citation", "citation": citation}
+        
+        yield {"type": "end", "answer": self._to_answer(tracker.text, citations, packed)}
+    
+    def _build_prompt(self, query: str, context_docs: List[Dict[str, Any]]) -> tuple:
+        """
+        Pack documents into the token budget, then build the chat prompt.
+        
+        Returns (prompt, citations, PackedContext); citation numbers follow
+        the packed (merged per pmid) documents.
+        """
+        packed = self.packer.pack(context_docs)
+        formatted_context, citations = self._format_context(packed.docs)
         
         prompt = f"""Based on these research excerpts, answer the question:
 
@@ -62,20 +189,17 @@ Sources:
 
 Provide a comprehensive answer citing sources using [1], [2], etc."""
         
-        response = self.client.chat(
-            message=prompt,
-            model=self.model,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            preamble=self.SYSTEM_PROMPT
-        )
-        
-        used_citations = self._extract_used_citations(response.text, citations)
+        return prompt, citations, packed
+    
+    def _to_answer(self, text: str, citations: List[Citation], packed) -> GeneratedAnswer:
+        used_citations = self._extract_used_citations(text, citations)
         
         return GeneratedAnswer(
-            answer=response.text,
+            answer=text,
             citations=used_citations,
-            sources_used=len(used_citations)
+            sources_used=len(used_citations),
+            context_tokens=packed.tokens,
+            tokens_saved=packed.tokens_saved
         )
     
     def _format_context(self, docs: List[Dict[str, Any]]) -> tuple:
@@ -116,6 +240,5 @@ Provide a comprehensive answer citing sources using [1], [2], etc."""
     def _extract_used_citations(self, answer: str, 
                                  all_citations: List[Citation]) -> List[Citation]:
         """Find which citations were used."""
-        matches = re.findall(r'\[(\d+)\]', answer)
-        used_nums = set(int(m) for m in matches)
+        used_nums = set(int(m) for m in CITATION_PATTERN.findall(answer))
         return [c for c in all_citations if c.number in used_nums]
@@ -0,0 +1,580 @@
+"""In-Process NumPy Vector Backend"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Dict, Any, Optional, Set, Tuple
+
+import numpy as np
+
+from .vector_store import VectorBackend, matches_where
+from .quantization import hamming_distances, quantize_binary, quantize_int8, recall_at_k
+
+
+def _where_key(where: Dict[str, Any]) -> str:
+    """Cache key for `where`; $in / $nin value lists are hashed, not spelled out."""
+    def shrink(node):
+        if isinstance(node, dict):
+            return {k: _digest(v) if k in ("$in", "$nin") else shrink(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [shrink(v) for v in node]
+        return node
+    return json.dumps(shrink(where), sort_keys=True)
+
+
+def _digest(values: Iterable) -> str:
+    joined = "\x1f".join(sorted(str(v) for v in values))
+    return hashlib.blake2b(joined.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _compile_where(where: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of `where` with $in / $nin lists as sets, for O(1) membership tests."""
+    if isinstance(where, list):
+        return [_compile_where(c) for c in where]
+    if not isinstance(where, dict):
+        return where
+    return {k: frozenset(v) if k in ("$in", "$nin") else _compile_where(v)
+            for k, v in where.items()}
+
+
+def _pmid_condition(where: Dict[str, Any]) -> Optional[frozenset]:
+    """The pmid set a compiled `where` requires (top level or under $and), if any."""
+    condition = where.get("pmid")
+    if isinstance(condition, dict) and "$in" in condition:
+        return condition["$in"]
+    for clause in where.get("$and", ()):
+        pmids = _pmid_condition(clause)
+        if pmids is not None:
+            return pmids
+    return None
+
+
+class NumpyBackend(VectorBackend):
+    """
+    Exact cosine search over a memory-mapped embedding matrix.
+    
+    Layout of `persist_directory`:
+    - vectors.npy: normalized embeddings, (capacity, dim), float32/float16/int8
+    - scales.npy:  per-row dequantization scale (int8 only)
+    - codes.npy / code_scales.npy: compact search codes (quantized mode only)
+    - records.jsonl: append-only {"row", "id", "text", "metadata"} side file;
+      the last record for a row wins. A {"row", "id", "deleted"} record
+      retires the row (its slot is not reused)
+    
+    Vectors are written before their record, so any reader that sees a
+    record also sees its row. Readers map the files read-only, so worker
+    processes on one host share pages through the OS page cache. One
+    writer process at a time is supported.
+    
+    Quantized mode (`quantization="binary"` or `"int8"`): codes are derived
+    from the normalized embeddings at ingestion. A query first scans only the
+    codes (Hamming distance, or int8 dot product) for a shortlist of
+    `top_k * rescore_multiplier` rows, then rescores that shortlist against
+    the full-precision vectors, which stay on disk.
+    """
+    
+    DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+    QUANTIZATIONS = (None, "binary", "int8")
+    
+    # Rows are indexed by pmid, so a pmid set of any size filters cheaply
+    pmid_filters = True
+    
+    def __init__(self, persist_directory: str = "./data/numpy_index",
+                 dtype: str = "float32", block_size: int = 8192,
+                 quantization: Optional[str] = None, rescore_multiplier: int = 4):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype}")
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        
+        self.path = Path(persist_directory)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dtype = dtype
+        self.block_size = block_size
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        
+        self._records_path = self.path / "records.jsonl"
+        
+        self.ids: List[str] = []
+        self.texts: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self._row_of: Dict[str, int] = {}
+        self._rows_of_pmid: Dict[str, List[int]] = {}
+        self._deleted_rows: Set[int] = set()
+        
+        # Memory maps of the per-row files, keyed by file stem
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._records_size = 0
+        # where key -> (compiled where, matching rows), updated on refresh
+        self._where_cache: Dict[str, Tuple[Dict[str, Any], np.ndarray]] = {}
+        self._lock = threading.RLock()
+        
+        self._refresh()
+        vectors = self._arrays.get("vectors")
+        if vectors is not None and vectors.dtype != self.DTYPES[dtype]:
+            raise ValueError(f"Index at {persist_directory} stores {vectors.dtype}, not {dtype}")
+        if vectors is not None and quantization and not self._codes_current():
+            self._build_codes()
+    
+    @property
+    def count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._row_of)
+    
+    def add(self, ids: List[str], embeddings: List[List[float]],
+            texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Add documents; ids that already exist are ignored (like Chroma)."""
+        self._write(ids, embeddings, texts, metadatas, overwrite=False)
+    
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        self._write(ids, embeddings, texts, metadatas, overwrite=True)
+    
+    def delete(self, ids: List[str]):
+        with self._lock:
+            self._refresh()
+            rows = {doc_id: self._row_of[doc_id] for doc_id in ids if doc_id in self._row_of}
+            if not rows:
+                return
+            with open(self._records_path, "a", encoding="utf-8") as f:
+                for doc_id, row in rows.items():
+                    f.write(json.dumps({"row": row, "id": doc_id, "deleted": True}) + "\n")
+            self._refresh()
+    
+    def revision(self) -> str:
+        # Every write appends to records.jsonl, which is never rewritten
+        try:
+            return str(self._records_path.stat().st_size)
+        except OSError:
+            return "0"
+    
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            return {
+                doc_id: self.metadatas[self._row_of[doc_id]]
+                for doc_id in ids if doc_id in self._row_of
+            }
+    
+    def ids_by_pmid(self, pmids: List[str]) -> Dict[str, List[str]]:
+        with self._lock:
+            self._refresh()
+            return {
+                pmid: [self.ids[row] for row in self._rows_of_pmid[pmid]]
+                for pmid in pmids if self._rows_of_pmid.get(pmid)
+            }
+    
+    def query_many(self, embeddings: List[List[float]], top_k: int = 10,
+                   where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        rows, scores = self._search(embeddings, top_k, use_codes=self.quantization is not None,
+                                    where=where)
+        
+        # Under the lock: a concurrent _refresh may be appending records
+        with self._lock:
+            return [
+                [
+                    {
+                        "id": self.ids[row],
+                        "text": self.texts[row],
+                        "score": float(score),
+                        "metadata": self.metadatas[row]
+                    }
+                    for row, score in zip(query_rows, query_scores)
+                ]
+                for query_rows, query_scores in zip(rows, scores)
+            ]
+    
+    def iter_records(self, batch_size: int = 10000):
+        with self._lock:
+            self._refresh()
+            n = len(self.ids)
+            arrays = dict(self._arrays)
+        
+        for start in range(0, n, batch_size):
+            end = min(start + batch_size, n)
+            with self._lock:
+                rows = [r for r in range(start, end) if r not in self._deleted_rows]
+                ids = [self.ids[r] for r in rows]
+                texts = [self.texts[r] for r in rows]
+                metadatas = [self.metadatas[r] for r in rows]
+            if rows:
+                yield ids, self._float_rows(arrays, np.asarray(rows)), texts, metadatas
+    
+    def measure_recall(self, embeddings: List[List[float]],
+                       top_k: int = 10) -> Dict[str, float]:
+        """
+        Compare quantized search with exact full-precision search.
+        
+        Reports recall@k, mean latency of both paths and the bytes per
+        vector scanned in the first pass vs. the full-precision matrix.
+        """
+        started = time.perf_counter()
+        exact_rows, _ = self._search(embeddings, top_k, use_codes=False)
+        exact_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        approx_rows, _ = self._search(embeddings, top_k, use_codes=self.quantization is not None)
+        approx_seconds = time.perf_counter() - started
+        
+        vectors = self._arrays.get("vectors")
+        codes = self._arrays.get("codes")
+        float_bytes = vectors.shape[1] * 4 if vectors is not None else 0
+        code_bytes = codes[0].nbytes if codes is not None else float_bytes
+        
+        n = max(len(embeddings), 1)
+        return {
+            f"recall@{top_k}": recall_at_k(exact_rows, approx_rows),
+            "exact_ms": 1000 * exact_seconds / n,
+            "quantized_ms": 1000 * approx_seconds / n,
+            "float32_bytes_per_vector": float_bytes,
+            "code_bytes_per_vector": code_bytes,
+            "compression": float_bytes / code_bytes if code_bytes else 1.0
+        }
+    
+    def _search(self, embeddings: List[List[float]], top_k: int, use_codes: bool,
+                where: Optional[Dict[str, Any]] = None):
+        """Return per-query (rows, scores) lists, best first."""
+        with self._lock:
+            self._refresh()
+            n = len(self.ids)
+            arrays = dict(self._arrays)
+            # Filtered queries only scan the rows that match (and deleted
+            # rows are filtered out like non-matching ones)
+            candidates = (self._matching_rows(where or {})
+                          if where or self._deleted_rows else None)
+        
+        total = n if candidates is None else len(candidates)
+        if total == 0 or not embeddings:
+            return [[] for _ in embeddings], [[] for _ in embeddings]
+        
+        queries = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        k = min(top_k, total)
+        
+        if not use_codes:
+            rows, scores = self._blocked_top_k(
+                total, k, candidates,
+                lambda sel: self._float_scores(arrays, queries, sel)
+            )
+            return rows.tolist(), scores.tolist()
+        
+        # First pass over compact codes
+        shortlist_size = min(total, k * self.rescore_multiplier)
+        if self.quantization == "binary":
+            query_codes = quantize_binary(queries)
+            score_fn = lambda sel: -hamming_distances(
+                query_codes, np.asarray(arrays["codes"][sel])
+            ).astype(np.float32)
+        else:
+            score_fn = lambda sel: (
+                (queries @ np.asarray(arrays["codes"][sel], dtype=np.float32).T)
+                * arrays["code_scales"][sel]
+            )
+        shortlist, _ = self._blocked_top_k(total, shortlist_size, candidates, score_fn)
+        
+        # Rescore the shortlist against full-precision vectors
+        all_rows, all_scores = [], []
+        for q, shortlisted in enumerate(shortlist):
+            shortlisted = np.sort(shortlisted)
+            exact = self._float_rows(arrays, shortlisted) @ queries[q]
+            best = np.argsort(-exact)[:k]
+            all_rows.append(shortlisted[best].tolist())
+            all_scores.append(exact[best].tolist())
+        
+        return all_rows, all_scores
+    
+    def _matching_rows(self, where: Dict[str, Any]) -> np.ndarray:
+        """Row ids matching `where`, cached and kept current as records change."""
+        key = _where_key(where)
+        entry = self._where_cache.get(key)
+        if entry is None:
+            compiled = _compile_where(where)
+            entry = (compiled, self._filter_rows(compiled))
+            if len(self._where_cache) >= 256:
+                self._where_cache.clear()
+            self._where_cache[key] = entry
+        return entry[1]
+    
+    def _filter_rows(self, where: Dict[str, Any],
+                     rows: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Those of `rows` (default: all) matching compiled `where`, sorted."""
+        pmids = _pmid_condition(where)
+        if pmids is not None:
+            # Only the rows of the wanted papers need a look
+            indexed = {r for pmid in pmids for r in self._rows_of_pmid.get(pmid, ())}
+            rows = indexed if rows is None else indexed.intersection(rows)
+        elif rows is None:
+            rows = range(len(self.metadatas))
+        deleted = self._deleted_rows
+        return np.array(sorted(r for r in rows
+                               if r not in deleted and matches_where(self.metadatas[r], where)),
+                        dtype=np.int64)
+    
+    def _blocked_top_k(self, total: int, k: int, candidates: Optional[np.ndarray],
+                       score_block: Callable):
+        """
+        Stream blocks of scores, keeping a running top-k with argpartition.
+        
+        `score_block` receives a row selector: a slice over the whole
+        matrix, or a block of `candidates` row ids when filtering.
+        """
+        best_scores, best_rows = None, None
+        
+        for start in range(0, total, self.block_size):
+            end = min(start + self.block_size, total)
+            if candidates is None:
+                block_rows = np.arange(start, end)
+                scores = score_block(slice(start, end))
+            else:
+                block_rows = candidates[start:end]
+                scores = score_block(block_rows)
+            rows = np.broadcast_to(block_rows, scores.shape)
+            
+            if best_scores is not None:
+                scores = np.concatenate([best_scores, scores], axis=1)
+                rows = np.concatenate([best_rows, rows], axis=1)
+            
+            if scores.shape[1] > k:
+                keep = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, keep, axis=1)
+                rows = np.take_along_axis(rows, keep, axis=1)
+            best_scores, best_rows = scores, rows
+        
+        order = np.argsort(-best_scores, axis=1)
+        return (np.take_along_axis(best_rows, order, axis=1),
+                np.take_along_axis(best_scores, order, axis=1))
+    
+    def _float_scores(self, arrays: Dict[str, np.ndarray], queries: np.ndarray,
+                      sel) -> np.ndarray:
+        block = np.asarray(arrays["vectors"][sel], dtype=np.float32)
+        scores = queries @ block.T
+        if "scales" in arrays:
+            scores *= arrays["scales"][sel]
+        return scores
+    
+    def _float_rows(self, arrays: Dict[str, np.ndarray], rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(arrays["vectors"][rows], dtype=np.float32)
+        if "scales" in arrays:
+            vectors *= arrays["scales"][rows][:, None]
+        return vectors
+    
+    def _write(self, ids: List[str], embeddings: List[List[float]], texts: List[str],
+               metadatas: Optional[List[Dict[str, Any]]], overwrite: bool):
+        if not ids:
+            return
+        
+        metadatas = metadatas or [{} for _ in ids]
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        
+        with self._lock:
+            self._refresh()
+            
+            planned: Dict[str, int] = {}
+            next_row = len(self.ids)
+            rows, picks = [], []
+            for i, doc_id in enumerate(ids):
+                row = planned.get(doc_id, self._row_of.get(doc_id))
+                if row is None:
+                    row = next_row
+                    next_row += 1
+                elif not overwrite:
+                    continue
+                planned[doc_id] = row
+                rows.append(row)
+                picks.append(i)
+            
+            if not rows:
+                return
+            
+            encoded = self._encode(vectors[picks])
+            self._ensure_capacity(next_row, vectors.shape[1])
+            
+            if self.quantization is None:
+                # Codes left by a quantized writer would go stale; drop them
+                # so the next quantized open rebuilds them
+                for name in ("codes", "code_scales"):
+                    (self.path / f"{name}.npy").unlink(missing_ok=True)
+            
+            for name, values in encoded.items():
+                target = np.load(self.path / f"{name}.npy", mmap_mode="r+")
+                target[rows] = values
+                target.flush()
+                del target
+            
+            with open(self._records_path, "a", encoding="utf-8") as f:
+                for row, i in zip(rows, picks):
+                    f.write(json.dumps({
+                        "row": row,
+                        "id": ids[i],
+                        "text": texts[i],
+                        "metadata": metadatas[i]
+                    }) + "\n")
+            
+            self._refresh()
+    
+    def _encode(self, vectors: np.ndarray) -> Dict[str, np.ndarray]:
+        """Convert normalized float32 rows to every per-row file's contents."""
+        encoded = {}
+        
+        if self.dtype == "int8":
+            encoded["vectors"], encoded["scales"] = quantize_int8(vectors)
+        else:
+            encoded["vectors"] = vectors.astype(self.DTYPES[self.dtype])
+        
+        if self.quantization == "binary":
+            encoded["codes"] = quantize_binary(vectors)
+        elif self.quantization == "int8":
+            encoded["codes"], encoded["code_scales"] = quantize_int8(vectors)
+        
+        return encoded
+    
+    def _build_codes(self):
+        """Derive search codes for an index created without quantization."""
+        with self._lock:
+            n = len(self.ids)
+            arrays = dict(self._arrays)
+            capacity = arrays["vectors"].shape[0]
+            
+            files = {}
+            for start in range(0, n, self.block_size):
+                end = min(start + self.block_size, n)
+                block = self._float_rows(arrays, np.arange(start, end))
+                for name, values in self._encode(block).items():
+                    if name in ("vectors", "scales"):
+                        continue
+                    if name not in files:
+                        files[name] = np.lib.format.open_memmap(
+                            self.path / f"{name}.tmp.npy", mode="w+", dtype=values.dtype,
+                            shape=(capacity,) + values.shape[1:]
+                        )
+                    files[name][start:end] = values
+            
+            for target in files.values():
+                target.flush()
+            names = list(files)
+            files.clear()
+            for name in names:
+                os.replace(self.path / f"{name}.tmp.npy", self.path / f"{name}.npy")
+            
+            self._open_arrays()
+    
+    def _codes_current(self) -> bool:
+        """True if the code files on disk match the quantization mode and row count."""
+        codes = self._arrays.get("codes")
+        if codes is None or codes.shape[0] < len(self.ids):
+            return False
+        if self.quantization == "binary":
+            return codes.dtype == np.uint8
+        return codes.dtype == np.int8 and "code_scales" in self._arrays
+    
+    def _ensure_capacity(self, rows: int, dim: int):
+        """Grow the per-row files (doubling) and swap them in atomically."""
+        vectors_path = self.path / "vectors.npy"
+        current = np.load(vectors_path, mmap_mode="r") if vectors_path.exists() else None
+        if current is not None:
+            if current.shape[1] != dim:
+                raise ValueError(f"Index stores {current.shape[1]}-dim vectors, got {dim}")
+            if current.shape[0] >= rows:
+                return
+        
+        used = len(self.ids)
+        capacity = max(rows, 2 * (current.shape[0] if current is not None else 0), 1024)
+        
+        for name, values in self._encode(np.zeros((1, dim), dtype=np.float32)).items():
+            path = self.path / f"{name}.npy"
+            existing = np.load(path, mmap_mode="r") if path.exists() else None
+            self._grow_file(path, existing, used, (capacity,) + values.shape[1:], values.dtype)
+    
+    @staticmethod
+    def _grow_file(path: Path, current: Optional[np.ndarray], used: int, shape: tuple, dtype):
+        tmp = path.with_suffix(".tmp.npy")
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+        if current is not None and used:
+            grown[:used] = current[:used]
+        grown.flush()
+        del grown
+        os.replace(tmp, path)
+    
+    def _open_arrays(self):
+        self._arrays = {}
+        for name in ("vectors", "scales", "codes", "code_scales"):
+            path = self.path / f"{name}.npy"
+            if path.exists():
+                self._arrays[name] = np.load(path, mmap_mode="r")
+        
+        if self.dtype != "int8":
+            self._arrays.pop("scales", None)
+        if self.quantization != "int8":
+            self._arrays.pop("code_scales", None)
+        if self.quantization is None:
+            self._arrays.pop("codes", None)
+    
+    def _refresh(self):
+        """Pick up records appended since the last look (by us or another process)."""
+        if not self._records_path.exists():
+            return
+        
+        size = self._records_path.stat().st_size
+        if size == self._records_size:
+            return
+        
+        with open(self._records_path, "rb") as f:
+            f.seek(self._records_size)
+            data = f.read(size - self._records_size)
+        
+        # Ignore a line another process is still writing
+        complete = data[:data.rfind(b"\n") + 1]
+        changed = set()
+        for line in complete.decode("utf-8").splitlines():
+            record = json.loads(line)
+            row = record["row"]
+            if record.get("deleted"):
+                self._retire(row, record["id"])
+                changed.add(row)
+                continue
+            metadata = record["metadata"] or {}
+            if row == len(self.ids):
+                self.ids.append(record["id"])
+                self.texts.append(record["text"])
+                self.metadatas.append(metadata)
+            else:
+                old_pmid = self.metadatas[row].get("pmid")
+                if old_pmid is not None:
+                    self._rows_of_pmid[old_pmid].remove(row)
+                self.ids[row] = record["id"]
+                self.texts[row] = record["text"]
+                self.metadatas[row] = metadata
+            self._row_of[record["id"]] = row
+            if metadata.get("pmid") is not None:
+                self._rows_of_pmid.setdefault(metadata["pmid"], []).append(row)
+            changed.add(row)
+        self._records_size += len(complete)
+        
+        # Re-evaluate cached filters on the changed rows only
+        if changed and self._where_cache:
+            changed_rows = np.fromiter(changed, dtype=np.int64, count=len(changed))
+            for key, (where, rows) in self._where_cache.items():
+                kept = rows[~np.isin(rows, changed_rows)]
+                self._where_cache[key] = (where, np.union1d(kept, self._filter_rows(where, changed)))
+        
+        self._open_arrays()
+    
+    def _retire(self, row: int, doc_id: str):
+        if self._row_of.get(doc_id) == row:
+            del self._row_of[doc_id]
+        pmid = self.metadatas[row].get("pmid")
+        if pmid is not None and row in self._rows_of_pmid.get(pmid, ()):
+            self._rows_of_pmid[pmid].remove(row)
+        self.texts[row] = ""
+        self.metadatas[row] = {}
+        self._deleted_rows.add(row)
+    
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
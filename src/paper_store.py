@@ -0,0 +1,132 @@
+"""Paper-Level Metadata Side Table"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from .data_ingestion import PaperMeta
+
+
+class PaperTable:
+    """
+    pmid -> PaperMeta, stored once per paper instead of once per chunk.
+    
+    Vector records only keep the pmid and the chunk's position; title,
+    authors, journal and doi are joined back in from here at query time.
+    Journal and author indexes let QueryFilter resolve those conditions
+    to a pmid set before the vector search.
+    
+    Persisted as append-only JSON lines (`papers.jsonl`, last line per
+    pmid wins); `directory=None` keeps it in memory only. Lines appended
+    by another instance (e.g. a bulk ingest in another process) are
+    picked up by `refresh()`, which every method but `get` runs first.
+    One writer at a time is supported, as for `NumpyBackend`.
+    """
+    
+    FILE = "papers.jsonl"
+    
+    def __init__(self, directory: Optional[str] = None):
+        self.path = Path(directory) / self.FILE if directory else None
+        self._papers: Dict[str, PaperMeta] = {}
+        self._by_journal: Dict[str, Set[str]] = {}
+        self._by_author: Dict[str, Set[str]] = {}
+        # Bytes of the file read so far
+        self._size = 0
+        self._lock = threading.Lock()
+        
+        self.refresh()
+    
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._papers)
+    
+    def __contains__(self, pmid: str) -> bool:
+        self.refresh()
+        return pmid in self._papers
+    
+    def __iter__(self) -> Iterator[PaperMeta]:
+        self.refresh()
+        return iter(list(self._papers.values()))
+    
+    def get(self, pmid: Optional[str]) -> Optional[PaperMeta]:
+        """Lookup as of the last refresh (called per query hit, so no stat here)."""
+        return self._papers.get(pmid) if pmid else None
+    
+    def refresh(self):
+        """Read lines appended to the file since the last look."""
+        if self.path is None:
+            return
+        with self._lock:
+            self._read_new()
+    
+    def put(self, papers: Iterable[PaperMeta]):
+        """Add or replace papers; only new or changed ones are written."""
+        with self._lock:
+            if self.path is not None:
+                self._read_new()
+            changed: List[PaperMeta] = []
+            for paper in papers:
+                if self._papers.get(paper.pmid) != paper:
+                    self._index(paper)
+                    changed.append(paper)
+            
+            if changed and self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "ab") as f:
+                    f.write("".join(json.dumps(paper.to_dict()) + "\n"
+                                    for paper in changed).encode("utf-8"))
+                    self._size = f.tell()
+    
+    def select(self, journals: Optional[List[str]] = None,
+               authors: Optional[List[str]] = None) -> Set[str]:
+        """pmids matching any of `journals` and any of `authors` (both if given)."""
+        self.refresh()
+        result: Optional[Set[str]] = None
+        if journals:
+            result = set().union(*(self._by_journal.get(j, ()) for j in journals))
+        if authors:
+            by_author = set().union(*(self._by_author.get(a, ()) for a in authors))
+            result = by_author if result is None else result & by_author
+        return result if result is not None else set(self._papers)
+    
+    def _index(self, paper: PaperMeta):
+        old = self._papers.get(paper.pmid)
+        if old is not None:
+            self._by_journal.get(old.journal, set()).discard(old.pmid)
+            for author in old.authors:
+                self._by_author.get(author, set()).discard(old.pmid)
+        
+        self._papers[paper.pmid] = paper
+        self._by_journal.setdefault(paper.journal, set()).add(paper.pmid)
+        for author in paper.authors:
+            self._by_author.setdefault(author, set()).add(paper.pmid)
+    
+    def _read_new(self):
+        try:
+            size = self.path.stat().st_size
+        except OSError:
+            return
+        if size == self._size:
+            return
+        if size < self._size:
+            # Rewritten (e.g. restored) under us: start over
+            self._papers, self._by_journal, self._by_author = {}, {}, {}
+            self._size = 0
+        
+        with open(self.path, "rb") as f:
+            f.seek(self._size)
+            data = f.read(size - self._size)
+        # A line still being written is read on a later refresh
+        complete = data[:data.rfind(b"\n") + 1]
+        self._size += len(complete)
+        
+        for line in complete.decode("utf-8").splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                self._index(PaperMeta.from_dict(json.loads(line)))
+            except (ValueError, KeyError):
+                # Torn line from an interrupted write
+                continue
@@ -1,13 +1,26 @@
 """NeuroLitRAG Pipeline - Main RAG Orchestration"""
 
+import asyncio
+import hashlib
 import os
-from typing import Dict, Any
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 
 from .embeddings import CohereEmbedder
-from .vector_store import VectorStore
-from .reranker import CohereReranker
-from .generator import AnswerGenerator
-from .data_ingestion import TextChunker, DEMO_PAPERS
+from .embedding_cache import EmbeddingCache
+from .answer_cache import SemanticAnswerCache
+from .vector_store import QueryFilter, VectorStore
+from .reranker import CohereReranker, RerankedResult
+from .generator import AnswerGenerator, Citation, GeneratedAnswer
+from .data_ingestion import Chunk, TextChunker, DEMO_PAPERS, count_tokens
+from .tracing import NULL_TRACE, TraceHook, Tracer
+from .cohere_client import CohereClientFactory, LazyClient
+from .deadline import Deadline, DeadlineExceeded, Hedger
+from .cascade import CascadePlan, RerankCascade
+from .warmup import HotAnswers, QueryLog, SpendBudget, WarmupScheduler
+from .projection import Projection
 
 
 class NeuroLitRAG:
@@ -20,93 +33,920 @@ class NeuroLitRAG:
         result = rag.query("What is the role of the hippocampus?")
     """
     
-    def __init__(self, top_k_retrieve: int = 20, top_n_rerank: int = 5):
-        if not os.getenv("COHERE_API_KEY"):
+    MAX_ANSWER_TOKENS = 1024
+    MIN_ANSWER_TOKENS = 64
+    
+    def __init__(self, top_k_retrieve: int = 20, top_n_rerank: int = 5,
+                 embedding_cache_dir: Optional[str] = "./data/embedding_cache",
+                 answer_cache_threshold: Optional[float] = None,
+                 answer_cache_ttl: float = 3600.0, answer_cache_size: int = 1000,
+                 vector_backend: str = "chroma",
+                 vector_store_options: Optional[Dict[str, Any]] = None,
+                 max_context_tokens: Optional[int] = 4000,
+                 tracing: bool = False,
+                 trace_hooks: Optional[List[TraceHook]] = None,
+                 cohere_client=None, cohere_async_client=None,
+                 client_factory: Optional[CohereClientFactory] = None,
+                 embed_coalesce_window_ms: Optional[float] = None,
+                 query_deadline_ms: Optional[float] = None,
+                 stage_shares: Optional[Dict[str, float]] = None,
+                 generate_ms_per_token: float = 20.0,
+                 rerank_cascade: bool = False,
+                 cascade_options: Optional[Dict[str, Any]] = None,
+                 query_log_path: Optional[str] = None,
+                 query_log_size: int = 1000,
+                 projection_dim: Optional[int] = None,
+                 projection_kind: str = "pca"):
+        # Injected clients (e.g. fake_cohere.FakeCohereClient) and factories
+        # bring their own key
+        if cohere_client is None and client_factory is None and not os.getenv("COHERE_API_KEY"):
             raise ValueError("COHERE_API_KEY not found!")
         
         self.top_k_retrieve = top_k_retrieve
         self.top_n_rerank = top_n_rerank
         
-        self.embedder = CohereEmbedder()
-        self.vector_store = VectorStore()
-        self.reranker = CohereReranker()
-        self.generator = AnswerGenerator()
+        cache = EmbeddingCache(embedding_cache_dir) if embedding_cache_dir else None
+        # One pooled client pair shared by embed, rerank and chat (and by
+        # every pipeline in the process using the same key)
+        self.client_factory = None
+        timeouts: Dict[str, Optional[float]] = {}
+        if cohere_client is None:
+            self.client_factory = client_factory or CohereClientFactory.shared()
+            cohere_client = self.client_factory.client
+            # The async pool is only built if an async path runs
+            cohere_async_client = cohere_async_client or LazyClient(
+                lambda: self.client_factory.async_client
+            )
+            timeouts = self.client_factory.timeouts
+        
+        clients = {"client": cohere_client, "async_client": cohere_async_client}
+        self.embedder = CohereEmbedder(cache=cache, timeout=timeouts.get("embed"),
+                                       coalesce_window_ms=embed_coalesce_window_ms, **clients)
+        self.vector_store = VectorStore(backend=vector_backend, **(vector_store_options or {}))
+        self.reranker = CohereReranker(timeout=timeouts.get("rerank"), **clients)
+        self.generator = AnswerGenerator(max_context_tokens=max_context_tokens,
+                                         timeout=timeouts.get("chat"), **clients)
         self.chunker = TextChunker()
+        self.tracer = Tracer(enabled=tracing, hooks=trace_hooks)
+        
+        # Latency budget for `query` (None = no deadline) and hedging of embed/rerank
+        self.query_deadline_ms = query_deadline_ms
+        self.stage_shares = stage_shares
+        self.generate_ms_per_token = generate_ms_per_token
+        self.hedger = Hedger()
+        
+        # Optional dimensionality reduction: fitted by `fit_projection` on a
+        # sample of the corpus before a new index is filled, then kept with
+        # it and applied to queries
+        self.projection_dim = projection_dim
+        self.projection_kind = projection_kind
+        stored = self.vector_store.projection
+        if projection_dim is not None:
+            if stored is not None and (stored.kind, stored.dim) != (projection_kind, projection_dim):
+                raise ValueError(
+                    f"Index uses a {stored.kind} projection to {stored.dim} dims; "
+                    f"rebuild it to change the projection"
+                )
+            if stored is None and self.vector_store.count:
+                raise ValueError("Index holds full-width vectors; rebuild it to add a projection")
+        self.embedder.projection = stored
+        
+        # Opt-in vector + BM25 pre-pruning ahead of Cohere Rerank (None = rerank everything)
+        self.cascade = RerankCascade(**(cascade_options or {})) if rerank_cascade else None
+        
+        # Opt-in reuse of answers across paraphrased questions with the same
+        # evidence (None = off); 0.95 cosine is a reasonable starting point
+        self.answer_cache = None
+        if answer_cache_threshold is not None:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=answer_cache_threshold,
+                ttl_seconds=answer_cache_ttl,
+                max_entries=answer_cache_size
+            )
+        
+        # Question frequencies, and exact-match answers for the hot ones
+        # (tagged with corpus_version)
+        self.query_log = QueryLog(query_log_path, max_entries=query_log_size)
+        self.hot_answers = HotAnswers()
+        self._local_changes = 0
+        self.warmup: Optional[WarmupScheduler] = None
     
     def load_demo_data(self) -> Dict[str, int]:
-        """Load demo papers."""
-        all_chunks = []
-        for paper in DEMO_PAPERS:
-            chunks = self.chunker.chunk_paper(paper)
-            all_chunks.extend(chunks)
+        """
+        Load demo papers. Chunks already in the store are skipped.
+        
+        When the persisted index was built from exactly this corpus (same
+        fingerprint), it is reused as-is without touching the store.
+        """
+        all_chunks = list(self.chunker.chunk_papers(DEMO_PAPERS))
+        fingerprint = self.corpus_fingerprint(all_chunks)
+        
+        if (self.vector_store.count >= len(all_chunks)
+                and self.vector_store.get_fingerprint("demo") == fingerprint):
+            counts = {"added": 0, "updated": 0, "skipped": len(all_chunks), "warm_start": True}
+        else:
+            counts = self.ingest(all_chunks)
+            self.vector_store.set_fingerprint("demo", fingerprint)
+        
+        return {"papers": len(DEMO_PAPERS), "chunks": len(all_chunks), **counts}
+    
+    def corpus_fingerprint(self, chunks: List[Chunk]) -> str:
+        """Hash of every chunk's id and content, the embed model and metadata layout."""
+        digest = hashlib.sha256(
+            f"{self.embedder.model}|{VectorStore.METADATA_VERSION}".encode("utf-8")
+        )
+        for chunk in sorted(chunks, key=lambda c: c.chunk_id):
+            digest.update(f"{chunk.chunk_id}:{chunk.content_hash}\n".encode("utf-8"))
+        return digest.hexdigest()
+    
+    def ingest(self, chunks: List[Chunk]) -> Dict[str, int]:
+        """
+        Incrementally ingest chunks.
+        
+        Compares each chunk's content hash with the one stored in the
+        vector store and only embeds and upserts new or changed chunks.
+        Stored chunks of the same papers that the new chunking no longer
+        produces are deleted, so pass every chunk of each paper.
+        A new projected index fits its projection on all of these
+        embeddings before storing any.
+        """
+        trace = self.tracer.trace("ingest")
+        
+        with trace.span("plan", docs=len(chunks)):
+            pending, stale, counts = self.plan_ingest(chunks)
         
-        texts = [c.text for c in all_chunks]
-        embeddings = self.embedder.embed_documents(texts, show_progress=False)
+        if pending:
+            with trace.span("embed_documents", docs=len(pending)) as span:
+                if trace.enabled:
+                    span.set(tokens=sum(count_tokens(c.text) for c in pending))
+                embeddings = self.embedder.embed_documents(
+                    [c.text for c in pending], show_progress=False
+                )
+            if self.projection_pending:
+                self._attach_projection(embeddings)
+            with trace.span("store", docs=len(pending)):
+                self.store_chunks(pending, embeddings)
+        if stale:
+            with trace.span("remove", docs=len(stale)):
+                self.remove_chunks(stale)
         
-        self.vector_store.add(
-            ids=[c.chunk_id for c in all_chunks],
+        trace.finish(**counts)
+        return counts
+    
+    def export_snapshot(self, path: str, dtype: str = "float16") -> Dict[str, Any]:
+        """Write the whole index (vectors, chunks, papers) to one snapshot file."""
+        from .snapshot import export_snapshot
+        return export_snapshot(self.vector_store, path, dtype=dtype,
+                               info={"embed_model": self.embedder.model})
+    
+    def restore_snapshot(self, path: str, verify: bool = True) -> Dict[str, Any]:
+        """
+        Provision this node's index from a snapshot, without API calls.
+        
+        The snapshot must come from the same embed model.
+        """
+        from .snapshot import SnapshotError, read_directory, restore_snapshot
+        
+        model = read_directory(path).get("info", {}).get("embed_model")
+        if model and model != self.embedder.model:
+            raise SnapshotError(f"Snapshot was embedded with {model}, not {self.embedder.model}")
+        
+        result = restore_snapshot(path, self.vector_store, verify=verify)
+        self.embedder.projection = self.vector_store.projection
+        if self.answer_cache is not None:
+            self.answer_cache.clear()
+        self._corpus_changed()
+        return result
+    
+    def ingest_files(self, paths: List[str], **options) -> Dict[str, Any]:
+        """
+        Stream PubMed XML / JSONL files into the index.
+        
+        See `bulk_ingestion.BulkIngestor` for options (batch_size,
+        parse_workers, queue_size, projection_sample, dedup_max_bytes).
+        """
+        from .bulk_ingestion import BulkIngestor
+        return BulkIngestor(self, **options).ingest_files(paths)
+    
+    def plan_ingest(self, chunks: List[Chunk]) -> tuple:
+        """
+        Find the chunks that are new or changed, and the stored chunks of
+        the same papers that `chunks` no longer contains (e.g. an edited
+        paper that now splits into fewer windows).
+        
+        `chunks` must hold every chunk of each paper it touches. Returns
+        (pending chunks, stale ids, {"added", "updated", "skipped",
+        "removed"} counts).
+        """
+        # Last occurrence wins for duplicate ids within one call
+        chunks = list({c.chunk_id: c for c in chunks}.values())
+        
+        current = {c.chunk_id for c in chunks}
+        stored = self.vector_store.ids_by_pmid(sorted({c.paper_id for c in chunks}))
+        stale = [doc_id for ids in stored.values() for doc_id in ids if doc_id not in current]
+        
+        existing = self.vector_store.get_metadatas([c.chunk_id for c in chunks])
+        
+        pending = [
+            c for c in chunks
+            if existing.get(c.chunk_id, {}).get("content_hash") != c.content_hash
+            or existing[c.chunk_id].get("meta_version") != VectorStore.METADATA_VERSION
+        ]
+        
+        updated = sum(1 for c in pending if c.chunk_id in existing)
+        return pending, stale, {
+            "added": len(pending) - updated,
+            "updated": updated,
+            "skipped": len(chunks) - len(pending),
+            "removed": len(stale)
+        }
+    
+    def store_chunks(self, chunks: List[Chunk], embeddings: List[List[float]]):
+        """Upsert embedded chunks and drop cached answers built on them."""
+        embeddings = self._project_documents(embeddings)
+        self.vector_store.upsert(
+            ids=[c.chunk_id for c in chunks],
             embeddings=embeddings,
-            texts=texts,
-            metadatas=[c.metadata for c in all_chunks]
+            texts=[c.text for c in chunks],
+            metadatas=[
+                {**c.record_metadata(), "content_hash": c.content_hash}
+                for c in chunks
+            ],
+            papers=list({c.paper_id: c.paper for c in chunks if c.paper is not None}.values())
         )
         
-        return {"papers": len(DEMO_PAPERS), "chunks": len(all_chunks)}
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(c.chunk_id for c in chunks)
+        self._corpus_changed()
     
-    def query(self, question: str, use_reranking: bool = True) -> Dict[str, Any]:
-        """Query the RAG system."""
+    @property
+    def projection_pending(self) -> bool:
+        """A projection is configured but not fitted yet (a new index)."""
+        return self.projection_dim is not None and self.vector_store.projection is None
+    
+    def fit_projection(self, chunks: Iterable[Chunk], sample_size: int = 20000,
+                       seed: int = 0) -> Dict[str, Any]:
+        """
+        Fit the configured projection on a uniform sample of `chunks` (the
+        whole corpus to be ingested, streamed) and attach it to the index.
+        
+        Must run before the first chunk is stored. Only the sample is
+        embedded; with the embedding cache on, ingesting it later is free.
+        """
+        if self.projection_dim is None:
+            raise ValueError("No projection configured (projection_dim=None)")
+        if self.vector_store.projection is not None:
+            raise ValueError("The index already has a projection; rebuild it to refit")
         
+        # Reservoir sample, so `chunks` can be a stream over the corpus
+        rng = random.Random(seed)
+        sample: List[str] = []
+        seen = 0
+        for chunk in chunks:
+            seen += 1
+            if len(sample) < sample_size:
+                sample.append(chunk.text)
+            else:
+                slot = rng.randrange(seen)
+                if slot < sample_size:
+                    sample[slot] = chunk.text
+        if not sample:
+            raise ValueError("No chunks to fit the projection on")
+        
+        projection = self._attach_projection(
+            self.embedder.embed_documents(sample, show_progress=False)
+        )
+        return {**projection.describe(), "sampled": len(sample), "seen": seen}
+    
+    def _attach_projection(self, embeddings: List[List[float]]) -> Projection:
+        projection = Projection.fit(embeddings, self.projection_dim, self.projection_kind)
+        self.vector_store.set_projection(projection)
+        self.embedder.projection = projection
+        return projection
+    
+    def remove_chunks(self, ids: List[str]):
+        """Delete chunks by id and drop cached answers built on them."""
+        self.vector_store.delete(ids)
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(ids)
+        self._corpus_changed()
+    
+    def _project_documents(self, embeddings: List[List[float]]):
+        """Apply the index's projection to full-width document embeddings."""
+        if self.projection_pending:
+            raise ValueError(
+                "The projection is not fitted yet; call fit_projection() on a sample "
+                "of the corpus before storing chunks"
+            )
+        projection = self.vector_store.projection
+        return projection.apply(embeddings) if projection is not None else embeddings
+    
+    def evaluate_projections(self, questions: Optional[List[str]] = None,
+                             **options) -> Dict[str, Any]:
+        """
+        Recall@k, vector size and latency of candidate projections of
+        this (full-width) index; see `projection.evaluate_projections`.
+        
+        `questions` defaults to the 200 most frequent in the query log.
+        """
+        from .projection import evaluate_projections
+        
+        if self.vector_store.projection is not None:
+            raise ValueError("The index is already projected; evaluate on a full-width index")
+        questions = questions or [q for q, _ in self.query_log.top(200)]
+        if not questions:
+            raise ValueError("No questions to evaluate with (the query log is empty)")
+        return evaluate_projections(self.vector_store, self.embedder.embed_queries(questions),
+                                    **options)
+    
+    @property
+    def corpus_version(self) -> Tuple[Any, ...]:
+        """
+        Changes whenever the index does: writes from this pipeline, and
+        the persisted row count, fingerprints and the backend's content
+        revision (which also move when another process writes to the
+        same index, upserts of existing ids included).
+        """
+        return (self._local_changes, *self.vector_store.revision())
+    
+    def _corpus_changed(self):
+        self._local_changes += 1
+        if self.warmup is not None:
+            self.warmup.notify()
+    
+    def start_warmup(self, pinned: Optional[List[str]] = None, top_n: int = 20,
+                     interval_seconds: float = 300.0,
+                     budget: Optional[SpendBudget] = None, **options) -> WarmupScheduler:
+        """
+        Precompute answers for `pinned` questions and the `top_n` most
+        frequent ones in the background; they are then answered without
+        any API call until the corpus changes. See `warmup.WarmupScheduler`.
+        """
+        if self.warmup is not None:
+            self.warmup.stop()
+        self.warmup = WarmupScheduler(self, pinned=pinned, top_n=top_n,
+                                      interval_seconds=interval_seconds,
+                                      budget=budget, **options)
+        return self.warmup.start()
+    
+    def close(self):
+        """Stop the warm-up thread and the vector store's worker pools."""
+        if self.warmup is not None:
+            self.warmup.stop()
+            self.warmup = None
+        self.vector_store.close()
+    
+    def warm(self, question: str, use_reranking: bool = True) -> Dict[str, Any]:
+        """Run the full query for `question` and keep it as a hot answer."""
+        version = self.corpus_version
+        result = self._query(question, use_reranking, None, False, None)
+        if "error" not in result:
+            self.hot_answers.put(question, use_reranking, version, result)
+        return result
+    
+    def _hot_answer(self, question: str, use_reranking: bool,
+                    filters: Optional[QueryFilter]) -> Optional[Dict[str, Any]]:
+        """Log the question; return its warmed result if there is a fresh one."""
+        if filters is not None:
+            return None
+        self.query_log.record(question)
+        hit = self.hot_answers.get(question, use_reranking, self.corpus_version)
+        if hit is None:
+            return None
+        return {**hit, "question": question, "cache_hit": True}
+    
+    def query(self, question: str, use_reranking: bool = True,
+              filters: Optional[QueryFilter] = None,
+              include_trace: bool = False,
+              deadline_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Query the RAG system.
+        
+        `filters` (year range, journals, authors) is applied inside the
+        vector search, so every retrieval slot goes to an in-scope document.
+        With `include_trace`, per-stage timings are returned under "trace"
+        (recorded for this query even when `tracing` is off).
+        `deadline_ms` (default `query_deadline_ms`) bounds the whole query;
+        see `_query_with_deadline`. Unfiltered questions are counted in
+        `query_log`, and warmed ones (see `start_warmup`) return at once.
+        """
+        hot = self._hot_answer(question, use_reranking, filters)
+        if hot is not None:
+            trace = self.tracer.trace("query", force=include_trace)
+            return self._finish_trace(trace, hot, include_trace)
+        
+        deadline_ms = deadline_ms if deadline_ms is not None else self.query_deadline_ms
+        return self._query(question, use_reranking, filters, include_trace, deadline_ms)
+    
+    def _query(self, question: str, use_reranking: bool, filters: Optional[QueryFilter],
+               include_trace: bool, deadline_ms: Optional[float]) -> Dict[str, Any]:
         if self.vector_store.count == 0:
             return {"error": "No documents loaded."}
         
+        trace = self.tracer.trace("query", force=include_trace)
+        
+        if deadline_ms is not None:
+            deadline = Deadline(deadline_ms, self.stage_shares)
+            result = self._query_with_deadline(question, use_reranking, filters, deadline, trace)
+            return self._finish_trace(trace, result, include_trace)
+        
         # 1. Embed query
-        query_embedding = self.embedder.embed_query(question)
+        with trace.span("embed") as span:
+            if trace.enabled:
+                span.set(tokens=count_tokens(question))
+            query_embedding = self.embedder.embed_query(question)
         
         # 2. Retrieve candidates
-        retrieved = self.vector_store.query(
-            embedding=query_embedding,
-            top_k=self.top_k_retrieve
+        with trace.span("retrieve") as span:
+            retrieved = self.vector_store.query(
+                embedding=query_embedding,
+                top_k=self.top_k_retrieve,
+                filters=filters
+            )
+            span.set(docs=len(retrieved))
+        
+        result = self._answer(question, query_embedding, retrieved, use_reranking, trace)
+        return self._finish_trace(trace, result, include_trace)
+    
+    def query_stream(self, question: str, use_reranking: bool = True,
+                     filters: Optional[QueryFilter] = None,
+                     include_trace: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Query the RAG system, streaming the answer.
+        
+        Yields {"type": "text", "text": delta} while the answer is generated,
+        {"type": "citation", "citation": {...}} as [n] markers resolve, and
+        a final {"type": "end", "result": {...}} with the same dict `query`
+        returns (citations, rerank scores, ...). There is no deadline
+        here: `query_deadline_ms` and hedging apply only to `query`.
+        """
+        
+        hot = self._hot_answer(question, use_reranking, filters)
+        if hot is not None:
+            trace = self.tracer.trace("query_stream", force=include_trace)
+            yield from self._replay(trace, hot, include_trace)
+            return
+        
+        if self.vector_store.count == 0:
+            yield {"type": "end", "result": {"error": "No documents loaded."}}
+            return
+        
+        trace = self.tracer.trace("query_stream", force=include_trace)
+        
+        with trace.span("embed") as span:
+            if trace.enabled:
+                span.set(tokens=count_tokens(question))
+            query_embedding = self.embedder.embed_query(question)
+        with trace.span("retrieve") as span:
+            retrieved = self.vector_store.query(
+                embedding=query_embedding,
+                top_k=self.top_k_retrieve,
+                filters=filters
+            )
+            span.set(docs=len(retrieved))
+        
+        cached = self._cached_answer(question, query_embedding, retrieved, use_reranking)
+        if cached is not None:
+            yield from self._replay(trace, cached, include_trace)
+            return
+        
+        context_docs, rerank_scores, plan = self._select_context(
+            question, retrieved, use_reranking, trace, self._rerank_call(question)
+        )
+        
+        # The generate span includes time the consumer spends between events
+        with trace.span("generate", docs=len(context_docs)) as span:
+            for event in self.generator.generate_stream(query=question, context_docs=context_docs):
+                if event["type"] == "text":
+                    if "first_token_ms" not in span.attributes and trace.enabled:
+                        span.set(first_token_ms=round((time.perf_counter() - span.start) * 1000, 3))
+                    yield event
+                elif event["type"] == "citation":
+                    yield {"type": "citation", "citation": self._citation_dict(event["citation"])}
+                else:
+                    answer = event["answer"]
+                    self._record_answer(span, trace, answer)
+                    formatted = self._format_result(question, answer, rerank_scores, plan)
+                    self._cache_answer(query_embedding, retrieved, use_reranking, formatted)
+        
+        yield {"type": "end", "result": self._finish_trace(trace, formatted, include_trace)}
+    
+    def _replay(self, trace, result: Dict[str, Any],
+                include_trace: bool) -> Iterator[Dict[str, Any]]:
+        """Stream events for an already computed result."""
+        yield {"type": "text", "text": result["answer"]}
+        for citation in result["citations"]:
+            yield {"type": "citation", "citation": citation}
+        yield {"type": "end", "result": self._finish_trace(trace, result, include_trace)}
+    
+    def query_many(self, questions: List[str], use_reranking: bool = True,
+                   max_concurrency: int = 8,
+                   filters: Optional[QueryFilter] = None,
+                   include_trace: bool = False) -> List[Dict[str, Any]]:
+        """
+        Answer many questions at once.
+        
+        Questions are embedded in batched Embed calls and retrieved with a
+        single vector store query; rerank and generation then run on a
+        bounded thread pool. Results come back in input order, and a
+        failing question yields {"question", "error"} instead of raising.
+        """
+        if not questions:
+            return []
+        
+        if self.vector_store.count == 0:
+            return [{"question": q, "error": "No documents loaded."} for q in questions]
+        
+        # Batched stages are traced once for the whole batch; each question
+        # then gets its own trace for rerank and generation
+        trace = self.tracer.trace("query_many")
+        try:
+            with trace.span("embed", docs=len(questions)):
+                embeddings = self.embedder.embed_queries(questions)
+            with trace.span("retrieve", docs=len(questions)):
+                retrieved_sets = self.vector_store.query_many(
+                    embeddings=embeddings,
+                    top_k=self.top_k_retrieve,
+                    filters=filters
+                )
+            tasks = [
+                (self._traced_answer, question, embedding, retrieved, use_reranking, include_trace)
+                for question, embedding, retrieved
+                in zip(questions, embeddings, retrieved_sets)
+            ]
+        except Exception:
+            # Batched stages failed; fall back to per-question queries so
+            # one bad input cannot sink the whole batch
+            tasks = [
+                (self.query, question, use_reranking, filters, include_trace)
+                for question in questions
+            ]
+        trace.finish(questions=len(questions))
+        
+        def run(task):
+            fn, question, *args = task
+            try:
+                return fn(question, *args)
+            except Exception as e:
+                return {"question": question, "error": str(e)}
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            return list(pool.map(run, tasks))
+    
+    async def aquery(self, question: str, use_reranking: bool = True,
+                     filters: Optional[QueryFilter] = None,
+                     include_trace: bool = False) -> Dict[str, Any]:
+        """
+        Query the RAG system from a coroutine.
+        
+        Embed, rerank and chat go through the async Cohere clients;
+        Chroma calls and candidate selection run in the default executor
+        so the event loop never blocks on them. `query_deadline_ms` and hedging do not apply;
+        bound the call with `asyncio.wait_for` instead.
+        """
+        
+        hot = self._hot_answer(question, use_reranking, filters)
+        if hot is not None:
+            trace = self.tracer.trace("aquery", force=include_trace)
+            return self._finish_trace(trace, hot, include_trace)
+        
+        count = await asyncio.to_thread(lambda: self.vector_store.count)
+        if count == 0:
+            return {"error": "No documents loaded."}
+        
+        trace = self.tracer.trace("aquery", force=include_trace)
+        
+        with trace.span("embed") as span:
+            if trace.enabled:
+                span.set(tokens=count_tokens(question))
+            query_embedding = await self.embedder.aembed_query(question)
+        
+        with trace.span("retrieve") as span:
+            retrieved = await asyncio.to_thread(
+                self.vector_store.query,
+                embedding=query_embedding,
+                top_k=self.top_k_retrieve,
+                filters=filters
+            )
+            span.set(docs=len(retrieved))
+        
+        cached = self._cached_answer(question, query_embedding, retrieved, use_reranking)
+        if cached is not None:
+            return self._finish_trace(trace, cached, include_trace)
+        
+        # The shared (sync) selection runs in a worker thread; its rerank
+        # call goes back to this loop on the async client
+        loop = asyncio.get_running_loop()
+        
+        def rerank(candidates: List[Dict[str, Any]]) -> List[RerankedResult]:
+            return asyncio.run_coroutine_threadsafe(
+                self.reranker.arerank_with_metadata(
+                    query=question, documents=candidates, text_key="text",
+                    top_n=self.top_n_rerank
+                ),
+                loop
+            ).result()
+        
+        context_docs, rerank_scores, plan = await asyncio.to_thread(
+            self._select_context, question, retrieved, use_reranking, trace, rerank
         )
         
+        with trace.span("generate", docs=len(context_docs)) as span:
+            result = await self.generator.agenerate(
+                query=question,
+                context_docs=context_docs
+            )
+            self._record_answer(span, trace, result)
+        
+        formatted = self._format_result(question, result, rerank_scores, plan)
+        self._cache_answer(query_embedding, retrieved, use_reranking, formatted)
+        return self._finish_trace(trace, formatted, include_trace)
+    
+    def _traced_answer(self, question: str, query_embedding: List[float],
+                       retrieved: List[Dict[str, Any]], use_reranking: bool,
+                       include_trace: bool) -> Dict[str, Any]:
+        trace = self.tracer.trace("query", force=include_trace)
+        result = self._answer(question, query_embedding, retrieved, use_reranking, trace)
+        return self._finish_trace(trace, result, include_trace)
+    
+    def _answer(self, question: str, query_embedding: List[float],
+                retrieved: List[Dict[str, Any]], use_reranking: bool,
+                trace=NULL_TRACE) -> Dict[str, Any]:
+        """Rerank retrieved candidates and generate the cited answer."""
+        
+        cached = self._cached_answer(question, query_embedding, retrieved, use_reranking)
+        if cached is not None:
+            return cached
+        
         # 3. Rerank
-        if use_reranking and retrieved:
-            reranked = self.reranker.rerank_with_metadata(
+        context_docs, rerank_scores, plan = self._select_context(
+            question, retrieved, use_reranking, trace, self._rerank_call(question)
+        )
+        
+        # 4. Generate answer
+        with trace.span("generate", docs=len(context_docs)) as span:
+            result = self.generator.generate(
                 query=question,
-                documents=retrieved,
-                text_key="text",
-                top_n=self.top_n_rerank
+                context_docs=context_docs
             )
+            self._record_answer(span, trace, result)
+        
+        formatted = self._format_result(question, result, rerank_scores, plan)
+        self._cache_answer(query_embedding, retrieved, use_reranking, formatted)
+        return formatted
+    
+    def _query_with_deadline(self, question: str, use_reranking: bool,
+                             filters: Optional[QueryFilter], deadline: Deadline,
+                             trace=NULL_TRACE) -> Dict[str, Any]:
+        """
+        Run a query within `deadline`, degrading instead of running over.
+        
+        - Embed and rerank are idempotent, so they are hedged: a second
+          request goes out once the first is slower than the stage's p95
+        - Rerank is skipped (vector order is used) when its share of the
+          budget is below its typical latency, or abandoned on timeout
+        - `max_tokens` is lowered to what fits in the remaining time
+        
+        The result lists what was given up under "degradations"; degraded
+        answers are not cached.
+        """
+        degradations: List[str] = []
+        
+        try:
+            # 1. Embed query (the hedge skips the coalescer's batching window).
+            # Each attempt gets what is left of the stage budget, retries
+            # included, so a losing attempt does not hold its worker for long
+            with trace.span("embed") as span:
+                if trace.enabled:
+                    span.set(tokens=count_tokens(question))
+                query_embedding = self.hedger.call(
+                    "embed",
+                    lambda: self.embedder.embed_query(question, timeout=deadline.for_stage("embed")),
+                    timeout=deadline.for_stage("embed"),
+                    hedge_fn=lambda: self.embedder.embed_queries(
+                        [question], timeout=deadline.for_stage("embed")
+                    )[0]
+                )
+            
+            # 2. Retrieve candidates (local, not worth bounding)
+            with trace.span("retrieve") as span:
+                retrieved = self.vector_store.query(
+                    embedding=query_embedding,
+                    top_k=self.top_k_retrieve,
+                    filters=filters
+                )
+                span.set(docs=len(retrieved))
+            
+            cached = self._cached_answer(question, query_embedding, retrieved, use_reranking)
+            if cached is not None:
+                return cached
+            
+            # 3. Rerank, unless the budget says it will not make it
+            def rerank(candidates: List[Dict[str, Any]]) -> Optional[List[RerankedResult]]:
+                budget = deadline.for_stage("rerank")
+                typical = self.hedger.tracker.percentile("rerank", 0.5, min_samples=5) or 0.0
+                if budget <= typical:
+                    degradations.append("rerank_skipped")
+                    return None
+                try:
+                    return self.hedger.call(
+                        "rerank", lambda: self._rerank_call(question, timeout=budget)(candidates),
+                        timeout=budget
+                    )
+                except DeadlineExceeded:
+                    degradations.append("rerank_timeout")
+                    return None
+            
+            context_docs, rerank_scores, plan = self._select_context(
+                question, retrieved, use_reranking, trace, rerank
+            )
+            
+            # 4. Generate, with as many tokens as the remaining time allows
+            max_tokens = self._answer_token_budget(deadline.remaining())
+            if max_tokens < self.MAX_ANSWER_TOKENS:
+                degradations.append("max_tokens_reduced")
+            
+            with trace.span("generate", docs=len(context_docs)) as span:
+                started = time.monotonic()
+                timeout = deadline.remaining()
+                result = self.hedger.call(
+                    "generate",
+                    lambda: self.generator.generate(
+                        query=question, context_docs=context_docs,
+                        max_tokens=max_tokens, timeout=timeout
+                    ),
+                    timeout=timeout, hedge=False
+                )
+                answer_tokens = count_tokens(result.answer)
+                if answer_tokens:
+                    self.hedger.tracker.record(
+                        "generate_token", (time.monotonic() - started) / answer_tokens
+                    )
+                span.set(tokens=result.context_tokens, tokens_saved=result.tokens_saved,
+                         answer_tokens=answer_tokens, max_tokens=max_tokens)
+        except DeadlineExceeded as e:
+            return {
+                "error": f"Query did not finish within {deadline.total * 1000:.0f} ms ({e.stage}).",
+                "degradations": degradations + [f"{e.stage}_timeout"],
+                "deadline_ms": deadline.total * 1000,
+                "elapsed_ms": round(deadline.elapsed() * 1000, 1)
+            }
+        
+        formatted = self._format_result(question, result, rerank_scores, plan)
+        if not degradations:
+            self._cache_answer(query_embedding, retrieved, use_reranking, formatted)
+        return {
+            **formatted,
+            "degradations": degradations,
+            "deadline_ms": deadline.total * 1000,
+            "elapsed_ms": round(deadline.elapsed() * 1000, 1)
+        }
+    
+    def _answer_token_budget(self, seconds: float) -> int:
+        """Answer tokens that fit in `seconds`, from observed or default decode speed."""
+        per_token = self.hedger.tracker.percentile("generate_token", 0.9, min_samples=5)
+        if per_token is None:
+            per_token = self.generate_ms_per_token / 1000.0
+        tokens = int(seconds / per_token)
+        return max(self.MIN_ANSWER_TOKENS, min(self.MAX_ANSWER_TOKENS, tokens))
+    
+    def _cached_answer(self, question: str, query_embedding: List[float],
+                       retrieved: List[Dict[str, Any]],
+                       use_reranking: bool) -> Optional[Dict[str, Any]]:
+        """Reuse the answer of a near-identical query over the same evidence."""
+        if self.answer_cache is None or not retrieved:
+            return None
+        
+        hit = self.answer_cache.lookup(
+            query_embedding, [r["id"] for r in retrieved], use_reranking
+        )
+        if hit is None:
+            return None
+        return {**hit, "question": question, "cache_hit": True}
+    
+    @staticmethod
+    def _finish_trace(trace, result: Dict[str, Any], include_trace: bool) -> Dict[str, Any]:
+        """Close the query trace; attach it without touching the cached result dict."""
+        trace.finish(cache_hit=bool(result.get("cache_hit")))
+        if include_trace:
+            return {**result, "trace": trace.to_dict()}
+        return result
+    
+    def connection_stats(self) -> Dict[str, Any]:
+        """HTTP connection reuse of the shared Cohere client pool."""
+        if self.client_factory is None:
+            return {}
+        return self.client_factory.connection_stats()
+    
+    def export_metrics(self, fmt: str = "prometheus") -> str:
+        """Process-wide stage histograms as Prometheus text or JSON."""
+        if fmt == "prometheus":
+            return self.tracer.registry.to_prometheus()
+        if fmt == "json":
+            return self.tracer.registry.to_json()
+        raise ValueError(f"Unknown metrics format: {fmt}")
+    
+    def _cache_answer(self, query_embedding: List[float], retrieved: List[Dict[str, Any]],
+                      use_reranking: bool, result: Dict[str, Any]):
+        if self.answer_cache is not None and retrieved:
+            self.answer_cache.put(
+                query_embedding, [r["id"] for r in retrieved], use_reranking, result
+            )
+    
+    def _plan_rerank(self, question: str, retrieved: List[Dict[str, Any]], span) -> CascadePlan:
+        """Run the cascade's cheap first stage (or pass everything through)."""
+        if self.cascade is None:
+            plan = CascadePlan(retrieved, "full", len(retrieved))
+        else:
+            plan = self.cascade.plan(question, retrieved, self.top_n_rerank)
+        span.set(cascade=plan.action, sent=0 if plan.skip else len(plan.candidates))
+        return plan
+    
+    def cascade_stats(self) -> Dict[str, Any]:
+        """How often Cohere Rerank calls were skipped or shrunk."""
+        return self.cascade.stats() if self.cascade is not None else {}
+    
+    def _select_context(self, question: str, retrieved: List[Dict[str, Any]],
+                        use_reranking: bool, trace,
+                        rerank: Callable[[List[Dict[str, Any]]], Optional[List[RerankedResult]]]
+                        ) -> tuple:
+        """
+        Candidate selection and context building for every query path:
+        the cascade's plan, then `rerank(candidates)` unless the plan skips
+        it (None from `rerank` falls back to the plan's order), then the
+        generation context.
+        
+        Returns (context_docs, rerank_scores, plan).
+        """
+        reranked, plan = None, None
+        if use_reranking and retrieved:
+            with trace.span("rerank", docs=len(retrieved)) as span:
+                plan = self._plan_rerank(question, retrieved, span)
+                if not plan.skip:
+                    reranked = rerank(plan.candidates)
+                    if reranked is not None:
+                        span.set(kept=len(reranked))
+        context_docs, rerank_scores = self._build_context(retrieved, reranked, plan)
+        return context_docs, rerank_scores, plan
+    
+    def _rerank_call(self, question: str, timeout: Optional[float] = None
+                     ) -> Callable[[List[Dict[str, Any]]], List[RerankedResult]]:
+        """Blocking Cohere Rerank of candidates for `question`."""
+        return lambda candidates: self.reranker.rerank_with_metadata(
+            query=question, documents=candidates, text_key="text",
+            top_n=self.top_n_rerank, timeout=timeout
+        )
+    
+    @staticmethod
+    def _record_answer(span, trace, answer: GeneratedAnswer):
+        span.set(tokens=answer.context_tokens, tokens_saved=answer.tokens_saved)
+        if trace.enabled:
+            span.set(answer_tokens=count_tokens(answer.answer))
+    
+    def _build_context(self, retrieved: List[Dict[str, Any]],
+                       reranked: Optional[List[RerankedResult]],
+                       plan: Optional[CascadePlan] = None) -> tuple:
+        """Pick the generation context from reranked, cascade- or vector-ordered results."""
+        if reranked is None and plan is not None:
+            retrieved = plan.candidates
+        if reranked is not None:
             context_docs = [
-                {"text": r.text, "metadata": r.metadata}
+                {"text": r.text, "metadata": r.metadata, "score": r.relevance_score}
                 for r in reranked
             ]
             rerank_scores = [r.relevance_score for r in reranked]
         else:
             context_docs = [
-                {"text": r["text"], "metadata": r["metadata"]}
+                {"text": r["text"], "metadata": r["metadata"], "score": r["score"]}
                 for r in retrieved[:self.top_n_rerank]
             ]
             rerank_scores = None
         
-        # 4. Generate answer
-        result = self.generator.generate(
-            query=question,
-            context_docs=context_docs
-        )
-        
+        return context_docs, rerank_scores
+    
+    @staticmethod
+    def _citation_dict(c: Citation) -> Dict[str, Any]:
+        return {
+            "number": c.number,
+            "title": c.title,
+            "authors": c.authors,
+            "year": c.year,
+            "journal": c.journal
+        }
+    
+    @staticmethod
+    def _format_result(question: str, result: GeneratedAnswer,
+                       rerank_scores: Optional[List[float]],
+                       plan: Optional[CascadePlan] = None) -> Dict[str, Any]:
         return {
             "question": question,
             "answer": result.answer,
-            "citations": [
-                {
-                    "number": c.number,
-                    "title": c.title,
-                    "authors": c.authors,
-                    "year": c.year,
-                    "journal": c.journal
-                }
-                for c in result.citations
-            ],
+            "citations": [NeuroLitRAG._citation_dict(c) for c in result.citations],
             "sources_used": result.sources_used,
-            "reranking_used": use_reranking,
-            "rerank_scores": rerank_scores[:3] if rerank_scores else None
+            # Rerank may have been skipped by the cascade or the deadline
+            "reranking_used": rerank_scores is not None,
+            "rerank_scores": rerank_scores[:3] if rerank_scores else None,
+            "context_tokens": result.context_tokens,
+            "tokens_saved": result.tokens_saved,
+            "rerank_cascade": plan.action if plan is not None else None
         }
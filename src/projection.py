@@ -0,0 +1,238 @@
+"""Embedding Dimensionality Reduction and Its Recall/Latency Evaluation"""
+
+import io
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .vector_store import VectorStore
+
+KINDS = ("pca", "truncate")
+
+
+class Projection:
+    """
+    Linear map from full-width embeddings down to `dim` dimensions.
+    
+    - "pca": the top `dim` principal axes of a sample of corpus
+      embeddings. The sample is not centered, so the projection keeps as
+      much of each dot product (and thus of the cosine ranking) as a
+      rank-`dim` map can
+    - "truncate": the first `dim` coordinates
+    
+    Outputs are L2-normalized. `retained` is the fraction of the sample's
+    energy the projection keeps (1.0 = lossless on the sample).
+    
+    Fit on a sample of the whole corpus (`NeuroLitRAG.fit_projection`),
+    not on whichever batch happens to be stored first.
+    """
+    
+    def __init__(self, kind: str, components: np.ndarray, retained: Optional[float] = None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown projection: {kind}")
+        self.kind = kind
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.retained = retained
+    
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+    
+    @property
+    def source_dim(self) -> int:
+        return self.components.shape[1]
+    
+    @classmethod
+    def fit(cls, embeddings, dim: int, kind: str = "pca",
+            max_samples: int = 50000, seed: int = 0) -> "Projection":
+        """Fit on (a random sample of at most `max_samples` of) `embeddings`."""
+        sample = np.asarray(embeddings, dtype=np.float32)
+        if sample.ndim != 2 or not 0 < dim < sample.shape[1]:
+            raise ValueError(f"Cannot project {sample.shape[-1]}-dim embeddings to {dim} dims")
+        if len(sample) > max_samples:
+            rows = np.random.default_rng(seed).choice(len(sample), max_samples, replace=False)
+            sample = sample[np.sort(rows)]
+        energy = float(np.square(sample).sum()) or 1.0
+        
+        if kind == "truncate":
+            components = np.eye(dim, sample.shape[1], dtype=np.float32)
+            return cls(kind, components, float(np.square(sample[:, :dim]).sum()) / energy)
+        if kind != "pca":
+            raise ValueError(f"Unknown projection: {kind}")
+        
+        # Right singular vectors of the sample = eigenvectors of X^T X. With
+        # fewer samples than `dim`, the axes past the sample's rank are an
+        # arbitrary orthonormal fill: dot products with sampled vectors
+        # are still kept exactly
+        gram = sample.T.astype(np.float64) @ sample
+        values, vectors = np.linalg.eigh(gram)
+        top = np.argsort(values)[::-1][:dim]
+        return cls(kind, vectors[:, top].T, float(values[top].sum()) / energy)
+    
+    def apply(self, embeddings) -> np.ndarray:
+        """(n, source_dim) -> (n, dim) float32, normalized rows."""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.shape[-1] != self.source_dim:
+            raise ValueError(f"Expected {self.source_dim}-dim embeddings, got {vectors.shape[-1]}")
+        if self.kind == "truncate":
+            projected = vectors[..., :self.dim].copy()
+        else:
+            projected = vectors @ self.components.T
+        # Axes the data barely spans yield subnormal values, which slow
+        # every later dot product on them by an order of magnitude
+        projected[np.abs(projected) < np.finfo(np.float32).tiny] = 0.0
+        norms = np.linalg.norm(projected, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return projected / norms
+    
+    def describe(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "dim": self.dim, "source_dim": self.source_dim,
+                "retained": round(self.retained, 4) if self.retained is not None else None}
+    
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez(buffer, kind=np.array(self.kind), components=self.components,
+                 retained=np.array(np.nan if self.retained is None else self.retained))
+        return buffer.getvalue()
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Projection":
+        with np.load(io.BytesIO(data)) as npz:
+            retained = float(npz["retained"])
+            return cls(str(npz["kind"]), npz["components"],
+                       None if np.isnan(retained) else retained)
+    
+    def save(self, path: Path):
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(self.to_bytes())
+        tmp.replace(path)
+    
+    @classmethod
+    def load(cls, path: Path) -> "Projection":
+        return cls.from_bytes(path.read_bytes())
+
+
+def evaluate_projections(store: "VectorStore", query_embeddings: List[List[float]],
+                         dims: Sequence[int] = (256, 384, 512),
+                         kinds: Sequence[str] = ("pca", "truncate"),
+                         top_k: int = 10, fit_samples: int = 50000, min_recall: float = 0.95,
+                         workdir: Optional[str] = None, batch_size: int = 10000,
+                         max_vectors: Optional[int] = 50000, seed: int = 0) -> Dict[str, Any]:
+    """
+    Compare full-width search over `store`'s vectors with each candidate
+    projection: recall@`top_k` against the full-width results, float32
+    vector bytes and per-query latency.
+    
+    Every variant (the full-width baseline included) is rebuilt as an
+    exact numpy index, so recall measures only what the projection loses.
+    `store` must hold full-width vectors and `query_embeddings` must be
+    unprojected query embeddings.
+    
+    Cost: one index build per variant (1 + len(kinds) * len(dims)), one
+    at a time under `workdir` (default: a temporary directory), each
+    deleted once measured. By default the variants are built over a
+    uniform random subset of `max_vectors` stored vectors, which bounds
+    disk to ~`max_vectors` full-width vectors and keeps the run in
+    seconds; None evaluates the whole index (recall is then exact, at
+    the cost of a full copy and rebuild per variant). The projections
+    are fitted on (at most `fit_samples` of) the same subset.
+    
+    "recommended" names the smallest variant with recall >= `min_recall`.
+    """
+    from .numpy_store import NumpyBackend
+    from .quantization import recall_at_k
+    
+    if getattr(store, "projection", None) is not None:
+        raise ValueError("The store is already projected; evaluate on a full-width index")
+    
+    total = store.count
+    if not total:
+        raise ValueError("The store is empty")
+    rate = 1.0 if max_vectors is None else min(1.0, max_vectors / total)
+    
+    def records():
+        # Same seed on every pass, so every variant sees the same subset
+        rng = np.random.default_rng(seed)
+        for ids, embeddings, _, _ in store.iter_records(batch_size):
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            if rate < 1.0:
+                keep = np.flatnonzero(rng.random(len(ids)) < rate)
+                ids, embeddings = [ids[i] for i in keep], embeddings[keep]
+            if len(ids):
+                yield ids, embeddings
+    
+    root = Path(workdir or tempfile.mkdtemp(prefix="neurolitrag_projection_"))
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    
+    sample, taken = [], 0
+    for _, embeddings in records():
+        sample.append(embeddings[:fit_samples - taken])
+        taken += len(sample[-1])
+        if taken >= fit_samples:
+            break
+    if not taken:
+        raise ValueError("The sampled subset is empty; raise max_vectors")
+    sample = np.concatenate(sample)
+    
+    variants: Dict[str, Optional[Projection]] = {"full": None}
+    for kind in kinds:
+        for dim in dims:
+            if dim < sample.shape[1]:
+                variants[f"{kind}_{dim}"] = Projection.fit(sample, dim, kind)
+    
+    report: Dict[str, Any] = {"vectors": 0, "stored_vectors": total,
+                              "queries": len(queries), "top_k": top_k}
+    baseline: Optional[List[List[str]]] = None
+    full_bytes = None
+    try:
+        for name, projection in variants.items():
+            directory = root / name
+            shutil.rmtree(directory, ignore_errors=True)
+            index = NumpyBackend(str(directory))
+            
+            started = time.perf_counter()
+            count = 0
+            for ids, embeddings in records():
+                vectors = projection.apply(embeddings) if projection else embeddings
+                index.add(ids=ids, embeddings=vectors, texts=[""] * len(ids))
+                count += len(ids)
+            build_seconds = time.perf_counter() - started
+            
+            searched = projection.apply(queries) if projection else queries
+            latencies, hits = [], []
+            for q in searched:
+                t0 = time.perf_counter()
+                found = index.query_many([q], top_k=top_k)[0]
+                latencies.append((time.perf_counter() - t0) * 1000)
+                hits.append([h["id"] for h in found])
+            
+            dim = projection.dim if projection else sample.shape[1]
+            vector_bytes = count * dim * np.dtype(np.float32).itemsize
+            baseline = baseline or hits
+            full_bytes = full_bytes or vector_bytes
+            report["vectors"] = count
+            report[name] = {
+                "dim": dim,
+                f"recall@{top_k}": round(recall_at_k(baseline, hits), 4),
+                "retained": round(projection.retained, 4) if projection else 1.0,
+                "vector_bytes": vector_bytes,
+                "size_ratio": round(vector_bytes / full_bytes, 3),
+                "build_seconds": round(build_seconds, 3),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3) if latencies else 0.0,
+                "p95_ms": round(float(np.percentile(latencies, 95)), 3) if latencies else 0.0
+            }
+            del index
+            shutil.rmtree(directory, ignore_errors=True)
+    finally:
+        if workdir is None:
+            shutil.rmtree(root, ignore_errors=True)
+    
+    recall = f"recall@{top_k}"
+    passing = [name for name in variants if report[name][recall] >= min_recall]
+    report["recommended"] = min(passing, key=lambda name: (report[name]["dim"], -report[name][recall]))
+    return report
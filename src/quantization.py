@@ -0,0 +1,44 @@
+"""Embedding Quantization Helpers"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+
+# Number of set bits for every byte value, for Hamming distance on packed codes
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization; returns (codes, scales)."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits packed 8 per byte (Cohere's "ubinary" layout)."""
+    return np.packbits(vectors > 0, axis=1)
+
+
+def hamming_distances(query_codes: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """(m, bytes) x (n, bytes) packed codes -> (m, n) Hamming distances."""
+    # numpy >= 2.0 has a native popcount; older versions use the lookup table
+    popcount = getattr(np, "bitwise_count", None) or POPCOUNT.__getitem__
+    
+    # One query at a time keeps the temporary at (n, bytes)
+    return np.stack([
+        popcount(codes ^ q).sum(axis=1, dtype=np.int32)
+        for q in query_codes
+    ])
+
+
+def recall_at_k(exact: List[List[str]], approx: List[List[str]]) -> float:
+    """Mean fraction of the exact top-k ids that the approximate search found."""
+    if not exact:
+        return 1.0
+    return float(np.mean([
+        len(set(e) & set(a)) / len(e) if e else 1.0
+        for e, a in zip(exact, approx)
+    ]))
@@ -0,0 +1,109 @@
+"""Rate Limiting and Retry Helpers for Cohere API Calls"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    
+    Refills at `rate` tokens per second up to `capacity`; `acquire`
+    blocks until a token is available.
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            
+            time.sleep(wait)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """True for rate-limit/server errors and transient network failures."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(exc, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _backoff(exc: Exception, attempt: int, max_retries: int, base_delay: float,
+             max_delay: float, deadline: Optional[float]) -> Optional[float]:
+    """Seconds to wait before the next attempt, or None to give up."""
+    if attempt == max_retries or not is_retryable(exc):
+        return None
+    
+    delay = _retry_after(exc)
+    if delay is None:
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+def call_with_retry(fn: Callable[[], T], max_retries: int = 5,
+                    base_delay: float = 0.5, max_delay: float = 30.0,
+                    deadline: Optional[float] = None) -> T:
+    """
+    Call `fn`, retrying retryable errors with exponential backoff and
+    full jitter. A server-provided Retry-After takes precedence.
+    
+    With `deadline` (a `time.monotonic()` value), no retry is started
+    after it; the last error is raised instead.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception as exc:
+            delay = _backoff(exc, attempt, max_retries, base_delay, max_delay, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+
+
+async def acall_with_retry(fn: Callable[[], Awaitable[T]], max_retries: int = 5,
+                           base_delay: float = 0.5, max_delay: float = 30.0,
+                           deadline: Optional[float] = None) -> T:
+    """Async counterpart of `call_with_retry`; backs off with asyncio.sleep."""
+    for attempt in range(max_retries + 1):
+        try:
+            return await fn()
+        except Exception as exc:
+            delay = _backoff(exc, attempt, max_retries, base_delay, max_delay, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
@@ -1,10 +1,11 @@
 """Cohere Reranker Module - KEY DIFFERENTIATOR!"""
 
 import os
-import cohere
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 
+from .cohere_client import lazy_async_client
+
 
 @dataclass
 class RerankedResult:
@@ -25,17 +26,24 @@ class CohereReranker:
     - Dramatically improves results for technical queries
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "rerank-v3.5"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "rerank-v3.5",
+                 client=None, async_client=None, timeout: Optional[float] = None):
         self.api_key = api_key or os.getenv("COHERE_API_KEY")
-        if not self.api_key:
+        if client is None and not self.api_key:
             raise ValueError("COHERE_API_KEY not found")
         
-        self.client = cohere.Client(self.api_key)
+        if client is None:
+            import cohere  # deferred: importing cohere is a large part of cold start
+            client = cohere.Client(self.api_key)
+        self.client = client
+        # Built on the first async call, so sync-only callers never need one
+        self.async_client = async_client or lazy_async_client(self.api_key)
         self.model = model
+        self.request_options = {"timeout_in_seconds": timeout} if timeout else None
     
     def rerank(self, query: str, documents: List[str], 
-               top_n: Optional[int] = None) -> List[RerankedResult]:
-        """Rerank documents by relevance to query."""
+               top_n: Optional[int] = None, timeout: Optional[float] = None) -> List[RerankedResult]:
+        """Rerank documents by relevance to query. `timeout` overrides the default per-call timeout."""
         if not documents:
             return []
         
@@ -44,9 +52,50 @@ class CohereReranker:
             documents=documents,
             model=self.model,
             top_n=top_n or len(documents),
-            return_documents=True
+            return_documents=True,
+            request_options={"timeout_in_seconds": timeout} if timeout else self.request_options
         )
         
+        return self._to_results(response)
+    
+    async def arerank(self, query: str, documents: List[str], 
+                      top_n: Optional[int] = None) -> List[RerankedResult]:
+        """Async version of `rerank`."""
+        if not documents:
+            return []
+        
+        response = await self.async_client.rerank(
+            query=query,
+            documents=documents,
+            model=self.model,
+            top_n=top_n or len(documents),
+            return_documents=True,
+            request_options=self.request_options
+        )
+        
+        return self._to_results(response)
+    
+    def rerank_with_metadata(self, query: str, documents: List[Dict[str, Any]], 
+                             text_key: str = "text", 
+                             top_n: Optional[int] = None,
+                             timeout: Optional[float] = None) -> List[RerankedResult]:
+        """Rerank documents while preserving metadata."""
+        texts = [doc[text_key] for doc in documents]
+        results = self.rerank(query, texts, top_n, timeout)
+        
+        return self._attach_metadata(results, documents)
+    
+    async def arerank_with_metadata(self, query: str, documents: List[Dict[str, Any]], 
+                                    text_key: str = "text", 
+                                    top_n: Optional[int] = None) -> List[RerankedResult]:
+        """Async version of `rerank_with_metadata`."""
+        texts = [doc[text_key] for doc in documents]
+        results = await self.arerank(query, texts, top_n)
+        
+        return self._attach_metadata(results, documents)
+    
+    @staticmethod
+    def _to_results(response) -> List[RerankedResult]:
         results = []
         for r in response.results:
             results.append(RerankedResult(
@@ -57,13 +106,9 @@ class CohereReranker:
         
         return results
     
-    def rerank_with_metadata(self, query: str, documents: List[Dict[str, Any]], 
-                             text_key: str = "text", 
-                             top_n: Optional[int] = None) -> List[RerankedResult]:
-        """Rerank documents while preserving metadata."""
-        texts = [doc[text_key] for doc in documents]
-        results = self.rerank(query, texts, top_n)
-        
+    @staticmethod
+    def _attach_metadata(results: List[RerankedResult], 
+                         documents: List[Dict[str, Any]]) -> List[RerankedResult]:
         # FIXED: Properly extract nested metadata
         for result in results:
             original = documents[result.index]
@@ -0,0 +1,292 @@
+"""Sharded Vector Backend with Parallel Fan-Out"""
+
+import bisect
+import heapq
+import json
+import multiprocessing
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .vector_store import VectorBackend
+
+
+def _open_backend(kind: str, path: str, collection_name: str,
+                  options: Dict[str, Any]) -> VectorBackend:
+    if kind == "numpy":
+        from .numpy_store import NumpyBackend
+        return NumpyBackend(path, **options)
+    if kind == "chroma":
+        from .vector_store import ChromaBackend
+        return ChromaBackend(collection_name, path, **options)
+    raise ValueError(f"Unknown shard backend: {kind}")
+
+
+# Shards opened inside query worker processes, keyed by path
+_WORKER_SHARDS: Dict[str, VectorBackend] = {}
+
+
+def _query_shard(spec: Tuple[str, str, str, Dict[str, Any]], embeddings: List[List[float]],
+                 top_k: int, where: Optional[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Runs in a worker process: open the shard once, then search it."""
+    path = spec[1]
+    if path not in _WORKER_SHARDS:
+        _WORKER_SHARDS[path] = _open_backend(*spec)
+    return _WORKER_SHARDS[path].query_many(embeddings, top_k=top_k, where=where)
+
+
+class ShardedBackend(VectorBackend):
+    """
+    Partitions chunks across `num_shards` backends and searches them in
+    parallel, merging the per-shard top-k by score.
+    
+    - `partition="hash"`: shard = crc32(id) % num_shards, so an id always
+      lands on the same shard
+    - `partition="year"`: shard i holds years in [year_bounds[i-1],
+      year_bounds[i]); records without a year go to shard 0. Year-range
+      filters only visit the shards that can match. Writes look up which
+      shard holds each id: an upsert that changes a chunk's year moves it
+      (new copy written, old one deleted), and an add of an id stored
+      under another year is ignored like any existing id
+    - `executor="thread"` fans out on a thread pool (NumPy and hnswlib
+      release the GIL); `"process"` searches in worker processes, each
+      mapping the shard files read-only (numpy shards only, since Chroma
+      does not support concurrent access from several processes)
+    
+    Writes are grouped by shard and applied to the shards concurrently
+    from this process. `close()` (also `VectorStore.close()`) shuts down
+    the writer and searcher pools. Each shard is an ordinary backend directory
+    (`shard_000`, ...); `shards.json` records the layout, which cannot
+    change without rebuilding. With an exact shard backend the merged
+    results equal those of a single index over the same vectors.
+    """
+    
+    LAYOUT_FILE = "shards.json"
+    
+    def __init__(self, persist_directory: str = "./data/sharded_index",
+                 num_shards: int = 4, partition: str = "hash",
+                 year_bounds: Optional[List[int]] = None,
+                 shard_backend: str = "numpy", executor: str = "thread",
+                 max_workers: Optional[int] = None,
+                 collection_name: str = "neuro_lit_rag", **shard_options):
+        if partition not in ("hash", "year"):
+            raise ValueError(f"Unknown partition: {partition}")
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+        if executor == "process" and shard_backend != "numpy":
+            raise ValueError("executor='process' requires shard_backend='numpy'")
+        if partition == "year":
+            if not year_bounds:
+                raise ValueError("partition='year' needs year_bounds")
+            year_bounds = sorted(int(y) for y in year_bounds)
+            num_shards = len(year_bounds) + 1
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        
+        self.path = Path(persist_directory)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.num_shards = num_shards
+        self.partition = partition
+        self.year_bounds = year_bounds or []
+        self._check_layout(shard_backend)
+        
+        self._specs = [
+            (shard_backend, str(self.path / f"shard_{i:03d}"), collection_name, shard_options)
+            for i in range(num_shards)
+        ]
+        self.shards = [_open_backend(*spec) for spec in self._specs]
+        
+        workers = max_workers or num_shards
+        self._writers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-write")
+        self._searchers: Executor
+        if executor == "process":
+            # spawn, not fork: the parent runs client and coalescer threads
+            self._searchers = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            self._searchers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="shard-query")
+        self.executor = executor
+    
+    @property
+    def pmid_filters(self) -> bool:
+        return all(shard.pmid_filters for shard in self.shards)
+    
+    @property
+    def count(self) -> int:
+        return sum(self._writers.map(lambda shard: shard.count, self.shards))
+    
+    def add(self, ids: List[str], embeddings: List[List[float]],
+            texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        self._write("add", ids, embeddings, texts, metadatas)
+    
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        self._write("upsert", ids, embeddings, texts, metadatas)
+    
+    def delete(self, ids: List[str]):
+        if self.partition == "hash":
+            groups = self._group(ids, [None] * len(ids))
+            doomed = {shard: [ids[i] for i in rows] for shard, rows in groups.items()}
+        else:
+            doomed = {shard: [ids[i] for i in range(len(ids))] for shard in range(self.num_shards)}
+        list(self._writers.map(lambda item: self.shards[item[0]].delete(item[1]), doomed.items()))
+    
+    def revision(self) -> str:
+        return "/".join(shard.revision() for shard in self.shards)
+    
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        found: Dict[str, Dict[str, Any]] = {}
+        if self.partition == "hash":
+            groups = self._group(ids, [None] * len(ids))
+            parts = self._writers.map(
+                lambda item: self.shards[item[0]].get_metadatas([ids[i] for i in item[1]]),
+                groups.items()
+            )
+        else:
+            parts = self._writers.map(lambda shard: shard.get_metadatas(ids), self.shards)
+        for part in parts:
+            found.update(part)
+        return found
+    
+    def ids_by_pmid(self, pmids: List[str]) -> Dict[str, List[str]]:
+        found: Dict[str, List[str]] = {}
+        for part in self._writers.map(lambda shard: shard.ids_by_pmid(pmids), self.shards):
+            for pmid, ids in part.items():
+                found.setdefault(pmid, []).extend(ids)
+        return found
+    
+    def query_many(self, embeddings: List[List[float]], top_k: int = 10,
+                   where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        targets = self._shards_for(where)
+        if self.executor == "process":
+            futures = [self._searchers.submit(_query_shard, self._specs[i], embeddings, top_k, where)
+                       for i in targets]
+        else:
+            futures = [self._searchers.submit(self.shards[i].query_many, embeddings, top_k, where)
+                       for i in targets]
+        per_shard = [f.result() for f in futures]
+        
+        merged = []
+        for q in range(len(embeddings)):
+            best: Dict[str, Dict[str, Any]] = {}
+            for results in per_shard:
+                for hit in results[q]:
+                    if hit["id"] not in best or hit["score"] > best[hit["id"]]["score"]:
+                        best[hit["id"]] = hit
+            merged.append(heapq.nlargest(top_k, best.values(), key=lambda h: h["score"]))
+        return merged
+    
+    def iter_records(self, batch_size: int = 10000):
+        for shard in self.shards:
+            yield from shard.iter_records(batch_size)
+    
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        limits = [s.max_batch_size for s in self.shards if s.max_batch_size]
+        # A batch can land entirely on one shard
+        return min(limits) if limits else None
+    
+    def close(self):
+        self._writers.shutdown(cancel_futures=True)
+        self._searchers.shutdown(cancel_futures=True)
+        for shard in self.shards:
+            shard.close()
+    
+    def _shard_of(self, doc_id: str, metadata: Optional[Dict[str, Any]]) -> int:
+        if self.partition == "hash":
+            return zlib.crc32(doc_id.encode("utf-8")) % self.num_shards
+        year = (metadata or {}).get("year_num")
+        return bisect.bisect_right(self.year_bounds, year) if isinstance(year, int) else 0
+    
+    def _group(self, ids: List[str],
+               metadatas: List[Optional[Dict[str, Any]]]) -> Dict[int, List[int]]:
+        """Shard -> positions in the input lists."""
+        groups: Dict[int, List[int]] = {}
+        for i, (doc_id, meta) in enumerate(zip(ids, metadatas)):
+            groups.setdefault(self._shard_of(doc_id, meta), []).append(i)
+        return groups
+    
+    def _write(self, op: str, ids: List[str], embeddings: List[List[float]],
+               texts: List[str], metadatas: Optional[List[Dict[str, Any]]]):
+        metas = metadatas or [None] * len(ids)
+        groups = self._group(ids, metas)
+        
+        moved: Dict[int, List[str]] = {}
+        if self.partition == "year":
+            # An id's shard follows its stored year, which this write may change
+            held = self._holders(ids)
+            for shard, rows in list(groups.items()):
+                keep = []
+                for i in rows:
+                    old = held.get(ids[i])
+                    if old is None or old == shard:
+                        keep.append(i)
+                    elif op == "upsert":
+                        keep.append(i)
+                        moved.setdefault(old, []).append(ids[i])
+                groups[shard] = keep
+        
+        def write(item):
+            shard, rows = item
+            if rows:
+                getattr(self.shards[shard], op)(
+                    ids=[ids[i] for i in rows],
+                    embeddings=[embeddings[i] for i in rows],
+                    texts=[texts[i] for i in rows],
+                    metadatas=[metas[i] for i in rows] if metadatas else None
+                )
+        
+        # list() re-raises the first shard's exception, if any
+        list(self._writers.map(write, groups.items()))
+        # Old copies go only after the new ones are written
+        list(self._writers.map(lambda item: self.shards[item[0]].delete(item[1]), moved.items()))
+    
+    def _holders(self, ids: List[str]) -> Dict[str, int]:
+        """id -> shard that currently stores it."""
+        held: Dict[str, int] = {}
+        for shard, found in enumerate(self._writers.map(lambda s: s.get_metadatas(ids), self.shards)):
+            for doc_id in found:
+                held[doc_id] = shard
+        return held
+    
+    def _shards_for(self, where: Optional[Dict[str, Any]]) -> List[int]:
+        """Shards that can hold matches for `where` (year pruning)."""
+        if self.partition != "year" or not where:
+            return list(range(self.num_shards))
+        
+        low, high = None, None
+        clauses = where.get("$and", [where])
+        for clause in clauses:
+            condition = clause.get("year_num")
+            if isinstance(condition, dict):
+                if "$gte" in condition:
+                    low = condition["$gte"]
+                if "$lte" in condition:
+                    high = condition["$lte"]
+        if low is None and high is None:
+            return list(range(self.num_shards))
+        
+        # Shard 0 also holds records without a year, but those never
+        # match a year condition, so it can be pruned like the others
+        first = bisect.bisect_right(self.year_bounds, low) if low is not None else 0
+        last = bisect.bisect_right(self.year_bounds, high) if high is not None else self.num_shards - 1
+        return list(range(first, last + 1))
+    
+    def _check_layout(self, shard_backend: str):
+        layout = {
+            "num_shards": self.num_shards,
+            "partition": self.partition,
+            "year_bounds": self.year_bounds,
+            "shard_backend": shard_backend
+        }
+        path = self.path / self.LAYOUT_FILE
+        if path.exists():
+            stored = json.loads(path.read_text())
+            if stored != layout:
+                raise ValueError(
+                    f"Index at {self.path} was built with {stored}; rebuild it to change the layout"
+                )
+        else:
+            path.write_text(json.dumps(layout, indent=2))
@@ -0,0 +1,297 @@
+"""Index Snapshots: One-File Export and Bulk Restore"""
+
+import hashlib
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .data_ingestion import PaperMeta
+from .projection import Projection
+from .vector_store import VectorStore
+
+MAGIC = b"NLRSNAP1"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<8sI52x")          # magic, format version; 64 bytes
+TRAILER = struct.Struct("<Q32s8s")           # directory length, its sha256, magic
+ALIGN = 64
+HASH_BYTES = 32
+DTYPES = {"float16": np.float16, "float32": np.float32}
+
+
+class SnapshotError(ValueError):
+    """The snapshot file is malformed, corrupted or incompatible."""
+
+
+def export_snapshot(store: VectorStore, path: str, dtype: str = "float16",
+                    batch_size: int = 10000, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Write every record of `store` to one snapshot file at `path`.
+    
+    Layout, each section 64-byte aligned and sha256-checksummed:
+        
+        preamble   magic + format version
+        embeddings (count, dim) little-endian float16/float32, row-major
+        ids        one id per line
+        hashes     (count, 32) raw sha256 content hashes (zeros if unknown)
+        records    one {"text", "metadata"} JSON object per line
+        papers     one PaperMeta dict per line
+        projection the index's Projection (.npz), if it has one
+        directory  JSON: shape, dtype, section offsets/lengths/checksums,
+                   corpus fingerprints and `info`
+        trailer    directory length + sha256, magic
+    
+    The embedding matrix goes straight into the final file; the other
+    sections are staged in temporary files and appended. float16 halves
+    the size; restored vectors then differ from the source in the 3rd-4th
+    significant digit.
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+    target = Path(path)
+    count = store.count
+    started = time.perf_counter()
+    
+    tmp = target.with_name(target.name + ".tmp")
+    staged = {
+        name: tmp.with_name(f"{tmp.name}.{name}")
+        for name in ("ids", "hashes", "records", "papers")
+    }
+    digests = {name: hashlib.sha256() for name in ("embeddings", *staged)}
+    sizes = dict.fromkeys(digests, 0)
+    file_dtype = np.dtype(DTYPES[dtype]).newbyteorder("<")
+    dim = None
+    
+    try:
+        with open(tmp, "wb") as out:
+            out.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION))
+            files = {name: open(p, "wb") for name, p in staged.items()}
+            try:
+                def write(name: str, data: bytes, f: BinaryIO):
+                    f.write(data)
+                    digests[name].update(data)
+                    sizes[name] += len(data)
+                
+                written = 0
+                for ids, embeddings, texts, metadatas in store.iter_records(batch_size):
+                    matrix = np.ascontiguousarray(embeddings, dtype=file_dtype)
+                    dim = dim or matrix.shape[1]
+                    if matrix.shape[1] != dim:
+                        raise SnapshotError(f"Mixed embedding dimensions ({dim} and {matrix.shape[1]})")
+                    write("embeddings", matrix.tobytes(), out)
+                    
+                    hashes = bytearray()
+                    lines, records = [], []
+                    for doc_id, text, meta in zip(ids, texts, metadatas):
+                        if "\n" in doc_id:
+                            raise SnapshotError(f"Chunk id contains a newline: {doc_id!r}")
+                        meta = dict(meta)
+                        content_hash = meta.pop("content_hash", None)
+                        hashes += bytes.fromhex(content_hash) if content_hash else bytes(HASH_BYTES)
+                        lines.append(doc_id)
+                        records.append(json.dumps({"text": text, "metadata": meta}))
+                    write("ids", ("\n".join(lines) + "\n").encode("utf-8"), files["ids"])
+                    write("hashes", bytes(hashes), files["hashes"])
+                    write("records", ("\n".join(records) + "\n").encode("utf-8"), files["records"])
+                    written += len(ids)
+                
+                for paper in store.papers:
+                    write("papers", (json.dumps(paper.to_dict()) + "\n").encode("utf-8"), files["papers"])
+            finally:
+                for f in files.values():
+                    f.close()
+            
+            if written != count:
+                raise SnapshotError(f"Store changed during export ({count} -> {written} records)")
+            
+            sections = {"embeddings": {"offset": PREAMBLE.size, "length": sizes["embeddings"]}}
+            for name, staged_path in staged.items():
+                _pad(out)
+                sections[name] = {"offset": out.tell(), "length": sizes[name]}
+                with open(staged_path, "rb") as f:
+                    while True:
+                        block = f.read(1 << 24)
+                        if not block:
+                            break
+                        out.write(block)
+            for name, section in sections.items():
+                section["sha256"] = digests[name].hexdigest()
+            
+            if store.projection is not None:
+                data = store.projection.to_bytes()
+                _pad(out)
+                sections["projection"] = {"offset": out.tell(), "length": len(data),
+                                          "sha256": hashlib.sha256(data).hexdigest()}
+                out.write(data)
+            
+            directory = json.dumps({
+                "format_version": FORMAT_VERSION,
+                "count": count,
+                "dim": dim or 0,
+                "dtype": dtype,
+                "metadata_version": VectorStore.METADATA_VERSION,
+                "papers": len(store.papers),
+                "fingerprints": _fingerprints(store),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "info": info or {},
+                "sections": sections
+            }, indent=2).encode("utf-8")
+            _pad(out)
+            out.write(directory)
+            out.write(TRAILER.pack(len(directory), hashlib.sha256(directory).digest(), MAGIC))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+        for p in staged.values():
+            p.unlink(missing_ok=True)
+    
+    return {
+        "path": str(target),
+        "chunks": count,
+        "dim": dim or 0,
+        "bytes": target.stat().st_size,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def read_directory(path: str) -> Dict[str, Any]:
+    """Parse and checksum the snapshot's directory (not its sections)."""
+    with open(path, "rb") as f:
+        magic, version = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a NeuroLitRAG snapshot")
+        if version > FORMAT_VERSION:
+            raise SnapshotError(f"Snapshot format {version} is newer than supported ({FORMAT_VERSION})")
+        
+        f.seek(-TRAILER.size, os.SEEK_END)
+        end = f.tell()
+        length, digest, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != MAGIC or length > end:
+            raise SnapshotError(f"{path} is truncated")
+        f.seek(end - length)
+        raw = f.read(length)
+    
+    if hashlib.sha256(raw).digest() != digest:
+        raise SnapshotError(f"{path}: directory checksum mismatch")
+    return json.loads(raw)
+
+
+def verify_snapshot(path: str, directory: Optional[Dict[str, Any]] = None):
+    """Check every section against its sha256; raises SnapshotError."""
+    directory = directory or read_directory(path)
+    with open(path, "rb") as f:
+        for name, section in directory["sections"].items():
+            f.seek(section["offset"])
+            digest, remaining = hashlib.sha256(), section["length"]
+            while remaining:
+                block = f.read(min(remaining, 1 << 24))
+                if not block:
+                    raise SnapshotError(f"{path}: section {name} is truncated")
+                digest.update(block)
+                remaining -= len(block)
+            if digest.hexdigest() != section["sha256"]:
+                raise SnapshotError(f"{path}: section {name} checksum mismatch")
+
+
+def restore_snapshot(path: str, store: VectorStore, batch_size: int = 50000,
+                     verify: bool = True,
+                     on_batch: Optional[Callable[[List[str], List[str]], None]] = None) -> Dict[str, Any]:
+    """
+    Bulk-load a snapshot into `store` (any backend): papers first, then
+    the embedding matrix, read through a memory map, in `add` calls of
+    up to `batch_size` rows (capped by the backend's own limit).
+    
+    A projected index's projection is restored along with it.
+    `on_batch(ids, texts)` sees every loaded batch, e.g. to build a
+    side index. Corpus fingerprints are restored, so `load_demo_data`
+    on the new node reuses the index.
+    """
+    started = time.perf_counter()
+    directory = read_directory(path)
+    if verify:
+        verify_snapshot(path, directory)
+    if directory["metadata_version"] != VectorStore.METADATA_VERSION:
+        raise SnapshotError(
+            f"Snapshot metadata version {directory['metadata_version']} does not match "
+            f"this build ({VectorStore.METADATA_VERSION})"
+        )
+    
+    sections = directory["sections"]
+    count, dim = directory["count"], directory["dim"]
+    limit = store.backend.max_batch_size
+    batch_size = min(batch_size, limit) if limit else batch_size
+    
+    if "projection" not in sections and store.projection is not None:
+        raise SnapshotError("Snapshot holds full-width vectors but the target index is projected")
+    if "projection" in sections:
+        with open(path, "rb") as f:
+            f.seek(sections["projection"]["offset"])
+            store.set_projection(Projection.from_bytes(f.read(sections["projection"]["length"])))
+    store.papers.put(
+        PaperMeta.from_dict(json.loads(line)) for line in _lines(path, sections["papers"])
+    )
+    
+    dtype = np.dtype(DTYPES[directory["dtype"]]).newbyteorder("<")
+    matrix = np.memmap(path, dtype=dtype, mode="r", offset=sections["embeddings"]["offset"],
+                       shape=(count, dim)) if count else np.zeros((0, dim), dtype=dtype)
+    hashes = np.memmap(path, dtype=np.uint8, mode="r", offset=sections["hashes"]["offset"],
+                       shape=(count, HASH_BYTES)) if count else None
+    
+    ids_lines = _lines(path, sections["ids"])
+    record_lines = _lines(path, sections["records"])
+    for start in range(0, count, batch_size):
+        end = min(start + batch_size, count)
+        ids = [next(ids_lines) for _ in range(start, end)]
+        texts, metadatas = [], []
+        for row in range(start, end):
+            record = json.loads(next(record_lines))
+            meta = record["metadata"]
+            content_hash = bytes(hashes[row])
+            if any(content_hash):
+                meta["content_hash"] = content_hash.hex()
+            texts.append(record["text"])
+            metadatas.append(meta)
+        
+        store.add(ids=ids, embeddings=np.asarray(matrix[start:end], dtype=np.float32),
+                  texts=texts, metadatas=metadatas)
+        if on_batch is not None:
+            on_batch(ids, texts)
+    
+    for corpus, fingerprint in directory.get("fingerprints", {}).items():
+        store.set_fingerprint(corpus, fingerprint)
+    
+    return {
+        "chunks": count,
+        "papers": directory["papers"],
+        "dim": dim,
+        "dtype": directory["dtype"],
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def _lines(path: str, section: Dict[str, Any]):
+    """Decoded lines of one section, streamed."""
+    with open(path, "rb") as f:
+        f.seek(section["offset"])
+        remaining = section["length"]
+        while remaining > 0:
+            line = f.readline(remaining)
+            remaining -= len(line)
+            yield line.rstrip(b"\n").decode("utf-8")
+
+
+def _pad(f: BinaryIO):
+    f.write(bytes(-f.tell() % ALIGN))
+
+
+def _fingerprints(store: VectorStore) -> Dict[str, str]:
+    try:
+        return json.loads((store.persist_directory / store.FINGERPRINT_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
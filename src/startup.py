@@ -0,0 +1,54 @@
+"""Background Loading and Time-to-Interactive Reporting"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class BackgroundLoader:
+    """
+    Builds an object (e.g. a loaded NeuroLitRAG) on a daemon thread.
+    
+    The UI can render immediately and call `wait()` only when it actually
+    needs the result. `timings` records when each phase finished, in
+    seconds since `started` (pass the process/app start time to measure
+    true cold start).
+    """
+    
+    def __init__(self, factory: Callable[["BackgroundLoader"], Any],
+                 started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.info: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+        self._factory = factory
+        
+        self._thread = threading.Thread(target=self._run, name="rag-loader", daemon=True)
+        self._thread.start()
+    
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+    
+    def mark(self, phase: str):
+        """Record that `phase` just finished (called from the factory)."""
+        self.timings[phase] = round(time.perf_counter() - self.started, 3)
+    
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Block until loaded; re-raises the factory's exception."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Background loading did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.result
+    
+    def _run(self):
+        try:
+            self.result = self._factory(self)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.mark("ready")
+            self._done.set()
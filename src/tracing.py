@@ -0,0 +1,286 @@
+"""Per-Stage Tracing and Metrics"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class Span:
+    """One timed pipeline stage (embed, retrieve, rerank, generate, ...)."""
+    
+    __slots__ = ("name", "attributes", "start", "duration_ms")
+    
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+        self.duration_ms = 0.0
+    
+    def set(self, **attributes):
+        """Attach counts (docs, tokens, ...) discovered while the stage runs."""
+        self.attributes.update(attributes)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "duration_ms": round(self.duration_ms, 3), **self.attributes}
+
+
+class _NullSpan:
+    """Stands in for Span and its context manager when tracing is disabled."""
+    
+    name = ""
+    attributes: Dict[str, Any] = {}
+    
+    def set(self, **attributes):
+        pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class TraceHook:
+    """
+    Interface for an external tracer (OpenTelemetry, Datadog, logging, ...).
+    
+    Override either method; both are called synchronously on the thread
+    running the stage, so keep them cheap.
+    """
+    
+    def on_span_start(self, span: Span):
+        pass
+    
+    def on_span_end(self, span: Span):
+        pass
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as in the Prometheus data model."""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+    
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+    
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket (capped at the max seen)."""
+        if not self.count:
+            return 0.0
+        
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class MetricsRegistry:
+    """
+    Process-wide stage metrics.
+    
+    Every finished span feeds a duration histogram labelled by stage, plus
+    counters for its `docs` and `tokens` attributes and for errors.
+    """
+    
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    PREFIX = "neurolitrag"
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, span: Span):
+        with self._lock:
+            hist = self._histograms.get(span.name)
+            if hist is None:
+                hist = self._histograms[span.name] = Histogram(self.buckets)
+            hist.observe(span.duration_ms / 1000.0)
+            
+            for key in ("docs", "tokens"):
+                value = span.attributes.get(key)
+                if isinstance(value, (int, float)):
+                    self._counters[(key, span.name)] = self._counters.get((key, span.name), 0) + value
+            if "error" in span.attributes:
+                self._counters[("errors", span.name)] = self._counters.get(("errors", span.name), 0) + 1
+    
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: {
+                    "count": h.count,
+                    "sum_seconds": round(h.sum, 6),
+                    "mean_ms": round(h.sum / h.count * 1000, 3) if h.count else 0.0,
+                    "p50_ms": round(h.quantile(0.50) * 1000, 3),
+                    "p95_ms": round(h.quantile(0.95) * 1000, 3),
+                    "p99_ms": round(h.quantile(0.99) * 1000, 3)
+                }
+                for name, h in self._histograms.items()
+            }
+            for (kind, name), value in self._counters.items():
+                stages.setdefault(name, {})[f"{kind}_total"] = value
+            return {"stages": stages}
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+    
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        name = f"{self.PREFIX}_stage_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of RAG pipeline stages.",
+            f"# TYPE {name} histogram"
+        ]
+        
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            
+            for kind in ("docs", "tokens", "errors"):
+                counter = f"{self.PREFIX}_stage_{kind}_total"
+                values = sorted((s, v) for (k, s), v in self._counters.items() if k == kind)
+                if not values:
+                    continue
+                lines.append(f"# HELP {counter} Stage {kind} processed.")
+                lines.append(f"# TYPE {counter} counter")
+                for stage, value in values:
+                    lines.append(f'{counter}{{stage="{stage}"}} {value}')
+        
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class Trace:
+    """
+    The spans of one request (a query or an ingest call).
+    
+    The trace itself is the root span; `span()` times a stage inside it.
+    """
+    
+    enabled = True
+    
+    def __init__(self, name: str, registry: MetricsRegistry, hooks: List[TraceHook]):
+        self.registry = registry
+        self.hooks = hooks
+        self.spans: List[Span] = []
+        self.root = self._start(Span(name, {}))
+    
+    def span(self, name: str, **attributes) -> "_SpanContext":
+        return _SpanContext(self, Span(name, attributes))
+    
+    def finish(self, **attributes) -> Span:
+        self.root.set(**attributes)
+        self._end(self.root)
+        return self.root
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round(self.root.duration_ms, 3),
+            "spans": [s.to_dict() for s in self.spans]
+        }
+    
+    def _start(self, span: Span) -> Span:
+        for hook in self.hooks:
+            hook.on_span_start(span)
+        span.start = time.perf_counter()
+        return span
+    
+    def _end(self, span: Span):
+        span.duration_ms = (time.perf_counter() - span.start) * 1000
+        if span is not self.root:
+            self.spans.append(span)
+        self.registry.record(span)
+        for hook in self.hooks:
+            hook.on_span_end(span)
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span")
+    
+    def __init__(self, trace: Trace, span: Span):
+        self.trace = trace
+        self.span = span
+    
+    def __enter__(self) -> Span:
+        return self.trace._start(self.span)
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.span.set(error=exc_type.__name__)
+        self.trace._end(self.span)
+        return False
+
+
+class _NullTrace:
+    enabled = False
+    spans: List[Span] = []
+    
+    def span(self, name: str, **attributes) -> _NullSpan:
+        return NULL_SPAN
+    
+    def finish(self, **attributes) -> _NullSpan:
+        return NULL_SPAN
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"total_ms": None, "spans": []}
+
+
+NULL_TRACE = _NullTrace()
+
+
+class Tracer:
+    """
+    Creates per-request traces.
+    
+    Disabled tracers hand out a shared no-op trace, so instrumented code
+    pays one attribute lookup and a method call per stage.
+    """
+    
+    def __init__(self, enabled: bool = True, hooks: Optional[Iterable[TraceHook]] = None,
+                 registry: Optional[MetricsRegistry] = None):
+        self.enabled = enabled
+        self.hooks: List[TraceHook] = list(hooks or [])
+        self.registry = registry or METRICS
+    
+    def add_hook(self, hook: TraceHook):
+        self.hooks.append(hook)
+    
+    def trace(self, name: str, force: bool = False):
+        """A new trace; `force` records one even when tracing is disabled."""
+        if not (self.enabled or force):
+            return NULL_TRACE
+        return Trace(name, self.registry, self.hooks)
@@ -1,13 +1,167 @@
 """Vector Store Module using ChromaDB"""
 
-from typing import List, Dict, Any, Optional
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterator, Optional, Set, Tuple
 from pathlib import Path
 
+import numpy as np
 
-class VectorStore:
-    """Vector store using ChromaDB."""
+from .data_ingestion import PaperMeta
+from .paper_store import PaperTable
+from .projection import Projection
+
+
+AUTHOR_KEY_PREFIX = "author:"
+
+
+@dataclass
+class QueryFilter:
+    """
+    Structured retrieval filter, translated to a Chroma `where` clause.
+    
+    All given conditions must hold; `journals` and `authors` match any
+    of their values. When the matching papers are already known
+    (`pmids`, from the paper table) those two become one pmid condition.
+    """
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    journals: Optional[List[str]] = None
+    authors: Optional[List[str]] = None
+    
+    def to_where(self, pmids: Optional[Set[str]] = None) -> Optional[Dict[str, Any]]:
+        clauses = []
+        if self.year_min is not None:
+            clauses.append({"year_num": {"$gte": int(self.year_min)}})
+        if self.year_max is not None:
+            clauses.append({"year_num": {"$lte": int(self.year_max)}})
+        if pmids is not None:
+            clauses.append({"pmid": {"$in": sorted(pmids)}})
+        elif self.journals:
+            clauses.append({"journal": {"$in": list(self.journals)}})
+        if self.authors and pmids is None:
+            # Authors are stored as one boolean key per name (see VectorStore)
+            author_clauses = [{AUTHOR_KEY_PREFIX + a: True} for a in self.authors]
+            clauses.append(author_clauses[0] if len(author_clauses) == 1
+                           else {"$or": author_clauses})
+        
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of Chroma's `where` syntax used by QueryFilter."""
+    if not where:
+        return True
+    
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, c) for c in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, expected in condition.items():
+                if op == "$eq" and value != expected:
+                    return False
+                if op == "$ne" and value == expected:
+                    return False
+                if op == "$in" and value not in expected:
+                    return False
+                if op == "$nin" and value in expected:
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    if op == "$gt" and not value > expected:
+                        return False
+                    if op == "$gte" and not value >= expected:
+                        return False
+                    if op == "$lt" and not value < expected:
+                        return False
+                    if op == "$lte" and not value <= expected:
+                        return False
+    return True
+
+
+class VectorBackend(ABC):
+    """
+    Storage/search interface behind VectorStore.
+    
+    Backends receive already-flattened metadata and return results as
+    {"id", "text", "score", "metadata"} dicts with cosine-similarity scores.
+    """
+    
+    @property
+    @abstractmethod
+    def count(self) -> int:
+        ...
+    
+    @abstractmethod
+    def add(self, ids: List[str], embeddings: List[List[float]],
+            texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        ...
+    
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        ...
+    
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Remove records by id; unknown ids are ignored."""
+    
+    @abstractmethod
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        ...
+    
+    @abstractmethod
+    def ids_by_pmid(self, pmids: List[str]) -> Dict[str, List[str]]:
+        """Stored chunk ids of each paper; papers without chunks are omitted."""
+    
+    @abstractmethod
+    def query_many(self, embeddings: List[List[float]], top_k: int = 10,
+                   where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        ...
+    
+    @abstractmethod
+    def iter_records(self, batch_size: int = 10000) -> Iterator[Tuple]:
+        """Yield every record as (ids, embeddings array, texts, metadatas) batches."""
+    
+    @abstractmethod
+    def revision(self) -> str:
+        """Persisted token that changes on every add, upsert and delete (from any process)."""
     
-    def __init__(self, collection_name: str = "neuro_lit_rag", 
+    # Largest batch one add/upsert call accepts (None = no limit)
+    max_batch_size: Optional[int] = None
+    
+    # Journal/author filters arrive as one pmid set, which needs a cheap
+    # pmid index of any size; otherwise records carry journal/author keys
+    pmid_filters: bool = False
+    
+    def close(self):
+        """Release threads and processes the backend holds (if any)."""
+
+
+class ChromaBackend(VectorBackend):
+    """
+    Backend on a persistent ChromaDB collection (HNSW, cosine).
+    
+    Every write replaces a random token in `content_revision`, since
+    Chroma exposes no change counter of its own.
+    """
+    
+    REVISION_FILE = "content_revision"
+    
+    def __init__(self, collection_name: str = "neuro_lit_rag",
                  persist_directory: str = "./data/chroma_db"):
         
         try:
@@ -16,6 +170,7 @@ class VectorStore:
             raise ImportError("Install chromadb: pip install chromadb")
         
         Path(persist_directory).mkdir(parents=True, exist_ok=True)
+        self._revision_path = Path(persist_directory) / self.REVISION_FILE
         
         self.client = chromadb.PersistentClient(path=persist_directory)
         self.collection = self.client.get_or_create_collection(
@@ -27,49 +182,336 @@ class VectorStore:
     def count(self) -> int:
         return self.collection.count()
     
-    def add(self, ids: List[str], embeddings: List[List[float]], 
+    @property
+    def max_batch_size(self) -> Optional[int]:
+        return self.client.get_max_batch_size()
+    
+    def add(self, ids: List[str], embeddings: List[List[float]],
             texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
-        """Add documents to store."""
-        
-        if metadatas:
-            clean_meta = []
-            for m in metadatas:
-                clean = {}
-                for k, v in m.items():
-                    if v is None:
-                        continue
-                    elif isinstance(v, (str, int, float, bool)):
-                        clean[k] = v
-                    elif isinstance(v, list):
-                        clean[k] = ", ".join(str(x) for x in v[:5])
-                    else:
-                        clean[k] = str(v)
-                clean_meta.append(clean)
-            metadatas = clean_meta
-        
         self.collection.add(
             ids=ids,
             embeddings=embeddings,
             documents=texts,
             metadatas=metadatas
         )
+        self._bump_revision()
     
-    def query(self, embedding: List[float], top_k: int = 10) -> List[Dict[str, Any]]:
-        """Query for similar documents."""
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        self.collection.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            documents=texts,
+            metadatas=metadatas
+        )
+        self._bump_revision()
+    
+    def delete(self, ids: List[str]):
+        if ids:
+            self.collection.delete(ids=ids)
+            self._bump_revision()
+    
+    def revision(self) -> str:
+        try:
+            return self._revision_path.read_text()
+        except OSError:
+            return ""
+    
+    def _bump_revision(self):
+        tmp = self._revision_path.with_name(f"{self.REVISION_FILE}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(uuid.uuid4().hex)
+        os.replace(tmp, self._revision_path)
+    
+    def get_metadatas(self, ids: List[str],
+                      batch_size: int = 1000) -> Dict[str, Dict[str, Any]]:
+        found = {}
+        for i in range(0, len(ids), batch_size):
+            results = self.collection.get(
+                ids=ids[i:i + batch_size],
+                include=["metadatas"]
+            )
+            for doc_id, meta in zip(results["ids"], results["metadatas"] or []):
+                found[doc_id] = meta or {}
         
+        return found
+    
+    def ids_by_pmid(self, pmids: List[str],
+                    batch_size: int = 1000) -> Dict[str, List[str]]:
+        found: Dict[str, List[str]] = {}
+        for i in range(0, len(pmids), batch_size):
+            results = self.collection.get(
+                where={"pmid": {"$in": list(pmids[i:i + batch_size])}},
+                include=["metadatas"]
+            )
+            for doc_id, meta in zip(results["ids"], results["metadatas"] or []):
+                found.setdefault((meta or {}).get("pmid"), []).append(doc_id)
+        return found
+    
+    def iter_records(self, batch_size: int = 10000):
+        for offset in range(0, self.count, batch_size):
+            batch = self.collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=batch_size,
+                offset=offset
+            )
+            if not batch["ids"]:
+                break
+            yield (batch["ids"], np.asarray(batch["embeddings"], dtype=np.float32),
+                   batch["documents"], [m or {} for m in batch["metadatas"]])
+    
+    def query_many(self, embeddings: List[List[float]], top_k: int = 10,
+                   where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
         results = self.collection.query(
-            query_embeddings=[embedding],
+            query_embeddings=embeddings,
             n_results=top_k,
+            where=where,
             include=["documents", "metadatas", "distances"]
         )
         
-        formatted = []
-        for i in range(len(results["ids"][0])):
-            formatted.append({
-                "id": results["ids"][0][i],
-                "text": results["documents"][0][i],
-                "score": 1 - results["distances"][0][i],
-                "metadata": results["metadatas"][0][i] if results["metadatas"] else {}
-            })
+        all_formatted = []
+        for q in range(len(embeddings)):
+            formatted = []
+            for i in range(len(results["ids"][q])):
+                formatted.append({
+                    "id": results["ids"][q][i],
+                    "text": results["documents"][q][i],
+                    "score": 1 - results["distances"][q][i],
+                    "metadata": results["metadatas"][q][i] if results["metadatas"] else {}
+                })
+            all_formatted.append(formatted)
+        
+        return all_formatted
+
+
+class VectorStore:
+    """
+    Vector store with a pluggable backend.
+    
+    Metadata is flattened for storage. Besides the display fields, every
+    record gets `year_num` (int) and one `author:<name>` boolean key per
+    author, so QueryFilter can push year ranges and author membership
+    down into the backend.
+    
+    Paper-level fields (title, authors, journal, doi) passed as `papers`
+    go to a side table (`paper_store.PaperTable`) instead of every chunk
+    record, and are joined back into each query result by pmid. Backends
+    with `pmid_filters` get journal and author filters resolved against
+    that table as a pmid set; the others (Chroma, whose `$in` lists are
+    bounded by SQLite's variable limit) keep `journal` and the author
+    keys on each record and filter on those.
+    
+    Backends:
+    - "chroma": persistent ChromaDB collection (default)
+    - "numpy": memory-mapped matrix with exact blocked search,
+      see `numpy_store.NumpyBackend` (options: dtype, block_size)
+    - "sharded": chunks partitioned by id hash or year across several
+      numpy/chroma shards searched in parallel, see
+      `sharded_store.ShardedBackend` (options: num_shards, partition,
+      year_bounds, shard_backend, executor)
+    
+    An optional `projection.Projection` (`projection.npz`) records the
+    dimensionality reduction applied to the stored vectors; queries must
+    go through the same projection (`CohereEmbedder.projection`).
+    """
+    
+    # Bump when the stored metadata layout changes so ingestion rewrites records
+    METADATA_VERSION = 4
+    
+    DEFAULT_DIRECTORIES = {
+        "chroma": "./data/chroma_db",
+        "numpy": "./data/numpy_index",
+        "sharded": "./data/sharded_index"
+    }
+    
+    FINGERPRINT_FILE = "corpus_fingerprints.json"
+    PROJECTION_FILE = "projection.npz"
+    
+    def __init__(self, collection_name: str = "neuro_lit_rag",
+                 persist_directory: Optional[str] = None,
+                 backend: str = "chroma", **backend_options):
+        
+        if backend not in self.DEFAULT_DIRECTORIES:
+            raise ValueError(f"Unknown vector backend: {backend}")
+        persist_directory = persist_directory or self.DEFAULT_DIRECTORIES[backend]
+        self.persist_directory = Path(persist_directory)
+        
+        if backend == "numpy":
+            from .numpy_store import NumpyBackend
+            self.backend = NumpyBackend(persist_directory, **backend_options)
+        elif backend == "sharded":
+            from .sharded_store import ShardedBackend
+            self.backend = ShardedBackend(persist_directory, collection_name=collection_name,
+                                          **backend_options)
+        else:
+            self.backend = ChromaBackend(collection_name, persist_directory, **backend_options)
+        
+        self.papers = PaperTable(persist_directory)
+        
+        # Dimensionality reduction the stored vectors went through, if any
+        projection_path = self.persist_directory / self.PROJECTION_FILE
+        self.projection = Projection.load(projection_path) if projection_path.exists() else None
+    
+    @property
+    def count(self) -> int:
+        return self.backend.count
+    
+    def add(self, ids: List[str], embeddings: List[List[float]],
+            texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+            papers: Optional[List[PaperMeta]] = None):
+        """Add documents to store."""
+        
+        if papers:
+            self.papers.put(papers)
+        self.backend.add(
+            ids=ids,
+            embeddings=embeddings,
+            texts=texts,
+            metadatas=self._clean_metadatas(self._with_paper_keys(metadatas))
+        )
+    
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               texts: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
+               papers: Optional[List[PaperMeta]] = None):
+        """Insert new documents and overwrite existing ones with the same id."""
+        
+        if papers:
+            self.papers.put(papers)
+        self.backend.upsert(
+            ids=ids,
+            embeddings=embeddings,
+            texts=texts,
+            metadatas=self._clean_metadatas(self._with_paper_keys(metadatas))
+        )
+    
+    def get_metadatas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Bulk-fetch stored metadata by id. Missing ids are omitted."""
+        return self.backend.get_metadatas(ids)
+    
+    def ids_by_pmid(self, pmids: List[str]) -> Dict[str, List[str]]:
+        """Stored chunk ids of each paper in `pmids` that has any."""
+        return self.backend.ids_by_pmid(pmids)
+    
+    def delete(self, ids: List[str]):
+        """Remove chunks by id; unknown ids are ignored."""
+        if ids:
+            self.backend.delete(ids)
+    
+    def close(self):
+        """Shut down the backend's worker pools (sharded backends)."""
+        self.backend.close()
+    
+    def iter_records(self, batch_size: int = 10000):
+        """Every stored record as (ids, embeddings, texts, metadatas) batches."""
+        return self.backend.iter_records(batch_size)
+    
+    def set_projection(self, projection: Projection):
+        """Record the projection applied to every stored vector (before the first add)."""
+        if self.count:
+            raise ValueError(f"Index at {self.persist_directory} already holds vectors; "
+                             f"rebuild it to change the projection")
+        self.persist_directory.mkdir(parents=True, exist_ok=True)
+        projection.save(self.persist_directory / self.PROJECTION_FILE)
+        self.projection = projection
+    
+    def get_fingerprint(self, corpus: str) -> Optional[str]:
+        """Fingerprint recorded by the last complete ingest of `corpus`."""
+        path = self.persist_directory / self.FINGERPRINT_FILE
+        try:
+            return json.loads(path.read_text()).get(corpus)
+        except (OSError, ValueError):
+            return None
+    
+    def revision(self) -> Tuple[int, int, str]:
+        """
+        (row count, fingerprint file mtime in ns, backend content revision):
+        persisted state that moves on every write, from any process.
+        """
+        try:
+            mtime = (self.persist_directory / self.FINGERPRINT_FILE).stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        return self.count, mtime, self.backend.revision()
+    
+    def set_fingerprint(self, corpus: str, fingerprint: str):
+        path = self.persist_directory / self.FINGERPRINT_FILE
+        try:
+            fingerprints = json.loads(path.read_text())
+        except (OSError, ValueError):
+            fingerprints = {}
+        fingerprints[corpus] = fingerprint
+        
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(fingerprints, indent=2))
+        tmp.replace(path)
+    
+    def _with_paper_keys(self, metadatas: Optional[List[Dict[str, Any]]]):
+        """Copy journal and author keys from the paper table onto records, unless filtered by pmid."""
+        if not metadatas or self.backend.pmid_filters:
+            return metadatas
+        
+        enriched = []
+        for m in metadatas:
+            paper = self.papers.get(m.get("pmid"))
+            if paper is not None:
+                m = {**m, **{AUTHOR_KEY_PREFIX + a: True for a in paper.authors}}
+                if paper.journal:
+                    m["journal"] = paper.journal
+            enriched.append(m)
+        return enriched
+    
+    @staticmethod
+    def _clean_metadatas(metadatas: Optional[List[Dict[str, Any]]]):
+        """Flatten metadata values to types Chroma can store."""
+        if not metadatas:
+            return metadatas
+        
+        clean_meta = []
+        for m in metadatas:
+            clean = {}
+            for k, v in m.items():
+                if v is None:
+                    continue
+                elif isinstance(v, (str, int, float, bool)):
+                    clean[k] = v
+                elif isinstance(v, list):
+                    clean[k] = ", ".join(str(x) for x in v[:5])
+                else:
+                    clean[k] = str(v)
+            
+            for author in m.get("authors") or []:
+                clean[AUTHOR_KEY_PREFIX + str(author)] = True
+            year = str(m.get("year") or "")[:4]
+            if year.isdigit():
+                clean["year_num"] = int(year)
+            clean["meta_version"] = VectorStore.METADATA_VERSION
+            
+            clean_meta.append(clean)
+        return clean_meta
+    
+    def query(self, embedding: List[float], top_k: int = 10,
+              filters: Optional[QueryFilter] = None) -> List[Dict[str, Any]]:
+        """Query for similar documents."""
+        return self.query_many([embedding], top_k=top_k, filters=filters)[0]
+    
+    def query_many(self, embeddings: List[List[float]], top_k: int = 10,
+                   filters: Optional[QueryFilter] = None) -> List[List[Dict[str, Any]]]:
+        """Query for several embeddings in one backend call."""
+        # Pick up papers another instance wrote since the last query
+        self.papers.refresh()
+        where = None
+        if filters:
+            pmids = None
+            if ((filters.journals or filters.authors) and self.backend.pmid_filters
+                    and len(self.papers)):
+                # No match in the table: fall back to the journal/author
+                # fields that records written without it still carry
+                pmids = self.papers.select(filters.journals, filters.authors) or None
+            where = filters.to_where(pmids)
         
-        return formatted
+        results = self.backend.query_many(embeddings, top_k=top_k, where=where)
+        for hits in results:
+            for hit in hits:
+                paper = self.papers.get(hit["metadata"].get("pmid"))
+                if paper is not None:
+                    hit["metadata"] = {**paper.to_dict(), **hit["metadata"]}
+        return results
@@ -0,0 +1,316 @@
+"""Query Log and Background Warm-Up of Hot Questions"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .data_ingestion import count_tokens
+
+if TYPE_CHECKING:
+    from .pipeline import NeuroLitRAG
+
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation do not make a new question."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+class QueryLog:
+    """
+    Bounded question -> frequency log.
+    
+    Questions are counted under their normalized form; the latest spelling
+    is kept for replay. Beyond `max_entries`, the least frequent entry
+    (oldest first among ties) is dropped. Persisted as JSON at `path`
+    (None = memory only), rewritten atomically at most every
+    `flush_seconds` and on `flush()`.
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1000,
+                 flush_seconds: float = 30.0):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.flush_seconds = flush_seconds
+        
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+        
+        if self.path is not None and self.path.exists():
+            self._load()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def record(self, question: str):
+        key = normalize_question(question)
+        if not key:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {"question": question, "count": 0}
+            entry["question"] = question
+            entry["count"] += 1
+            entry["last"] = time.time()
+            
+            if len(self._entries) > self.max_entries:
+                victim = min(
+                    (k for k in self._entries if k != key),
+                    key=lambda k: (self._entries[k]["count"], self._entries[k]["last"])
+                )
+                del self._entries[victim]
+            self._dirty = True
+            due = time.monotonic() - self._flushed >= self.flush_seconds
+        if due:
+            self.flush()
+    
+    def count(self, question: str) -> int:
+        entry = self._entries.get(normalize_question(question))
+        return entry["count"] if entry else 0
+    
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        """The `n` most frequent questions as (question, count)."""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: (-e["count"], -e["last"]))
+            return [(e["question"], e["count"]) for e in entries[:n]]
+    
+    def flush(self):
+        if self.path is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"entries": list(self._entries.values())})
+            self._dirty = False
+            self._flushed = time.monotonic()
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, self.path)
+    
+    def _load(self):
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))["entries"]
+        except (OSError, ValueError, KeyError):
+            return
+        for entry in entries:
+            key = normalize_question(entry.get("question", ""))
+            if key:
+                self._entries[key] = {
+                    "question": entry["question"],
+                    "count": int(entry.get("count", 1)),
+                    "last": float(entry.get("last", 0.0))
+                }
+        while len(self._entries) > self.max_entries:
+            victim = min(self._entries, key=lambda k: (self._entries[k]["count"],
+                                                       self._entries[k]["last"]))
+            del self._entries[victim]
+
+
+class HotAnswers:
+    """
+    Exact-question results for warmed questions.
+    
+    Each entry is tagged with the corpus version it was computed on; a
+    lookup against any other version misses, so an ingest never serves an
+    answer built from the old corpus.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[Tuple[str, bool], Tuple[Hashable, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, question: str, use_reranking: bool,
+            version: Hashable) -> Optional[Dict[str, Any]]:
+        key = (normalize_question(question), use_reranking)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self.hits += 1
+            return entry[1]
+    
+    def is_fresh(self, question: str, use_reranking: bool, version: Hashable) -> bool:
+        key = (normalize_question(question), use_reranking)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] == version
+    
+    def put(self, question: str, use_reranking: bool, version: Hashable,
+            result: Dict[str, Any]):
+        with self._lock:
+            self._entries[(normalize_question(question), use_reranking)] = (version, result)
+    
+    def retain(self, questions: Iterable[str]):
+        """Drop answers for questions that are no longer hot."""
+        keep = {normalize_question(q) for q in questions}
+        with self._lock:
+            for key in [k for k in self._entries if k[0] not in keep]:
+                del self._entries[key]
+
+
+class SpendBudget:
+    """
+    Rolling-window cap on warm-up API spend.
+    
+    Counts Cohere calls and billed tokens (embed input, chat input and
+    output) over the last `period_seconds`; None disables a limit.
+    """
+    
+    def __init__(self, max_calls: Optional[int] = 300, max_tokens: Optional[int] = None,
+                 period_seconds: float = 3600.0):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.period_seconds = period_seconds
+        self._charges: deque = deque()
+        self._lock = threading.Lock()
+    
+    def allows(self) -> bool:
+        calls, tokens = self.spent()
+        return ((self.max_calls is None or calls < self.max_calls)
+                and (self.max_tokens is None or tokens < self.max_tokens))
+    
+    def charge(self, calls: int, tokens: int):
+        with self._lock:
+            self._charges.append((time.monotonic(), calls, tokens))
+    
+    def spent(self) -> Tuple[int, int]:
+        """(calls, tokens) within the current window."""
+        with self._lock:
+            cutoff = time.monotonic() - self.period_seconds
+            while self._charges and self._charges[0][0] < cutoff:
+                self._charges.popleft()
+            return (sum(c[1] for c in self._charges), sum(c[2] for c in self._charges))
+
+
+def estimate_spend(result: Dict[str, Any]) -> Tuple[int, int]:
+    """(API calls, billed tokens) one query result cost, approximately."""
+    calls, tokens = 1, count_tokens(result.get("question", ""))
+    if result.get("cache_hit"):
+        return calls, tokens
+    calls += 2 if result.get("rerank_scores") else 1
+    tokens += result.get("context_tokens", 0) + count_tokens(result.get("answer", ""))
+    return calls, tokens
+
+
+class WarmupScheduler:
+    """
+    Keeps the hot questions answered ahead of time on a daemon thread.
+    
+    Each cycle takes the `pinned` questions (e.g. the UI's examples) plus
+    the query log's `top_n`, and runs the full query for every one whose
+    warm answer is missing or stale, while `budget` allows. Cycles run
+    every `interval_seconds`, and `settle_seconds` after the last
+    ingestion that changed the corpus (so a bulk ingest triggers one
+    refresh, not one per batch).
+    """
+    
+    def __init__(self, rag: "NeuroLitRAG", pinned: Optional[List[str]] = None,
+                 top_n: int = 20, interval_seconds: float = 300.0,
+                 settle_seconds: float = 5.0, budget: Optional[SpendBudget] = None,
+                 use_reranking: bool = True):
+        self.rag = rag
+        self.pinned = list(pinned or [])
+        self.top_n = top_n
+        self.interval_seconds = interval_seconds
+        self.settle_seconds = settle_seconds
+        self.budget = budget if budget is not None else SpendBudget()
+        self.use_reranking = use_reranking
+        
+        self.counts = {"cycles": 0, "warmed": 0, "fresh": 0, "over_budget": 0, "errors": 0}
+        self.last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> "WarmupScheduler":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rag-warmup", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.rag.query_log.flush()
+    
+    def notify(self):
+        """The corpus changed: refresh once it settles."""
+        self._wake.set()
+    
+    def hot_questions(self) -> List[str]:
+        questions, seen = [], set()
+        for question in self.pinned + [q for q, _ in self.rag.query_log.top(self.top_n)]:
+            key = normalize_question(question)
+            if key and key not in seen:
+                seen.add(key)
+                questions.append(question)
+        return questions
+    
+    def run_once(self) -> Dict[str, int]:
+        """One warm-up pass; returns this cycle's counts."""
+        hot = self.hot_questions()
+        answers = self.rag.hot_answers
+        answers.retain(hot)
+        
+        counts = dict.fromkeys(("warmed", "fresh", "over_budget", "errors"), 0)
+        for i, question in enumerate(hot):
+            if self._stop.is_set():
+                break
+            if answers.is_fresh(question, self.use_reranking, self.rag.corpus_version):
+                counts["fresh"] += 1
+                continue
+            if not self.budget.allows():
+                counts["over_budget"] = len(hot) - i
+                break
+            try:
+                result = self.rag.warm(question, use_reranking=self.use_reranking)
+            except Exception as e:
+                counts["errors"] += 1
+                self.last_error = str(e)
+                continue
+            self.budget.charge(*estimate_spend(result))
+            counts["errors" if "error" in result else "warmed"] += 1
+        
+        self.rag.query_log.flush()
+        self.counts["cycles"] += 1
+        for name, value in counts.items():
+            self.counts[name] += value
+        return counts
+    
+    def stats(self) -> Dict[str, Any]:
+        calls, tokens = self.budget.spent()
+        return {
+            **self.counts,
+            "hot_answers": len(self.rag.hot_answers),
+            "hot_hits": self.rag.hot_answers.hits,
+            "spent_calls": calls,
+            "spent_tokens": tokens,
+            "last_error": self.last_error
+        }
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.counts["errors"] += 1
+                self.last_error = str(e)
+            
+            woke = self._wake.wait(self.interval_seconds)
+            while woke and not self._stop.is_set():
+                self._wake.clear()
+                woke = self._wake.wait(self.settle_seconds)
@@ -0,0 +1,40 @@
+"""Shared fixtures: every Cohere call goes to the offline FakeCohereClient."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.fake_cohere import FakeAsyncCohereClient, FakeCohereClient  # noqa: E402
+
+
+@pytest.fixture
+def fake_client():
+    return FakeCohereClient(time_scale=0)
+
+
+@pytest.fixture
+def make_rag(tmp_path, fake_client):
+    """Build NeuroLitRAG instances on the fake client, each in its own index directory."""
+    from src.pipeline import NeuroLitRAG
+    
+    def make(name: str = "index", backend: str = "numpy", client=None, **options):
+        client = client or fake_client
+        options.setdefault("embedding_cache_dir", None)
+        options.setdefault("answer_cache_threshold", None)
+        store_options = {"persist_directory": str(tmp_path / name),
+                         **options.pop("vector_store_options", {})}
+        return NeuroLitRAG(cohere_client=client, cohere_async_client=FakeAsyncCohereClient(client),
+                           vector_backend=backend, vector_store_options=store_options, **options)
+    
+    return make
+
+
+@pytest.fixture
+def random_vectors():
+    def make(n: int, dim: int = 64, seed: int = 0) -> np.ndarray:
+        return np.random.default_rng(seed).standard_normal((n, dim), dtype=np.float32)
+    return make
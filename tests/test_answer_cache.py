@@ -0,0 +1,58 @@
+import dataclasses
+import inspect
+
+import numpy as np
+
+from src import answer_cache
+from src.answer_cache import SemanticAnswerCache
+from src.data_ingestion import DEMO_PAPERS
+
+QUESTION = "What is the role of the hippocampus in memory?"
+
+
+def _near(vector: np.ndarray, noise: float, seed: int = 1) -> np.ndarray:
+    return vector + noise * np.random.default_rng(seed).standard_normal(vector.shape, dtype=np.float32)
+
+
+def test_hits_only_above_threshold_with_the_same_evidence(random_vectors):
+    cache = SemanticAnswerCache(threshold=0.95)
+    query = random_vectors(1)[0]
+    cache.put(query, ["1_0", "2_0"], True, {"answer": "cached"})
+    
+    assert cache.lookup(_near(query, 0.05), ["2_0", "1_0"], True) == {"answer": "cached"}
+    assert cache.lookup(_near(query, 1.0), ["1_0", "2_0"], True) is None
+    assert cache.lookup(query, ["1_0", "3_0"], True) is None
+    assert cache.lookup(query, ["1_0", "2_0"], False) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch, random_vectors):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(ttl_seconds=60)
+    query = random_vectors(1)[0]
+    cache.put(query, ["1_0"], True, {"answer": "cached"})
+    
+    now[0] += 59
+    assert cache.lookup(query, ["1_0"], True) is not None
+    now[0] += 2
+    assert cache.lookup(query, ["1_0"], True) is None
+    assert len(cache) == 0
+
+
+def test_is_off_by_default_and_invalidated_by_ingest(make_rag):
+    from src.pipeline import NeuroLitRAG
+    
+    default = inspect.signature(NeuroLitRAG).parameters["answer_cache_threshold"].default
+    assert default is None
+    
+    rag = make_rag(answer_cache_threshold=0.95)
+    rag.load_demo_data()
+    first = rag.query(QUESTION, use_reranking=False)
+    assert rag.query(QUESTION, use_reranking=False) == {**first, "cache_hit": True}
+    assert (rag.answer_cache.hits, len(rag.answer_cache)) == (1, 1)
+    
+    # Re-ingesting evidence the answer was built on drops it
+    revised = dataclasses.replace(DEMO_PAPERS[0], abstract="Revised: " + DEMO_PAPERS[0].abstract)
+    assert rag.ingest(rag.chunker.chunk_paper(revised))["updated"] > 0
+    assert len(rag.answer_cache) == 0
@@ -0,0 +1,26 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_small_offline_run_writes_a_report(tmp_path):
+    output = tmp_path / "bench.json"
+    # Run as a script from elsewhere, as documented
+    subprocess.run(
+        [sys.executable, str(ROOT / "benchmarks" / "run_benchmarks.py"),
+         "--scenarios", "ingestion", "query", "concurrency", "--backend", "numpy",
+         "--ingest-sizes", "200", "--query-corpus", "200", "--queries", "10",
+         "--concurrency", "1", "4", "--dim", "64", "--time-scale", "0",
+         "--output", str(output)],
+        cwd=tmp_path, check=True, capture_output=True
+    )
+    report = json.loads(output.read_text())
+    results = report["results"]
+    
+    assert set(report["scenario_seconds"]) == {"ingestion", "query", "concurrency"}
+    assert results["ingestion"]["200"]["chunks"] == 200
+    assert results["query"]["total"]["n"] == 10 and results["query"]["error_rate"] == 0.0
+    assert [results["concurrency"][n]["queries"] for n in ("1", "4")] == [10, 10]
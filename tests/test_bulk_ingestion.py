@@ -0,0 +1,49 @@
+import json
+import os
+
+from src import bulk_ingestion
+
+
+def _write_jsonl(path, n: int, prefix: str):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "pmid": f"{prefix}{i}",
+                "title": f"Paper {prefix} {i}",
+                "abstract": f"Hippocampal neurons number {i} encode memory in {prefix} mice.",
+                "authors": ["Smith J"],
+                "year": "2020",
+                "journal": "Neuron"
+            }) + "\n")
+
+
+def test_bulk_ingest_jsonl(tmp_path, make_rag):
+    files = [tmp_path / "a.jsonl", tmp_path / "b.jsonl"]
+    _write_jsonl(files[0], 30, "a")
+    _write_jsonl(files[1], 20, "b")
+    rag = make_rag()
+    
+    result = rag.ingest_files([str(f) for f in files], batch_size=16, parse_workers=2)
+    assert result["errors"] == []
+    assert result["papers"] == 50
+    assert rag.vector_store.count == result["added"] > 0
+    assert result["stages"]["parse"]["items"] == 50
+    
+    again = rag.ingest_files([str(f) for f in files], batch_size=16, parse_workers=2)
+    assert again["added"] == 0 and again["skipped"] == result["added"]
+
+
+def _dying_parse_file(index, path, out, batch_size):
+    os._exit(1)
+
+
+def test_dead_parse_worker_fails_the_run(tmp_path, make_rag, fake_client, monkeypatch):
+    path = tmp_path / "a.jsonl"
+    _write_jsonl(path, 5, "a")
+    # Pool workers are forked, so they see the patched function
+    monkeypatch.setattr(bulk_ingestion, "_parse_file", _dying_parse_file)
+    
+    result = make_rag().ingest_files([str(path)], parse_workers=1)
+    assert result["papers"] == 0
+    assert any("parse worker died" in e for e in result["errors"])
+    assert fake_client.calls["embed"] == 0
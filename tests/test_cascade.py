@@ -0,0 +1,55 @@
+from src.cascade import BM25Index, CascadePlan, RerankCascade
+
+
+def _doc(i: int, text: str, score: float) -> dict:
+    return {"id": f"d{i}", "text": text, "score": score, "metadata": {"pmid": str(i)}}
+
+
+FILLER = "Cortical oscillations vary with arousal and attention in primates."
+
+
+def test_decisive_candidate_skips_rerank():
+    retrieved = [_doc(0, "Dopamine neurons encode reward prediction errors.", 0.9)]
+    retrieved += [_doc(i, FILLER, 0.3) for i in range(1, 20)]
+    plan = RerankCascade().plan("reward prediction error dopamine", retrieved, top_n=5)
+    
+    assert plan.action == "skipped"
+    assert plan.candidates[0]["id"] == "d0"
+
+
+def test_close_candidates_are_shrunk_for_rerank():
+    retrieved = [_doc(i, f"Dopamine study {i} on reward learning.", 0.8 - i * 0.001)
+                 for i in range(20)]
+    cascade = RerankCascade(max_candidates=10)
+    plan = cascade.plan("dopamine reward", retrieved, top_n=5)
+    
+    assert plan.action == "shrunk" and len(plan.candidates) == 10
+    assert cascade.stats()["docs_sent"] == 10
+
+
+def test_cascade_is_opt_in_and_reports_the_real_rerank_action(make_rag, fake_client):
+    question = "What is the role of the hippocampus in memory?"
+    plain = make_rag("off")
+    assert plain.cascade is None
+    plain.load_demo_data()
+    assert plain.query(question)["reranking_used"] is True
+    
+    rag = make_rag("on", rerank_cascade=True)
+    rag.load_demo_data()
+    rag.cascade.plan = lambda query, retrieved, top_n: CascadePlan(retrieved, "skipped",
+                                                                   len(retrieved))
+    reranks = fake_client.calls["rerank"]
+    result = rag.query(question)
+    
+    assert fake_client.calls["rerank"] == reranks
+    assert result["rerank_cascade"] == "skipped"
+    assert result["reranking_used"] is False and result["rerank_scores"] is None
+
+
+def test_bm25_ignores_a_repeated_id():
+    once, twice = BM25Index(), BM25Index()
+    once.add(["a", "b"], ["grid cells map space", "place cells remap"])
+    twice.add(["a", "b", "a"], ["grid cells map space", "place cells remap", "grid grid grid"])
+    
+    assert len(twice) == 2
+    assert twice.scores("grid cells", ["a", "b"]) == once.scores("grid cells", ["a", "b"])
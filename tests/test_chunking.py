@@ -0,0 +1,76 @@
+import tracemalloc
+
+from src.data_ingestion import ChunkDeduplicator, Paper, TextChunker
+
+
+def _paper(pmid: str, title: str, abstract: str, sections=None) -> Paper:
+    return Paper(pmid=pmid, title=title, abstract=abstract, authors=["Smith J"],
+                 year="2020", journal="Neuron", sections=sections)
+
+
+ABSTRACT = ("Place cells in the hippocampus fire at specific locations and remap "
+            "when the animal enters a new environment with different cues. Remapping "
+            "is slower in aged mice, and the stability of the new map predicts how "
+            "well the animal later recalls the environment in a memory task given "
+            "one day after the first exposure to the arena and its visual cues.")
+
+
+def test_dedup_drops_exact_and_near_duplicates():
+    papers = [
+        _paper("1", "Hippocampal remapping", ABSTRACT),
+        _paper("2", "Hippocampal remapping", ABSTRACT),
+        _paper("3", "Hippocampal remapping", ABSTRACT + " Open access."),
+    ]
+    chunks = list(TextChunker().chunk_papers(papers))
+    assert [c.paper_id for c in chunks] == ["1"]
+
+
+def test_dedup_keeps_same_abstract_under_a_new_title():
+    papers = [
+        _paper("1", "Hippocampal remapping", ABSTRACT),
+        _paper("2", "Erratum: hippocampal remapping in novel arenas", ABSTRACT),
+    ]
+    chunks = list(TextChunker().chunk_papers(papers))
+    assert [c.paper_id for c in chunks] == ["1", "2"]
+
+
+def test_dedup_disabled_keeps_everything():
+    papers = [_paper(str(i), "Same", ABSTRACT) for i in range(3)]
+    assert len(list(TextChunker(dedup=False).chunk_papers(papers))) == 3
+
+
+def test_windows_fit_the_budget_and_ids_are_stable():
+    body = " ".join(f"Sentence {i} describes a separate finding about cortex." for i in range(80))
+    paper = _paper("9", "Cortex", ABSTRACT, sections=[("Results", body)])
+    chunker = TextChunker(max_tokens=120, overlap_tokens=20)
+    
+    first = chunker.chunk_paper(paper)
+    assert len(first) > 2
+    assert [c.chunk_id for c in first] == [c.chunk_id for c in chunker.chunk_paper(paper)]
+
+
+def _unique_text(i: int) -> str:
+    return " ".join(f"term{i}x{j}" for j in range(40))
+
+
+def test_dedup_memory_stays_within_its_bound():
+    dedup = ChunkDeduplicator(max_bytes=100 * ChunkDeduplicator.ENTRY_BYTES)
+    assert dedup.max_entries == 100
+    
+    tracemalloc.start()
+    try:
+        for i in range(200):
+            dedup.is_duplicate(_unique_text(i))
+        after_200, _ = tracemalloc.get_traced_memory()
+        for i in range(200, 2000):
+            dedup.is_duplicate(_unique_text(i))
+        after_2000, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    
+    assert len(dedup) == 100 and len(dedup._buckets) <= 100 * dedup.BANDS
+    assert after_2000 - after_200 < 20 * ChunkDeduplicator.ENTRY_BYTES
+    
+    # Forgotten chunks count as new again; recent ones are still caught
+    assert dedup.is_duplicate(_unique_text(1999))
+    assert not dedup.is_duplicate(_unique_text(0))
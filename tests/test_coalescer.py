@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.coalescer import EmbedCoalescer
+
+
+def _fake_embed(texts):
+    return [[float(len(t))] for t in texts]
+
+
+def test_concurrent_requests_share_calls():
+    sent = []
+    coalescer = EmbedCoalescer(lambda texts: sent.append(list(texts)) or _fake_embed(texts),
+                               window_ms=50)
+    texts = [f"question {i % 8}" for i in range(32)]
+    with ThreadPoolExecutor(32) as pool:
+        results = list(pool.map(coalescer.embed, texts))
+    
+    assert results == _fake_embed(texts)
+    assert sum(len(batch) for batch in sent) == 8
+    assert len(sent) < 8
+
+
+def test_embed_times_out_after_window_plus_timeout():
+    release = threading.Event()
+    coalescer = EmbedCoalescer(lambda texts: release.wait() and _fake_embed(texts),
+                               window_ms=1, timeout=0.1)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        coalescer.embed("slow")
+    assert time.monotonic() - started < 1.0
+    release.set()
+
+
+def test_failed_flusher_fails_pending_and_restarts(monkeypatch):
+    coalescer = EmbedCoalescer(_fake_embed, window_ms=1)
+    submit = coalescer._pool.submit
+    calls = []
+    
+    def broken_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("pool broke")
+        return submit(*args)
+    
+    monkeypatch.setattr(coalescer._pool, "submit", broken_once)
+    with pytest.raises(RuntimeError, match="pool broke"):
+        coalescer.embed("first")
+    assert coalescer.embed("second") == [6.0]
+    assert coalescer.restarts == 1
+
+
+def test_embedder_batches_stop_retrying_within_the_timeout():
+    from src.embeddings import CohereEmbedder
+    from src.fake_cohere import SimulatedApiError
+    
+    calls = []
+    
+    class Throttled:
+        def embed(self, **kwargs):
+            calls.append(kwargs["request_options"]["timeout_in_seconds"])
+            error = SimulatedApiError(429)
+            error.headers["retry-after"] = "1"
+            raise error
+    
+    embedder = CohereEmbedder(client=Throttled(), async_client=object(), timeout=0.3,
+                              coalesce_window_ms=1)
+    started = time.monotonic()
+    # The batch gives up with the API error instead of the caller timing out
+    with pytest.raises(SimulatedApiError):
+        embedder.embed_query("hippocampus")
+    assert time.monotonic() - started < embedder.coalescer.max_wait
+    assert len(calls) == 1 and calls[0] <= 0.3
+
+
+def test_embedder_coalesces_concurrent_queries(fake_client):
+    from src.embeddings import CohereEmbedder
+    
+    embedder = CohereEmbedder(client=fake_client, async_client=object(), coalesce_window_ms=50)
+    plain = CohereEmbedder(client=fake_client, async_client=object())
+    questions = [f"question {i % 4} about memory" for i in range(16)]
+    
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(embedder.embed_query, questions))
+    calls = fake_client.calls["embed"]
+    
+    assert results == plain.embed_queries(questions)
+    assert calls < 4 and embedder.coalescer.stats()["texts_sent"] == 4
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.cohere_client import CohereClientFactory
+from src.embeddings import CohereEmbedder
+from src.generator import AnswerGenerator
+from src.reranker import CohereReranker
+
+
+def test_injected_client_needs_no_async_client_or_key(monkeypatch, fake_client):
+    monkeypatch.delenv("COHERE_API_KEY", raising=False)
+    embedder = CohereEmbedder(client=fake_client)
+    CohereReranker(client=fake_client)
+    AnswerGenerator(client=fake_client)
+    
+    assert len(embedder.embed_query("hippocampus")) == 1024
+    with pytest.raises(ValueError, match="async_client"):
+        asyncio.run(embedder.aembed_query("hippocampus"))
+
+
+def test_factory_builds_the_async_pool_on_first_async_use(monkeypatch, tmp_path):
+    from src.pipeline import NeuroLitRAG
+    
+    monkeypatch.delenv("COHERE_API_KEY", raising=False)
+    factory = CohereClientFactory(api_key="test-key")
+    rag = NeuroLitRAG(client_factory=factory, embedding_cache_dir=None, vector_backend="numpy",
+                      vector_store_options={"persist_directory": str(tmp_path / "index")})
+    assert factory._client is not None and factory._async_client is None
+    
+    assert rag.embedder.async_client.embed == factory.async_client.embed
+    assert factory._async_client is not None
+
+
+def test_pipelines_share_one_client_per_key(monkeypatch, tmp_path):
+    from src.pipeline import NeuroLitRAG
+    
+    monkeypatch.setattr(CohereClientFactory, "_shared", {})
+    monkeypatch.setenv("COHERE_API_KEY", "test-key")
+    assert CohereClientFactory.shared() is CohereClientFactory.shared("test-key")
+    assert CohereClientFactory.shared("other-key") is not CohereClientFactory.shared()
+    
+    rags = [NeuroLitRAG(embedding_cache_dir=None, vector_backend="numpy",
+                        vector_store_options={"persist_directory": str(tmp_path / name)})
+            for name in ("a", "b")]
+    client = CohereClientFactory.shared().client
+    assert all(c is client for rag in rags
+               for c in (rag.embedder.client, rag.reranker.client, rag.generator.client))
+    assert rags[0].generator.request_options == {"timeout_in_seconds": 120.0}
+
+
+def test_pooled_requests_reuse_one_keepalive_connection():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def do_GET(self):
+            body = b"{}"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    factory = CohereClientFactory(api_key="test-key")
+    try:
+        with factory._httpx_client() as http:
+            for _ in range(5):
+                http.get(f"http://127.0.0.1:{server.server_port}/").raise_for_status()
+    finally:
+        server.shutdown()
+    
+    stats = factory.connection_stats()
+    assert (stats["requests"], stats["connections"], stats["reuse_ratio"]) == (5, 1, 0.8)
@@ -0,0 +1,38 @@
+import pytest
+
+from src.context_packing import ContextPacker
+from src.data_ingestion import count_tokens
+
+
+def _doc(pmid: str, words: int, score: float) -> dict:
+    text = " ".join(f"Finding {i} about dopamine signalling." for i in range(words // 5))
+    return {"text": text, "score": score, "metadata": {"pmid": pmid, "title": f"Paper {pmid}"}}
+
+
+@pytest.mark.parametrize("max_tokens", [150, 400, 1000])
+def test_pack_stays_within_budget(max_tokens):
+    docs = [_doc(str(i), 200, 1.0 - i / 10) for i in range(6)]
+    packer = ContextPacker(max_tokens=max_tokens)
+    packed = packer.pack(docs)
+    
+    assert packed.docs
+    assert packed.tokens <= max_tokens
+    assert sum(count_tokens(d["text"]) + packer.HEADER_TOKENS for d in packed.docs) == packed.tokens
+    assert [d["metadata"]["pmid"] for d in packed.docs] == [str(i) for i in range(len(packed.docs))]
+
+
+def test_trimmed_doc_ends_with_marker_within_budget():
+    packer = ContextPacker(max_tokens=300)
+    packed = packer.pack([_doc("1", 100, 1.0), _doc("2", 500, 0.9)])
+    
+    assert len(packed.docs) == 2
+    assert packed.docs[1]["text"].endswith(packer.TRIM_MARKER)
+    assert packed.tokens <= 300
+
+
+def test_chunks_of_one_paper_merge_and_low_scores_drop():
+    docs = [_doc("1", 20, 1.0), _doc("1", 20, 0.8), _doc("2", 20, 0.1)]
+    packed = ContextPacker(max_tokens=None, min_relative_score=0.5).pack(docs)
+    
+    assert [d["metadata"]["pmid"] for d in packed.docs] == ["1"]
+    assert "\n...\n" in packed.docs[0]["text"]
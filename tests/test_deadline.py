@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from src.deadline import Deadline, DeadlineExceeded, Hedger
+
+
+def _sleep_then(seconds: float, value):
+    def call():
+        time.sleep(seconds)
+        return value
+    return call
+
+
+def test_stage_budget_reserves_later_stages():
+    deadline = Deadline(1000)
+    assert deadline.for_stage("embed") == pytest.approx(0.1, abs=0.01)
+    assert deadline.for_stage("generate") == pytest.approx(1.0, abs=0.01)
+
+
+def test_hedge_wins_over_a_slow_primary():
+    hedger = Hedger(default_delays={"embed": 0.02})
+    result = hedger.call("embed", _sleep_then(1.0, "slow"), timeout=0.5,
+                         hedge_fn=_sleep_then(0.0, "fast"))
+    assert result == "fast"
+    assert hedger.hedges == hedger.hedge_wins == 1
+
+
+def test_timeout_raises_deadline_exceeded():
+    hedger = Hedger()
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as e:
+        hedger.call("generate", _sleep_then(1.0, None), timeout=0.05, hedge=False)
+    assert e.value.stage == "generate"
+    assert time.monotonic() - started < 0.5
+
+
+def test_full_pool_skips_hedges_and_cancels_queued_attempts():
+    release = threading.Event()
+    hedger = Hedger(default_delays={"embed": 0.01}, max_workers=1)
+    
+    with pytest.raises(DeadlineExceeded):
+        hedger.call("embed", release.wait, timeout=0.1)
+    assert hedger.hedges == 0 and hedger.hedges_skipped == 1
+    
+    # The worker is still busy; a queued primary is cancelled on timeout
+    ran = []
+    with pytest.raises(DeadlineExceeded):
+        hedger.call("embed", lambda: ran.append(1), timeout=0.05, hedge=False)
+    release.set()
+    time.sleep(0.05)
+    assert ran == []
+
+
+def test_slow_rerank_degrades_instead_of_overrunning(make_rag, monkeypatch):
+    rag = make_rag()
+    rag.load_demo_data()
+    rerank = rag.reranker.rerank_with_metadata
+    monkeypatch.setattr(rag.reranker, "rerank_with_metadata",
+                        lambda **kwargs: time.sleep(1.0) or rerank(**kwargs))
+    
+    started = time.monotonic()
+    result = rag.query("What does the hippocampus do?", deadline_ms=500)
+    assert time.monotonic() - started < 0.9
+    assert "rerank_timeout" in result["degradations"]
+    assert result["answer"]
@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache
+from src.embeddings import CohereEmbedder
+
+MODEL = "embed-english-v3.0"
+
+
+def test_round_trip_and_reopen_from_disk(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    texts = ["place cells", "grid cells"]
+    assert cache.get_many(MODEL, "search_document", texts) == [None, None]
+    
+    cache.put_many(MODEL, "search_document", texts, [[0.5, 1.0], [2.0, -1.0]])
+    assert cache.get_many(MODEL, "search_document", texts[::-1]) == [[2.0, -1.0], [0.5, 1.0]]
+    assert (cache.hits, cache.misses) == (2, 2)
+    
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.get_many(MODEL, "search_document", texts) == [[0.5, 1.0], [2.0, -1.0]]
+    # Keys include the model and input type
+    assert reopened.get_many("other-model", "search_document", texts) == [None, None]
+
+
+def test_query_embeddings_stay_in_memory(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), query_cache_size=1)
+    cache.put_many(MODEL, "search_query", ["first", "second"], [[1.0], [2.0]])
+    
+    assert cache.get_many(MODEL, "search_query", ["first", "second"]) == [None, [2.0]]
+    assert EmbeddingCache(str(tmp_path)).get_many(MODEL, "search_query", ["second"]) == [None]
+
+
+def test_embedder_only_sends_misses(tmp_path, fake_client):
+    embedder = CohereEmbedder(client=fake_client, async_client=object(),
+                              cache=EmbeddingCache(str(tmp_path)))
+    first = embedder.embed_documents(["a", "b"], show_progress=False)
+    calls = dict(fake_client.calls)
+    
+    again = CohereEmbedder(client=fake_client, async_client=object(),
+                           cache=EmbeddingCache(str(tmp_path)))
+    cached = again.embed_documents(["b", "a", "b"], show_progress=False)
+    np.testing.assert_allclose(cached, [first[1], first[0], first[1]], rtol=1e-6)
+    assert dict(fake_client.calls) == calls
@@ -0,0 +1,44 @@
+import pytest
+
+from src.vector_store import AUTHOR_KEY_PREFIX, QueryFilter, matches_where
+
+RECORD = {"pmid": "1", "year_num": 2015, "journal": "Neuron", AUTHOR_KEY_PREFIX + "Smith J": True}
+
+
+def test_empty_filter_has_no_where():
+    assert QueryFilter().to_where() is None
+    assert matches_where(RECORD, None)
+
+
+@pytest.mark.parametrize("query_filter, expected", [
+    (QueryFilter(year_min=2010, year_max=2015), True),
+    (QueryFilter(year_min=2016), False),
+    (QueryFilter(journals=["Cell", "Neuron"]), True),
+    (QueryFilter(journals=["Cell"]), False),
+    (QueryFilter(authors=["Jones A", "Smith J"]), True),
+    (QueryFilter(authors=["Jones A"]), False),
+    (QueryFilter(year_max=2015, journals=["Neuron"], authors=["Jones A"]), False),
+])
+def test_where_clauses_select_the_same_records_as_the_filter(query_filter, expected):
+    assert matches_where(RECORD, query_filter.to_where()) is expected
+
+
+def test_known_papers_replace_journal_and_author_clauses():
+    query_filter = QueryFilter(year_min=2010, journals=["Cell"], authors=["Jones A"])
+    where = query_filter.to_where(pmids={"2", "1"})
+    
+    assert where == {"$and": [{"year_num": {"$gte": 2010}}, {"pmid": {"$in": ["1", "2"]}}]}
+    assert matches_where(RECORD, where)
+    assert not matches_where(RECORD, query_filter.to_where(pmids=set()))
+
+
+@pytest.mark.parametrize("backend", ["numpy", "chroma"])
+def test_filtered_query_only_cites_papers_in_scope(make_rag, backend):
+    rag = make_rag(backend=backend)
+    rag.load_demo_data()
+    
+    result = rag.query("How do memories form?", use_reranking=False,
+                       filters=QueryFilter(year_min=2023, journals=["Neuron", "Nature Neuroscience"]))
+    assert result["citations"]
+    assert {(c["journal"], c["year"]) for c in result["citations"]} <= \
+        {("Neuron", "2023"), ("Nature Neuroscience", "2023")}
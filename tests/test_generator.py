@@ -0,0 +1,33 @@
+from src.generator import AnswerGenerator, Citation, CitationTracker
+
+
+def _citation(number: int) -> Citation:
+    return Citation(number, f"{number}00", f"Paper {number}", "Smith J", "2020", "Neuron")
+
+
+def test_markers_split_across_deltas_resolve_once():
+    tracker = CitationTracker([_citation(1), _citation(2), _citation(12)])
+    
+    assert tracker.feed("Ripples replay memories [") == []
+    assert tracker.feed("1") == []
+    assert [c.number for c in tracker.feed("], and [1")] == [1]
+    assert [c.number for c in tracker.feed("2] again [1] [")] == [12]
+    assert [c.number for c in tracker.feed("2][9] [x]")] == [2]
+    assert tracker.seen == [1, 12, 2]
+    assert tracker.text == "Ripples replay memories [1], and [12] again [1] [2][9] [x]"
+
+
+def test_stream_yields_text_then_citations_then_the_answer(fake_client):
+    generator = AnswerGenerator(client=fake_client, async_client=object())
+    docs = [{"text": f"Finding {i} about place cells.", "score": 1.0 - i / 10,
+             "metadata": {"pmid": str(i), "title": f"Paper {i}", "authors": "Smith J",
+                          "year": "2020", "journal": "Neuron"}} for i in range(3)]
+    
+    events = list(generator.generate_stream("What do place cells do?", docs))
+    text = "".join(e["text"] for e in events if e["type"] == "text")
+    cited = [e["citation"].number for e in events if e["type"] == "citation"]
+    
+    assert events[-1]["type"] == "end" and [e["type"] for e in events].count("end") == 1
+    answer = events[-1]["answer"]
+    assert answer.answer == text == generator.generate("What do place cells do?", docs).answer
+    assert cited and cited == [c.number for c in answer.citations][:len(cited)]
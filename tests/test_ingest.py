@@ -0,0 +1,54 @@
+import pytest
+
+from src.data_ingestion import Chunk, Paper, TextChunker
+
+ABSTRACT = "Place cells in the hippocampus remap when the animal enters a new arena."
+
+
+def _paper(sentences: int) -> Paper:
+    body = " ".join(f"Sentence {i} describes a separate finding about cortex." for i in range(sentences))
+    return Paper(pmid="9", title="Cortex", abstract=ABSTRACT, authors=["Smith J"],
+                 year="2020", journal="Neuron", sections=[("Results", body)])
+
+
+@pytest.mark.parametrize("backend", ["numpy", "chroma", "sharded"])
+def test_reingest_removes_chunks_the_paper_no_longer_has(make_rag, backend):
+    rag = make_rag(backend=backend)
+    chunker = TextChunker(max_tokens=120, overlap_tokens=20)
+    
+    long_version = chunker.chunk_paper(_paper(80))
+    assert rag.ingest(long_version)["added"] == len(long_version) > 3
+    
+    short_version = chunker.chunk_paper(_paper(10))
+    counts = rag.ingest(short_version)
+    assert counts["removed"] == len(long_version) - len(short_version) > 0
+    
+    kept = {c.chunk_id for c in short_version}
+    assert rag.vector_store.count == len(kept)
+    assert set(rag.vector_store.ids_by_pmid(["9"])["9"]) == kept
+    hits = rag.vector_store.query(rag.embedder.embed_query("cortex finding"), top_k=20)
+    assert {h["id"] for h in hits} == kept
+
+
+def test_reingest_skips_unchanged_and_updates_changed(make_rag, fake_client, monkeypatch):
+    from src.vector_store import VectorStore
+    
+    rag = make_rag()
+    chunks = TextChunker(max_tokens=120, overlap_tokens=20).chunk_paper(_paper(20))
+    assert rag.ingest(chunks)["added"] == len(chunks)
+    
+    embeds = fake_client.calls["embed"]
+    assert rag.ingest(chunks) == {"added": 0, "updated": 0, "skipped": len(chunks), "removed": 0}
+    assert fake_client.calls["embed"] == embeds
+    
+    edited = list(chunks)
+    first = chunks[0]
+    edited[0] = Chunk(first.chunk_id, first.paper_id, first.text + " Revised.", first.paper,
+                      first.section, first.chunk_index)
+    counts = rag.ingest(edited)
+    assert (counts["updated"], counts["skipped"]) == (1, len(chunks) - 1)
+    
+    # A metadata layout change rewrites every record
+    monkeypatch.setattr(VectorStore, "METADATA_VERSION", VectorStore.METADATA_VERSION + 1)
+    assert rag.ingest(edited)["updated"] == len(chunks)
+    assert rag.ingest(edited)["skipped"] == len(chunks)
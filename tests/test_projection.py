@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.data_ingestion import Chunk, PaperMeta
+from src.projection import Projection
+
+QUESTION = "What is the role of the hippocampus in memory?"
+
+
+def test_demo_corpus_fits_a_projection_wider_than_itself(make_rag):
+    rag = make_rag(projection_dim=256)
+    rag.load_demo_data()
+    
+    assert rag.vector_store.projection.dim == 256
+    assert len(rag.embedder.embed_query(QUESTION)) == 256
+    assert rag.query(QUESTION, use_reranking=False)["citations"]
+    
+    # The fitted projection persists with the index
+    assert make_rag(projection_dim=256).vector_store.projection.dim == 256
+
+
+def test_bulk_ingest_fits_on_a_sample_of_all_files(tmp_path, make_rag):
+    files = [tmp_path / "a.jsonl", tmp_path / "b.jsonl"]
+    for path, prefix, n in ((files[0], "a", 30), (files[1], "b", 20)):
+        with open(path, "w") as f:
+            for i in range(n):
+                f.write(json.dumps({
+                    "pmid": f"{prefix}{i}", "title": f"Paper {prefix} {i}",
+                    "abstract": f"Cortical neurons number {i} encode {prefix} memory traces.",
+                    "authors": ["Smith J"], "year": "2020", "journal": "Neuron"
+                }) + "\n")
+    rag = make_rag(projection_dim=64)
+    
+    # Every batch is narrower than the projection; the fit sees all 50 chunks
+    result = rag.ingest_files([str(f) for f in files], batch_size=16, parse_workers=1,
+                              projection_sample=40)
+    assert result["errors"] == []
+    assert result["projection"]["seen"] == 50 and result["projection"]["sampled"] == 40
+    assert rag.vector_store.count == 50
+
+
+def test_storing_before_fitting_is_rejected(make_rag):
+    rag = make_rag(projection_dim=64)
+    paper = PaperMeta("900", "Grid cells", ["Moser E"], "2020", "Nature")
+    chunk = Chunk("900_0", "900", "Grid cells in entorhinal cortex map space.", paper)
+    embeddings = rag.embedder.embed_documents([chunk.text], show_progress=False)
+    
+    with pytest.raises(ValueError, match="fit_projection"):
+        rag.store_chunks([chunk], embeddings)
+    
+    rag.fit_projection([chunk])
+    rag.store_chunks([chunk], embeddings)
+    assert rag.vector_store.count == 1
+    with pytest.raises(ValueError):
+        rag.fit_projection([chunk])
+
+
+def test_small_sample_pca_keeps_dot_products_with_the_sample(random_vectors):
+    sample = random_vectors(10, dim=64)
+    sample /= np.linalg.norm(sample, axis=1, keepdims=True)
+    query = random_vectors(1, dim=64, seed=1)
+    
+    projection = Projection.fit(sample, 32, "pca")
+    assert projection.retained == pytest.approx(1.0, abs=1e-5)
+    
+    projected = projection.apply(sample) @ projection.apply(query)[0]
+    assert np.argsort(projected).tolist() == np.argsort(sample @ query[0]).tolist()
+
+
+def test_evaluation_runs_on_a_subset(make_rag, tmp_path):
+    rag = make_rag()
+    rag.load_demo_data()
+    
+    report = rag.evaluate_projections([QUESTION], dims=[64], kinds=["pca"], top_k=3,
+                                      max_vectors=4, workdir=str(tmp_path / "eval"))
+    assert report["stored_vectors"] == rag.vector_store.count
+    assert 0 < report["vectors"] < report["stored_vectors"]
+    assert report["full"]["recall@3"] == 1.0
+    assert not any((tmp_path / "eval").iterdir())
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from src.numpy_store import NumpyBackend
+from src.quantization import hamming_distances, quantize_binary, quantize_int8, recall_at_k
+
+
+def test_int8_round_trip():
+    vectors = np.random.default_rng(0).standard_normal((20, 32)).astype(np.float32)
+    codes, scales = quantize_int8(vectors)
+    assert codes.dtype == np.int8
+    assert np.allclose(codes * scales[:, None], vectors, atol=scales.max())
+
+
+def test_hamming_distances():
+    a = quantize_binary(np.array([[1, -1, 1, -1, 1, 1, 1, 1]], dtype=np.float32))
+    b = quantize_binary(np.array([[1, 1, 1, 1, 1, 1, 1, 1],
+                                  [-1, 1, -1, 1, -1, -1, -1, -1]], dtype=np.float32))
+    assert hamming_distances(a, b).tolist() == [[2, 8]]
+
+
+def test_recall_at_k():
+    assert recall_at_k([["a", "b"], ["c", "d"]], [["a", "x"], ["d", "c"]]) == 0.75
+
+
+@pytest.mark.parametrize("quantization,multiplier,minimum", [
+    ("int8", 4, 0.95),
+    ("binary", 10, 0.9)
+])
+def test_quantized_search_recall(tmp_path, random_vectors, quantization, multiplier, minimum):
+    # Clustered data, as real embeddings are
+    centers = random_vectors(20, dim=256)
+    rng = np.random.default_rng(1)
+    vectors = centers[rng.integers(0, 20, 2000)] + 0.5 * random_vectors(2000, dim=256, seed=2)
+    queries = centers[rng.integers(0, 20, 30)] + 0.5 * random_vectors(30, dim=256, seed=3)
+    
+    index = NumpyBackend(str(tmp_path / quantization), quantization=quantization,
+                         rescore_multiplier=multiplier)
+    index.add(ids=[f"v{i}" for i in range(len(vectors))], embeddings=vectors,
+              texts=[""] * len(vectors))
+    report = index.measure_recall(queries.tolist(), top_k=10)
+    
+    assert report["recall@10"] >= minimum
+    assert report["compression"] > 1
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+QUESTION = "What is the role of the hippocampus in memory?"
+
+
+def _answer_keys(result):
+    return (result["answer"], [c["title"] for c in result["citations"]],
+            result["rerank_scores"], result["context_tokens"])
+
+
+@pytest.mark.parametrize("use_reranking", [True, False])
+def test_every_query_path_selects_the_same_context(make_rag, use_reranking):
+    rag = make_rag()
+    rag.load_demo_data()
+    
+    expected = _answer_keys(rag.query(QUESTION, use_reranking=use_reranking))
+    streamed = list(rag.query_stream(QUESTION, use_reranking=use_reranking))[-1]["result"]
+    assert _answer_keys(streamed) == expected
+    assert _answer_keys(asyncio.run(rag.aquery(QUESTION, use_reranking=use_reranking))) == expected
+    assert _answer_keys(rag.query(QUESTION, use_reranking=use_reranking,
+                                  deadline_ms=60000)) == expected
+    assert [_answer_keys(r) for r in rag.query_many([QUESTION], use_reranking=use_reranking)] \
+        == [expected]
+
+
+def test_concurrent_aqueries_match_query(make_rag, fake_client):
+    rag = make_rag()
+    assert asyncio.run(rag.aquery(QUESTION)) == {"error": "No documents loaded."}
+    rag.load_demo_data()
+    questions = [QUESTION, "How does dopamine affect reward processing?",
+                 "What role do microglia play in Alzheimer's disease?"]
+    
+    async def ask_all():
+        return await asyncio.gather(*(rag.aquery(q, include_trace=True) for q in questions))
+    
+    calls = dict(fake_client.calls)
+    results = asyncio.run(ask_all())
+    assert {k: fake_client.calls[k] - calls[k] for k in calls} == {"embed": 3, "rerank": 3, "chat": 3}
+    assert [_answer_keys(r) for r in results] == [_answer_keys(rag.query(q)) for q in questions]
+    assert [s["name"] for s in results[0]["trace"]["spans"]] == \
+        ["embed", "retrieve", "rerank", "generate"]
+
+
+def test_query_many_batches_embeds_and_isolates_failures(make_rag, fake_client, monkeypatch):
+    rag = make_rag()
+    assert rag.query_many([]) == []
+    rag.load_demo_data()
+    questions = [f"Question {i} about hippocampal memory?" for i in range(6)]
+    
+    generate = rag.generator.generate
+    
+    def flaky_generate(query, **kwargs):
+        if query == questions[2]:
+            raise RuntimeError("chat failed")
+        return generate(query=query, **kwargs)
+    
+    monkeypatch.setattr(rag.generator, "generate", flaky_generate)
+    embeds = fake_client.calls["embed"]
+    results = rag.query_many(questions, max_concurrency=3)
+    
+    assert fake_client.calls["embed"] == embeds + 1
+    assert results[2] == {"question": questions[2], "error": "chat failed"}
+    assert [r["question"] for r in results] == questions
+    assert all("answer" in r for i, r in enumerate(results) if i != 2)
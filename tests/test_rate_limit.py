@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from src.embeddings import CohereEmbedder
+from src.fake_cohere import SimulatedApiError
+from src.rate_limit import TokenBucket, call_with_retry
+
+
+def _throttled() -> SimulatedApiError:
+    error = SimulatedApiError(429)
+    error.headers["retry-after"] = "1"
+    return error
+
+
+class ThrottledClient:
+    """Answers every Embed call with a 429 asking for a 1 s back-off."""
+    
+    def __init__(self):
+        self.timeouts = []
+    
+    def embed(self, request_options=None, **kwargs):
+        self.timeouts.append(request_options["timeout_in_seconds"])
+        raise _throttled()
+
+
+def test_token_bucket_paces_beyond_its_burst():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    for _ in range(10):
+        bucket.acquire()
+    # The first 5 are the burst; the other 5 wait 1/50 s each
+    assert 0.09 <= time.monotonic() - started < 0.5
+
+
+@pytest.mark.parametrize("status, attempts", [(429, 3), (503, 3), (400, 1), (404, 1)])
+def test_only_rate_limit_and_server_errors_are_retried(status, attempts):
+    calls = []
+    
+    def fail():
+        calls.append(status)
+        raise SimulatedApiError(status)
+    
+    with pytest.raises(SimulatedApiError):
+        call_with_retry(fail, max_retries=2, base_delay=0.001)
+    assert len(calls) == attempts
+
+
+def test_retry_recovers_and_honours_retry_after():
+    calls = []
+    
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            error = SimulatedApiError(429)
+            error.headers["retry-after"] = "0.05"
+            raise error
+        return "ok"
+    
+    assert call_with_retry(flaky, base_delay=10) == "ok"
+    assert calls[1] - calls[0] >= 0.05
+
+
+def test_no_retry_starts_after_the_deadline():
+    calls = []
+    
+    def fail():
+        calls.append(time.monotonic())
+        raise _throttled()
+    
+    started = time.monotonic()
+    with pytest.raises(SimulatedApiError):
+        call_with_retry(fail, deadline=started + 0.5)
+    assert len(calls) == 1 and time.monotonic() - started < 0.5
+
+
+def test_embed_timeout_bounds_attempts_and_retries():
+    client = ThrottledClient()
+    embedder = CohereEmbedder(client=client, async_client=object())
+    
+    started = time.monotonic()
+    with pytest.raises(SimulatedApiError):
+        embedder.embed_query("hippocampus", timeout=0.3)
+    assert time.monotonic() - started < 0.3
+    assert len(client.timeouts) == 1 and 0 < client.timeouts[0] <= 0.3
+
+
+def test_concurrent_batches_keep_input_order(fake_client):
+    texts = [f"finding {i} about cortex" for i in range(10)]
+    sequential = CohereEmbedder(client=fake_client, async_client=object())
+    concurrent = CohereEmbedder(client=fake_client, async_client=object(), max_concurrency=4)
+    
+    expected = sequential.embed_documents(texts, batch_size=2, show_progress=False)
+    assert concurrent.embed_documents(texts, batch_size=2, show_progress=False) == expected
+    assert fake_client.calls["embed"] == 10
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from src.vector_store import QueryFilter, VectorStore
+
+
+def _fill(store: VectorStore, vectors: np.ndarray):
+    n = len(vectors)
+    store.add(
+        ids=[f"doc{i}" for i in range(n)],
+        embeddings=vectors.tolist(),
+        texts=[f"text {i}" for i in range(n)],
+        metadatas=[{"pmid": f"p{i}", "year": str(2000 + i % 20)} for i in range(n)]
+    )
+
+
+SHARDED = [
+    {"num_shards": 3},
+    {"partition": "year", "year_bounds": [2005, 2012]},
+    {"num_shards": 2, "executor": "process"},
+]
+
+
+@pytest.mark.parametrize("options", SHARDED, ids=["hash", "year", "process"])
+@pytest.mark.parametrize("filters", [None, QueryFilter(year_min=2006, year_max=2014)])
+def test_sharded_results_equal_single_index(tmp_path, random_vectors, options, filters):
+    vectors = random_vectors(500)
+    queries = random_vectors(8, seed=1).tolist()
+    single = VectorStore(backend="numpy", persist_directory=str(tmp_path / "single"))
+    sharded = VectorStore(backend="sharded", persist_directory=str(tmp_path / "sharded"),
+                          **options)
+    _fill(single, vectors)
+    _fill(sharded, vectors)
+    
+    try:
+        assert sharded.count == single.count == 500
+        expected = single.query_many(queries, top_k=10, filters=filters)
+        found = sharded.query_many(queries, top_k=10, filters=filters)
+        for a, b in zip(expected, found):
+            assert [h["id"] for h in a] == [h["id"] for h in b]
+            assert [h["score"] for h in a] == pytest.approx([h["score"] for h in b], abs=1e-6)
+    finally:
+        sharded.close()
+
+
+def test_year_change_moves_the_chunk(tmp_path, random_vectors):
+    store = VectorStore(backend="sharded", persist_directory=str(tmp_path / "sharded"),
+                        partition="year", year_bounds=[2005, 2012])
+    vectors = random_vectors(40)
+    _fill(store, vectors)
+    
+    # doc1 moves from 2001 (shard 0) to 2015 (shard 2)
+    store.upsert(ids=["doc1"], embeddings=[vectors[1].tolist()], texts=["moved"],
+                 metadatas=[{"pmid": "p1", "year": "2015"}])
+    assert store.count == 40
+    
+    old_range = store.query(vectors[1].tolist(), top_k=40, filters=QueryFilter(year_max=2004))
+    assert "doc1" not in [h["id"] for h in old_range]
+    new_range = store.query(vectors[1].tolist(), top_k=1, filters=QueryFilter(year_min=2013))
+    assert new_range[0]["id"] == "doc1" and new_range[0]["text"] == "moved"
+    
+    # add() ignores an existing id even under a different year
+    store.add(ids=["doc2"], embeddings=[vectors[2].tolist()], texts=["dup"],
+              metadatas=[{"pmid": "p2", "year": "2019"}])
+    assert store.count == 40
+    assert store.get_metadatas(["doc2"])["doc2"]["year"] == "2002"
+    store.close()
+
+
+def test_numpy_delete_persists(tmp_path, random_vectors):
+    path = str(tmp_path / "numpy")
+    store = VectorStore(backend="numpy", persist_directory=path)
+    vectors = random_vectors(30)
+    _fill(store, vectors)
+    store.backend.delete(["doc3", "missing"])
+    
+    reopened = VectorStore(backend="numpy", persist_directory=path)
+    for s in (store, reopened):
+        assert s.count == 29
+        assert "doc3" not in [h["id"] for h in s.query(vectors[3].tolist(), top_k=30)]
+        assert sum(len(batch[0]) for batch in s.iter_records(7)) == 29
+    
+    reopened.upsert(ids=["doc3"], embeddings=[vectors[3].tolist()], texts=["back"],
+                    metadatas=[{"pmid": "p3"}])
+    assert reopened.query(vectors[3].tolist(), top_k=1)[0]["text"] == "back"
+
+
+def test_close_shuts_down_the_pools(tmp_path):
+    store = VectorStore(backend="sharded", persist_directory=str(tmp_path / "sharded"))
+    store.close()
+    with pytest.raises(RuntimeError):
+        store.backend._writers.submit(print)
@@ -0,0 +1,68 @@
+import pytest
+
+from src.snapshot import SnapshotError, read_directory, restore_snapshot, verify_snapshot
+from src.vector_store import VectorStore
+
+
+@pytest.fixture
+def source(make_rag):
+    rag = make_rag("source")
+    rag.load_demo_data()
+    return rag
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_round_trip_without_api_calls(tmp_path, source, make_rag, fake_client, dtype):
+    path = str(tmp_path / "index.snap")
+    exported = source.export_snapshot(path, dtype=dtype)
+    assert exported["chunks"] == source.vector_store.count
+    
+    node = make_rag("node")
+    calls = dict(fake_client.calls)
+    restored = node.restore_snapshot(path)
+    assert dict(fake_client.calls) == calls
+    assert restored["chunks"] == node.vector_store.count == source.vector_store.count
+    assert len(node.vector_store.papers) == len(source.vector_store.papers)
+    
+    # Same records and the same search results; the demo corpus is reused as-is
+    ids = [batch[0] for batch in source.vector_store.iter_records()][0]
+    assert node.vector_store.get_metadatas(ids) == source.vector_store.get_metadatas(ids)
+    query = source.embedder.embed_query("How does the hippocampus consolidate memory?")
+    expected = [h["id"] for h in source.vector_store.query(query, top_k=5)]
+    assert [h["id"] for h in node.vector_store.query(query, top_k=5)] == expected
+    assert node.load_demo_data()["warm_start"] is True
+
+
+def _corrupt(path: str, offset: int):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+@pytest.mark.parametrize("section", ["embeddings", "ids", "records", "papers"])
+def test_corrupted_section_is_detected(tmp_path, source, section):
+    path = str(tmp_path / "index.snap")
+    source.export_snapshot(path)
+    _corrupt(path, read_directory(path)["sections"][section]["offset"])
+    
+    with pytest.raises(SnapshotError, match=f"section {section} checksum"):
+        verify_snapshot(path)
+    store = VectorStore(backend="numpy", persist_directory=str(tmp_path / "target"))
+    with pytest.raises(SnapshotError):
+        restore_snapshot(path, store)
+    assert store.count == 0
+
+
+def test_truncated_or_foreign_file_is_rejected(tmp_path, source):
+    path = tmp_path / "index.snap"
+    source.export_snapshot(str(path))
+    data = path.read_bytes()
+    
+    path.write_bytes(data[:-10])
+    with pytest.raises(SnapshotError):
+        read_directory(str(path))
+    path.write_bytes(b"not a snapshot" + data[14:])
+    with pytest.raises(SnapshotError, match="not a NeuroLitRAG snapshot"):
+        read_directory(str(path))
@@ -0,0 +1,32 @@
+from src import pipeline
+from src.tracing import MetricsRegistry
+
+
+def test_tracing_is_off_by_default(make_rag, monkeypatch):
+    rag = make_rag()
+    rag.load_demo_data()
+    counted = []
+    monkeypatch.setattr(pipeline, "count_tokens", lambda text: counted.append(text) or 0)
+    
+    result = rag.query("What does the hippocampus do?")
+    assert "trace" not in result
+    assert counted == []
+
+
+def test_include_trace_records_stages_with_tracing_off(make_rag):
+    rag = make_rag()
+    rag.load_demo_data()
+    
+    result = rag.query("What does the hippocampus do?", include_trace=True)
+    names = [span["name"] for span in result["trace"]["spans"]]
+    assert names[:2] == ["embed", "retrieve"] and "generate" in names
+    assert result["trace"]["spans"][0]["tokens"] > 0
+
+
+def test_enabled_tracing_feeds_the_registry(make_rag):
+    rag = make_rag(tracing=True)
+    rag.tracer.registry = MetricsRegistry()
+    rag.load_demo_data()
+    rag.query("What does the hippocampus do?")
+    
+    assert {"embed", "retrieve", "generate"} <= set(rag.tracer.registry.to_dict()["stages"])
@@ -0,0 +1,207 @@
+import numpy as np
+import pytest
+
+from src.data_ingestion import Chunk, PaperMeta
+from src.vector_store import QueryFilter, VectorBackend, VectorStore
+
+
+def _fill(store: VectorStore, vectors: np.ndarray):
+    n = len(vectors)
+    store.add(
+        ids=[f"doc{i}" for i in range(n)],
+        embeddings=vectors.tolist(),
+        texts=[f"text {i}" for i in range(n)],
+        metadatas=[{"pmid": f"p{i}", "year": str(2000 + i % 20)} for i in range(n)]
+    )
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        VectorBackend()
+
+
+@pytest.mark.parametrize("filters", [None, QueryFilter(year_min=2005, year_max=2010)])
+def test_numpy_matches_chroma(tmp_path, random_vectors, filters):
+    vectors = random_vectors(400)
+    queries = random_vectors(10, seed=1).tolist()
+    
+    chroma = VectorStore(backend="chroma", persist_directory=str(tmp_path / "chroma"))
+    numpy_store = VectorStore(backend="numpy", persist_directory=str(tmp_path / "numpy"))
+    _fill(chroma, vectors)
+    _fill(numpy_store, vectors)
+    
+    expected = chroma.query_many(queries, top_k=5, filters=filters)
+    found = numpy_store.query_many(queries, top_k=5, filters=filters)
+    for a, b in zip(expected, found):
+        assert [h["id"] for h in a] == [h["id"] for h in b]
+        assert np.allclose([h["score"] for h in a], [h["score"] for h in b], atol=1e-4)
+        assert [h["metadata"]["year"] for h in a] == [h["metadata"]["year"] for h in b]
+
+
+def test_numpy_reopen_and_upsert(tmp_path, random_vectors):
+    path = str(tmp_path / "numpy")
+    store = VectorStore(backend="numpy", persist_directory=path)
+    vectors = random_vectors(50)
+    _fill(store, vectors)
+    store.upsert(ids=["doc0"], embeddings=[(-vectors[0]).tolist()], texts=["changed"],
+                 metadatas=[{"pmid": "p0"}])
+    
+    reopened = VectorStore(backend="numpy", persist_directory=path)
+    assert reopened.count == 50
+    hit = reopened.query((-vectors[0]).tolist(), top_k=1)[0]
+    assert hit["id"] == "doc0" and hit["text"] == "changed"
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_numpy_compact_dtypes_through_vector_store(tmp_path, random_vectors, dtype):
+    path = str(tmp_path / dtype)
+    store = VectorStore(backend="numpy", persist_directory=path, dtype=dtype)
+    vectors = random_vectors(200)
+    _fill(store, vectors)
+    
+    for i in (0, 57, 199):
+        hit = store.query(vectors[i].tolist(), top_k=1)[0]
+        assert hit["id"] == f"doc{i}" and hit["score"] == pytest.approx(1.0, abs=1e-2)
+    
+    store.delete(["doc57"])
+    reopened = VectorStore(backend="numpy", persist_directory=path, dtype=dtype)
+    assert reopened.count == 199
+    assert reopened.query(vectors[57].tolist(), top_k=1)[0]["id"] != "doc57"
+    with pytest.raises(ValueError, match="stores"):
+        VectorStore(backend="numpy", persist_directory=path)
+
+
+@pytest.mark.parametrize("quantization", ["binary", "int8"])
+def test_quantized_store_filters_and_rebuilds_codes(tmp_path, random_vectors, quantization):
+    path = str(tmp_path / quantization)
+    options = {"quantization": quantization, "rescore_multiplier": 10}
+    store = VectorStore(backend="numpy", persist_directory=path, **options)
+    vectors = random_vectors(300)
+    _fill(store, vectors)
+    
+    hits = store.query(vectors[3].tolist(), top_k=5,
+                       filters=QueryFilter(year_min=2003, year_max=2003))
+    assert hits[0]["id"] == "doc3" and hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert {h["metadata"]["year"] for h in hits} == {"2003"}
+    
+    # A plain writer drops the codes; the next quantized open rebuilds them
+    extra = random_vectors(1, seed=5)[0]
+    VectorStore(backend="numpy", persist_directory=path).add(
+        ids=["new"], embeddings=[extra.tolist()], texts=["new"], metadatas=[{"pmid": "new"}]
+    )
+    reopened = VectorStore(backend="numpy", persist_directory=path, **options)
+    assert reopened.query(extra.tolist(), top_k=1)[0]["id"] == "new"
+
+
+def _fill_papers(store: VectorStore, vectors: np.ndarray, chunks_per_paper: int = 4):
+    papers = {}
+    for i in range(len(vectors) // chunks_per_paper):
+        papers[f"p{i}"] = PaperMeta(f"p{i}", f"Paper {i}", [f"Author {i % 7}"],
+                                    str(2000 + i % 20), f"Journal {i % 5}")
+    pmids = [f"p{i // chunks_per_paper}" for i in range(len(vectors))]
+    store.add(
+        ids=[f"doc{i}" for i in range(len(vectors))],
+        embeddings=vectors.tolist(),
+        texts=[f"text {i}" for i in range(len(vectors))],
+        metadatas=[{"pmid": p, "year": papers[p].year} for p in pmids],
+        papers=list(papers.values())
+    )
+
+
+def _brute_force(store: VectorStore, query, filters: QueryFilter, k: int):
+    ids, embeddings, _, metadatas = next(iter(store.iter_records(10 ** 6)))
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    scores = vectors @ np.asarray(query) / np.linalg.norm(vectors, axis=1)
+    keep = []
+    for i, meta in enumerate(metadatas):
+        paper = store.papers.get(meta["pmid"])
+        year = int(paper.year)
+        if ((filters.journals is None or paper.journal in filters.journals)
+                and (filters.authors is None or set(paper.authors) & set(filters.authors))
+                and (filters.year_min is None or year >= filters.year_min)):
+            keep.append(i)
+    best = sorted(keep, key=lambda i: -scores[i])[:k]
+    return [ids[i] for i in best]
+
+
+@pytest.mark.parametrize("backend", ["numpy", "chroma"])
+@pytest.mark.parametrize("filters", [
+    QueryFilter(journals=["Journal 1", "Journal 3"]),
+    QueryFilter(authors=["Author 2"], year_min=2010),
+])
+def test_paper_filters_follow_upserts(tmp_path, random_vectors, filters, backend):
+    store = VectorStore(backend=backend, persist_directory=str(tmp_path / backend))
+    vectors = random_vectors(400)
+    _fill_papers(store, vectors)
+    query = random_vectors(1, seed=1)[0]
+    query = (query / np.linalg.norm(query)).tolist()
+    
+    assert [h["id"] for h in store.query(query, top_k=10, filters=filters)] \
+        == _brute_force(store, query, filters, 10)
+    
+    # Move chunks to other papers; the cached filter must follow
+    store.upsert(ids=[f"doc{i}" for i in range(0, 400, 3)],
+                 embeddings=vectors[0:400:3].tolist(),
+                 texts=["moved"] * len(range(0, 400, 3)),
+                 metadatas=[{"pmid": "p7", "year": "2007"} for _ in range(0, 400, 3)])
+    assert [h["id"] for h in store.query(query, top_k=10, filters=filters)] \
+        == _brute_force(store, query, filters, 10)
+
+
+def test_papers_written_by_another_instance_are_seen(tmp_path, random_vectors):
+    path = str(tmp_path / "numpy")
+    reader = VectorStore(backend="numpy", persist_directory=path)
+    writer = VectorStore(backend="numpy", persist_directory=path)
+    vectors = random_vectors(40)
+    _fill_papers(writer, vectors)
+    
+    hit = reader.query(vectors[0].tolist(), top_k=1)[0]
+    assert hit["metadata"]["title"] == "Paper 0" and hit["metadata"]["journal"] == "Journal 0"
+    hits = reader.query(vectors[0].tolist(), top_k=40, filters=QueryFilter(journals=["Journal 1"]))
+    assert len(hits) == 8
+    
+    writer.upsert(ids=["doc0"], embeddings=[vectors[0].tolist()], texts=["x"],
+                  metadatas=[{"pmid": "p0", "year": "2000"}],
+                  papers=[PaperMeta("p0", "Renamed", ["Author 0"], "2000", "Journal 1")])
+    assert reader.query(vectors[0].tolist(), top_k=1)[0]["metadata"]["title"] == "Renamed"
+    assert len(reader.query(vectors[0].tolist(), top_k=40,
+                            filters=QueryFilter(journals=["Journal 1"]))) == 12
+
+
+def test_chroma_filters_a_journal_larger_than_sqlite_variable_limit(tmp_path):
+    # SQLite allows 32766 bound variables per statement
+    n = 33000
+    store = VectorStore(backend="chroma", persist_directory=str(tmp_path / "chroma"))
+    vectors = np.random.default_rng(0).standard_normal((n, 4), dtype=np.float32)
+    step = store.backend.max_batch_size
+    for start in range(0, n, step):
+        pmids = [str(i) for i in range(start, min(start + step, n))]
+        store.add(ids=[f"{p}_0" for p in pmids], embeddings=vectors[start:start + step].tolist(),
+                  texts=[""] * len(pmids), metadatas=[{"pmid": p, "year": "2020"} for p in pmids],
+                  papers=[PaperMeta(p, "T", ["Smith J"], "2020", "PLoS One") for p in pmids])
+    
+    hits = store.query(vectors[5].tolist(), top_k=3,
+                       filters=QueryFilter(journals=["PLoS One"], authors=["Smith J"]))
+    assert hits[0]["id"] == "5_0" and hits[0]["metadata"]["journal"] == "PLoS One"
+    assert store.query(vectors[5].tolist(), filters=QueryFilter(journals=["Cell"])) == []
+
+
+def test_journal_filter_without_paper_table(tmp_path, random_vectors):
+    store = VectorStore(backend="numpy", persist_directory=str(tmp_path / "numpy"))
+    vectors = random_vectors(20)
+    store.add(ids=[f"doc{i}" for i in range(20)], embeddings=vectors.tolist(),
+              texts=[""] * 20,
+              metadatas=[{"pmid": f"p{i}", "journal": "Neuron" if i % 2 else "Cell"}
+                         for i in range(20)])
+    
+    hits = store.query(vectors[1].tolist(), top_k=20, filters=QueryFilter(journals=["Neuron"]))
+    assert len(hits) == 10 and all(h["metadata"]["journal"] == "Neuron" for h in hits)
+
+
+def test_chunk_accepts_flat_metadata():
+    meta = {"pmid": "1", "title": "T", "authors": ["A B"], "year": "2020",
+            "journal": "Neuron", "section": "Results", "chunk_index": 2, "source": "pmc"}
+    for chunk in (Chunk("1_2", "1", "text", metadata=meta), Chunk("1_2", "1", "text", meta)):
+        assert chunk.paper.journal == "Neuron" and chunk.section == "Results"
+        assert chunk.metadata == {**meta, "doi": None}
+        assert chunk.record_metadata()["source"] == "pmc"
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from src.data_ingestion import Chunk, PaperMeta
+from src.warmup import HotAnswers, QueryLog, SpendBudget, WarmupScheduler
+
+QUESTION = "What is the role of the hippocampus in memory?"
+
+
+def _new_chunk() -> Chunk:
+    paper = PaperMeta("900", "Grid cells", ["Moser E"], "2020", "Nature")
+    return Chunk("900_0", "900", "Grid cells in entorhinal cortex map space.", paper)
+
+
+def test_warm_answer_is_served_until_the_corpus_changes(make_rag, fake_client):
+    rag = make_rag()
+    rag.load_demo_data()
+    WarmupScheduler(rag, pinned=[QUESTION]).run_once()
+    
+    calls = dict(fake_client.calls)
+    hit = rag.query(QUESTION.upper())
+    assert hit["cache_hit"] is True and dict(fake_client.calls) == calls
+    assert rag.hot_answers.hits == 1
+    
+    rag.ingest([_new_chunk()])
+    assert "cache_hit" not in rag.query(QUESTION)
+
+
+def test_ingest_by_another_process_invalidates(make_rag, fake_client):
+    rag = make_rag("shared")
+    rag.load_demo_data()
+    rag.warm(QUESTION)
+    assert rag.query(QUESTION).get("cache_hit")
+    
+    # A second pipeline on the same index stands in for another process
+    other = make_rag("shared")
+    other.ingest([_new_chunk()])
+    assert "cache_hit" not in rag.query(QUESTION)
+    
+    rag.warm(QUESTION)
+    other.vector_store.set_fingerprint("demo", "changed")
+    assert "cache_hit" not in rag.query(QUESTION)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "chroma", "sharded"])
+def test_upsert_of_existing_ids_by_another_instance_invalidates(make_rag, backend):
+    rag = make_rag("shared", backend=backend)
+    rag.ingest([_new_chunk()])
+    version = rag.corpus_version
+    
+    # Same id, same count and no fingerprint change: only the content moves
+    other = make_rag("shared", backend=backend)
+    chunk = _new_chunk()
+    chunk.text = "Grid cells in entorhinal cortex tile space with hexagons."
+    other.ingest([chunk])
+    assert rag.vector_store.count == 1
+    assert rag.corpus_version != version
+
+
+def test_scheduler_respects_the_budget(make_rag):
+    rag = make_rag()
+    rag.load_demo_data()
+    questions = [f"Question {i} about synapses?" for i in range(5)]
+    scheduler = WarmupScheduler(rag, pinned=questions, budget=SpendBudget(max_calls=6))
+    
+    counts = scheduler.run_once()
+    assert counts["warmed"] == 2 and counts["over_budget"] == 3
+    assert scheduler.run_once()["fresh"] == 2
+
+
+def test_query_log_keeps_the_most_frequent(tmp_path):
+    path = tmp_path / "log.json"
+    log = QueryLog(str(path), max_entries=2)
+    for question in ["a?", "A", "b", "c", "c"]:
+        log.record(question)
+    log.flush()
+    
+    reloaded = QueryLog(str(path), max_entries=2)
+    assert dict(reloaded.top(5)) == {"A": 2, "c": 2}
+
+
+def test_hot_answers_count_hits_under_concurrency():
+    answers = HotAnswers()
+    answers.put("q", True, (1,), {"answer": "x"})
+    threads = [threading.Thread(target=lambda: [answers.get("q", True, (1,)) for _ in range(500)])
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert answers.hits == 4000
+    assert answers.get("q", True, (2,)) is None